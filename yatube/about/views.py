@@ -1,9 +1,14 @@
+from django.utils.decorators import method_decorator
 from django.views.generic.base import TemplateView
 
+from core.conditional import conditional_page, static_page
 
+
+@method_decorator(conditional_page(static_page), name='dispatch')
 class AboutAuthorView(TemplateView):
     template_name = 'about/author.html'
 
 
+@method_decorator(conditional_page(static_page), name='dispatch')
 class AboutTechView(TemplateView):
     template_name = 'about/tech.html'
@@ -0,0 +1,22 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'priority', 'attempts',
+                    'run_at', 'finished',)
+    list_filter = ('status', 'name',)
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        """Вернуть задачи в очередь с новым набором попыток."""
+        queryset.update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+            claimed_until=None, finished=None
+        )
+    retry.short_description = 'Повторить'
+
+
+admin.site.register(Job, JobAdmin)
@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import mail  # noqa: F401
+        # Задачи очереди core.jobs объявляются в модулях jobs приложений.
+        autodiscover_modules('jobs')
@@ -0,0 +1,272 @@
+"""ASGI без asgiref: Django 2.2 умеет только WSGI.
+
+WSGIBridge выполняет Django-приложение в пуле потоков
+(settings.ASGI_THREADS) и занимает поток только на время подготовки
+ответа. Router отдаёт отдельные адреса нативным
+ASGI-обработчикам, которые держат долгие соединения без потока на
+каждое, остальное - мосту.
+
+Тело запроса мост копит в SpooledTemporaryFile: до
+FILE_UPLOAD_MAX_MEMORY_SIZE в памяти, дальше во временном файле, как
+загрузки самого Django; тело больше ASGI_BODY_MAX_SIZE отклоняется
+ответом 413.
+
+run_sync() выполняет синхронный код Django (запросы к базе, шаблоны)
+из ASGI-обработчика в том же пуле; соединения потока живут
+CONN_MAX_AGE, как у обработчика запросов.
+"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+
+
+class BodyTooLarge(Exception):
+    """Тело запроса больше settings.ASGI_BODY_MAX_SIZE."""
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASGI_THREADS, thread_name_prefix='asgi'
+        )
+    return _executor
+
+
+def _closing(func, args):
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(func, *args):
+    """Выполняет func(*args) в пуле потоков и ждёт результат."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), _closing, func, args)
+
+
+def header(scope, name):
+    """Значение заголовка запроса name (в нижнем регистре) или ''."""
+    name = name.encode('latin1')
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin1')
+    return ''
+
+
+def cookies(scope):
+    found = {}
+    for part in header(scope, 'cookie').split(';'):
+        key, _, value = part.strip().partition('=')
+        if key:
+            found[key] = value
+    return found
+
+
+async def read_body(scope, receive):
+    """Тело запроса в файле с начала; None, если клиент отключился.
+
+    Тело больше ASGI_BODY_MAX_SIZE, заявленное в Content-Length или
+    фактическое, - BodyTooLarge.
+    """
+    if declares_too_large(scope):
+        raise BodyTooLarge()
+    body = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+        dir=settings.FILE_UPLOAD_TEMP_DIR
+    )
+    size = 0
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > settings.ASGI_BODY_MAX_SIZE:
+                raise BodyTooLarge()
+            body.write(chunk)
+            if not message.get('more_body'):
+                body.seek(0)
+                return body
+    except BaseException:
+        body.close()
+        raise
+
+
+def declares_too_large(scope):
+    """Content-Length запроса больше ASGI_BODY_MAX_SIZE."""
+    length = header(scope, 'content-length')
+    return length.isdigit() and int(length) > settings.ASGI_BODY_MAX_SIZE
+
+
+async def send_response(send, status, body=b'', headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (name.encode('latin1'), value.encode('latin1'))
+            for name, value in headers
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def wsgi_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        # PEP 3333: путь - байты UTF-8, прочитанные как latin1.
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        name = 'HTTP_' + name
+        environ[name] = (
+            environ[name] + ',' + value if name in environ else value
+        )
+    return environ
+
+
+class WSGIBridge:
+    """ASGI-приложение поверх WSGI-приложения.
+
+    Поток пула занят, только пока Django готовит ответ: тело запроса
+    читается до него (см. read_body), а обычный ответ отправляется
+    после, поэтому медленный клиент держит соединение, но не поток.
+    Потоковые ответы передаются по частям прямо из потока.
+    """
+
+    def __init__(self, wsgi_application, executor=None):
+        self.wsgi_application = wsgi_application
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        try:
+            body = await read_body(scope, receive)
+        except BodyTooLarge:
+            await send_response(send, 413)
+            return
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+
+        def forward(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        try:
+            response = await loop.run_in_executor(
+                self.executor or _get_executor(),
+                self.run, wsgi_environ(scope, body), forward
+            )
+        finally:
+            body.close()
+        if response is not None:
+            status, headers, content = response
+            await send({
+                'type': 'http.response.start',
+                'status': status,
+                'headers': headers,
+            })
+            await send({'type': 'http.response.body', 'body': content})
+
+    def run(self, environ, forward):
+        """Ответ (код, заголовки, тело); None, если он уже передан."""
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        def start():
+            if not started.get('sent'):
+                forward({
+                    'type': 'http.response.start',
+                    'status': started['status'],
+                    'headers': started['headers'],
+                })
+                started['sent'] = True
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            if not getattr(result, 'streaming', False):
+                content = b''.join(result)
+                return started['status'], started['headers'], content
+            for chunk in result:
+                if chunk:
+                    start()
+                    forward({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+        finally:
+            # close() шлёт request_finished: Django закрывает соединения.
+            if hasattr(result, 'close'):
+                result.close()
+        start()
+        forward({'type': 'http.response.body', 'body': b''})
+        return None
+
+
+class Router:
+    """Точные адреса - своим обработчикам, остальное - default.
+
+    Запрос, заявивший в Content-Length тело больше ASGI_BODY_MAX_SIZE,
+    получает 413 до обработчика, какой бы адрес он ни просил.
+    """
+
+    def __init__(self, routes, default):
+        self.routes = routes
+        self.default = default
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] == 'http' and declares_too_large(scope):
+            await send_response(send, 413)
+            return
+        handler = self.routes.get(scope.get('path'), self.default)
+        await handler(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
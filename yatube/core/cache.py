@@ -0,0 +1,422 @@
+"""Бэкенды кэша с общими для процессов хранилищами и счётчиками.
+
+Режим выбирается в settings.CACHE_MODE:
+
+* local  - LocMemCache, свой кэш у каждого процесса;
+* file   - каталог на диске, общий для всех процессов на машине;
+* sqlite - файл SQLite в режиме WAL, общий для всех процессов;
+* tiered - LRU в памяти процесса перед общим SQLite-кэшем.
+
+Межпроцессная инвалидация держится на ключах версий (см. posts.cards):
+содержимое под ключом с версией не меняется, поэтому его можно
+держать в памяти процесса, а сами ключи версий читаются только
+из общего хранилища.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends import filebased, locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+
+from . import timing
+
+_MISSING = object()
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class CacheStats:
+    """Счётчики попаданий и промахов, общие для потоков процесса.
+
+    События дописываются и в замер текущего запроса (core.timing).
+    """
+
+    def __init__(self, name=''):
+        self.name = name
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, event, count=1):
+        if not count:
+            return
+        timing.cache_event(self.name, event, count)
+        with self._lock:
+            self._counts[event] = self._counts.get(event, 0) + count
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+def get_stats(name):
+    with _stats_lock:
+        return _stats.setdefault(name, CacheStats(name))
+
+
+def cache_stats():
+    """Счётчики всех кэшей из settings.CACHES, у которых они есть."""
+    return {
+        alias: caches[alias].stats.snapshot()
+        for alias in settings.CACHES
+        if hasattr(caches[alias], 'stats')
+    }
+
+
+class CountingMixin:
+    """Считает попадания и промахи get() и get_many()."""
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.stats = get_stats(f'{type(self).__name__}:{location}')
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        self.stats.record('hits' if value is not _MISSING else 'misses')
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING, version)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+
+class LocMemCache(CountingMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(CountingMixin, filebased.FileBasedCache):
+    pass
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в отдельном файле SQLite, общий для процессов.
+
+    Работает мимо ORM и своей базы данных, поэтому не попадает
+    в транзакции запросов и тестов.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self.stats = get_stats(f'{type(self).__name__}:{location}')
+
+    @property
+    def _db(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=10, isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB, expires REAL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return None if expires is None else float(expires)
+
+    def _live(self, expires):
+        return expires is None or expires > time.time()
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        real_keys = {}
+        for key in keys:
+            real_key = self.make_key(key, version)
+            self.validate_key(real_key)
+            real_keys[real_key] = key
+        rows = self._db.execute(
+            'SELECT key, value, expires FROM cache WHERE key IN ({})'.format(
+                ','.join('?' * len(real_keys))
+            ),
+            list(real_keys)
+        ).fetchall()
+        found = {
+            real_keys[real_key]: pickle.loads(value)
+            for real_key, value, expires in rows
+            if self._live(expires)
+        }
+        self.stats.record('hits', len(found))
+        self.stats.record('misses', len(keys) - len(found))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = []
+        for key, value in data.items():
+            real_key = self.make_key(key, version)
+            self.validate_key(real_key)
+            rows.append((
+                real_key,
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                expires
+            ))
+        self._db.executemany(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            rows
+        )
+        self._cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        real_key = self.make_key(key, version)
+        self.validate_key(real_key)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (real_key, time.time())
+            )
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (
+                    real_key,
+                    pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                    self._expires(timeout)
+                )
+            ).rowcount == 1
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        real_key = self.make_key(key, version)
+        self.validate_key(real_key)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?',
+                (real_key,)
+            ).fetchone()
+            if row is None or not self._live(row[1]):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), real_key)
+            )
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        real_key = self.make_key(key, version)
+        return self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ?',
+            (self._expires(timeout), real_key)
+        ).rowcount == 1
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        real_keys = [self.make_key(key, version) for key in keys]
+        if real_keys:
+            self._db.execute(
+                'DELETE FROM cache WHERE key IN ({})'.format(
+                    ','.join('?' * len(real_keys))
+                ),
+                real_keys
+            )
+
+    def has_key(self, key, version=None):
+        row = self._db.execute(
+            'SELECT expires FROM cache WHERE key = ?',
+            (self.make_key(key, version),)
+        ).fetchone()
+        return row is not None and self._live(row[0])
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _cull(self):
+        db = self._db
+        (count,) = db.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count <= self._max_entries:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        if self._cull_frequency:
+            db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                (max(1, count // self._cull_frequency),)
+            )
+
+
+_local_stores = {}
+_local_stores_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    """LRU в памяти процесса перед общим кэшем.
+
+    OPTIONS:
+        SHARED - алиас общего кэша из settings.CACHES;
+        LOCAL_MAX_ENTRIES - размер LRU;
+        LOCAL_TIMEOUT - сколько секунд держать копию в памяти, это
+            предел устаревания для изменяемых ключей;
+        SHARED_ONLY_KEYS - подстроки ключей, которые всегда читаются
+            из общего кэша (ключи версий).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._shared_only = tuple(options.get(
+            'SHARED_ONLY_KEYS', (':version',)
+        ))
+        with _local_stores_lock:
+            self._store, self._lock = _local_stores.setdefault(
+                location, (OrderedDict(), threading.Lock())
+            )
+        self.stats = get_stats(f'{type(self).__name__}:{location}')
+
+    @cached_property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _is_local(self, key):
+        return not any(part in key for part in self._shared_only)
+
+    def _local_get(self, real_key):
+        with self._lock:
+            entry = self._store.get(real_key)
+            if entry is None:
+                return _MISSING
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._store[real_key]
+                return _MISSING
+            self._store.move_to_end(real_key)
+        return pickle.loads(value)
+
+    def _local_set(self, real_key, value, timeout):
+        local_timeout = self._local_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            local_timeout = min(local_timeout, timeout)
+        if local_timeout <= 0:
+            return
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._store[real_key] = (time.monotonic() + local_timeout, value)
+            self._store.move_to_end(real_key)
+            while len(self._store) > self._local_max_entries:
+                self._store.popitem(last=False)
+
+    def _local_delete(self, real_key):
+        with self._lock:
+            self._store.pop(real_key, None)
+
+    def get(self, key, default=None, version=None):
+        value = self.get_many([key], version).get(key, _MISSING)
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        for key in keys:
+            real_key = self.make_key(key, version)
+            if self._is_local(key):
+                value = self._local_get(real_key)
+                if value is not _MISSING:
+                    found[key] = value
+                    continue
+            remote.append(key)
+        self.stats.record('local_hits', len(found))
+        if remote:
+            shared = self.shared.get_many(remote, version)
+            self.stats.record('shared_hits', len(shared))
+            self.stats.record('misses', len(remote) - len(shared))
+            for key, value in shared.items():
+                if self._is_local(key):
+                    self._local_set(
+                        self.make_key(key, version), value, DEFAULT_TIMEOUT
+                    )
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        if self._is_local(key):
+            self._local_set(self.make_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        for key, value in data.items():
+            if self._is_local(key) and key not in failed:
+                self._local_set(self.make_key(key, version), value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added and self._is_local(key):
+            self._local_set(self.make_key(key, version), value, timeout)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        self._local_delete(self.make_key(key, version))
+        return self.shared.incr(key, delta, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self._local_delete(self.make_key(key, version))
+        self.shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._local_delete(self.make_key(key, version))
+        self.shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        real_key = self.make_key(key, version)
+        if self._is_local(key) and self._local_get(real_key) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version)
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+        self.shared.clear()
@@ -0,0 +1,93 @@
+"""Сжатие ответов brotli или gzip для отдельных view.
+
+В отличие от GZipMiddleware, сжимает только то, что помечено
+декоратором compressed: JSON API не содержит CSRF-токенов, поэтому
+сжатие не открывает его для BREACH. Потоковые ответы сжимаются
+по частям. brotli - необязательная зависимость: без пакета
+клиенты получают gzip.
+"""
+import re
+from functools import wraps
+
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Короче этого сжатие не окупается (так же решает GZipMiddleware).
+MIN_LENGTH = 200
+CODINGS = {
+    'br': re.compile(r'\bbr\b'),
+    'gzip': re.compile(r'\bgzip\b'),
+}
+
+
+def brotli_string(data):
+    return brotli.compress(data)
+
+
+def brotli_sequence(sequence):
+    compressor = brotli.Compressor()
+    for item in sequence:
+        # flush() отдаёт клиенту каждую часть сразу, как это делает
+        # compress_sequence для gzip.
+        yield compressor.process(item) + compressor.flush()
+    yield compressor.finish()
+
+
+ENCODERS = {
+    'br': (brotli_string, brotli_sequence),
+    'gzip': (compress_string, compress_sequence),
+}
+
+
+def choose_coding(request):
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for coding, pattern in CODINGS.items():
+        if coding == 'br' and brotli is None:
+            continue
+        if pattern.search(accepted):
+            return coding
+    return None
+
+
+def compress(request, response):
+    """Сжимает ответ 200 лучшим из кодирований, что принимает клиент."""
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if response.status_code != 200 or response.has_header(
+        'Content-Encoding'
+    ):
+        return response
+    if not response.streaming and len(response.content) < MIN_LENGTH:
+        return response
+    coding = choose_coding(request)
+    if coding is None:
+        return response
+    encode_string, encode_sequence = ENCODERS[coding]
+    if response.streaming:
+        response.streaming_content = encode_sequence(
+            response.streaming_content
+        )
+        del response['Content-Length']
+    else:
+        compressed = encode_string(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+    # Сжатое тело отличается побайтно: ETag становится слабым.
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    response['Content-Encoding'] = coding
+    return response
+
+
+def compressed(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return compress(request, view(request, *args, **kwargs))
+    return wrapper
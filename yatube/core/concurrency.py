@@ -0,0 +1,132 @@
+"""Сколько одновременных клиентов выдерживает WSGI и ASGI.
+
+Оба замера идут в процессе, без сокетов, через одно и то же
+Django-приложение и одинаковое число потоков workers. Клиенты
+медленные: каждую часть ответа клиент принимает client_delay секунд.
+
+* measure_wsgi() - синхронный сервер: поток занят запросом, пока
+  клиент не дочитает ответ, как у gunicorn с потоками.
+* measure_asgi() - yatube.asgi: поток занят только подготовкой ответа
+  (core.asgi.WSGIBridge), отдача медленному клиенту его не держит.
+
+Итог - запросов в секунду и p50/p95 времени ответа со стороны клиента.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from .asgi import WSGIBridge, wsgi_environ
+
+
+def scope(path):
+    path, _, query = path.partition('?')
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode(),
+        'headers': [(b'host', b'testserver')],
+    }
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def summary(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+    }
+
+
+def measure_wsgi(application, paths, clients, requests, workers,
+                 client_delay):
+    def handle(path):
+        status = []
+
+        def start_response(line, headers, exc_info=None):
+            status.append(int(line.split(' ', 1)[0]))
+
+        environ = wsgi_environ(scope(path), BytesIO())
+        result = application(environ, start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    # Запись в сокет медленному клиенту держит поток.
+                    time.sleep(client_delay)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return status[0]
+
+    def client(number):
+        latencies, errors = [], 0
+        for step in range(requests):
+            started = time.perf_counter()
+            code = server.submit(
+                handle, paths[(number + step) % len(paths)]
+            ).result()
+            latencies.append(time.perf_counter() - started)
+            errors += code >= 500
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as server:
+        with ThreadPoolExecutor(clients) as pool:
+            results = list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+    return summary(
+        [value for latencies, _ in results for value in latencies],
+        sum(errors for _, errors in results),
+        elapsed
+    )
+
+
+def measure_asgi(application, paths, clients, requests, workers,
+                 client_delay):
+    """application - WSGI-приложение: его обслуживает WSGIBridge."""
+    async def handle(app, path):
+        status = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif message.get('body'):
+                await asyncio.sleep(client_delay)
+
+        await app(scope(path), receive, send)
+        return status[0]
+
+    async def client(app, number):
+        latencies, errors = [], 0
+        for step in range(requests):
+            started = time.perf_counter()
+            code = await handle(app, paths[(number + step) % len(paths)])
+            latencies.append(time.perf_counter() - started)
+            errors += code >= 500
+        return latencies, errors
+
+    async def run(executor):
+        app = WSGIBridge(application, executor)
+        return await asyncio.gather(
+            *(client(app, number) for number in range(clients))
+        )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        results = asyncio.run(run(executor))
+    elapsed = time.perf_counter() - started
+    return summary(
+        [value for latencies, _ in results for value in latencies],
+        sum(errors for _, errors in results),
+        elapsed
+    )
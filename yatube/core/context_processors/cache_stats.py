@@ -0,0 +1,12 @@
+from django.conf import settings
+
+from core.cache import cache_stats as collect_cache_stats
+
+
+def cache_stats(request):
+    """Добавляет счётчики кэша в режиме отладки."""
+    if not settings.DEBUG:
+        return {}
+    return {
+        'cache_stats': collect_cache_stats()
+    }
@@ -0,0 +1,313 @@
+"""Очередь фоновых задач в базе.
+
+Задача - функция, зарегистрированная декоратором job() в модуле
+jobs.py приложения (модули подгружает CoreConfig.ready). enqueue()
+пишет строку Job в текущей транзакции: при откате транзакции задача
+исчезает вместе с данными, для которых ставилась, а поставленная
+не теряется при падении процесса.
+
+Очередь разбирает команда run_jobs. Обработчик берёт готовую задачу
+с наибольшим приоритетом одним UPDATE, который заодно проверяет
+ограничение concurrency - сколько задач этого вида может выполняться
+одновременно во всех обработчиках. Взятая задача держится
+settings.JOBS_LEASE секунд: задачу упавшего обработчика после этого
+возьмёт другой, а долгая задача продлевает срок вызовом heartbeat().
+Ошибка ставит задачу на повтор с удвоением паузы, после max_attempts
+попыток задача остаётся со статусом failed.
+
+Каждая выполненная задача пишется строкой JSON в логгер yatube.jobs,
+metrics() считает глубину очереди и задержки по таблице; их
+показывает страница admin/jobs/.
+"""
+import contextvars
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('yatube.jobs')
+
+# Сколько готовых задач просматривать за раз в поисках той, которую
+# можно взять, не нарушая ограничений concurrency.
+CLAIM_SCAN = 20
+
+_registry = {}
+# id задачи, которую выполняет текущий поток.
+_current = contextvars.ContextVar('current_job', default=None)
+
+
+class JobSpec:
+    def __init__(self, name, func, priority, max_attempts, concurrency,
+                 retry_delay):
+        self.name = name
+        self.func = func
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self.retry_delay = retry_delay
+
+
+def job(name, priority=0, max_attempts=3, concurrency=None, retry_delay=10):
+    """Регистрирует функцию как задачу name.
+
+    Аргументы задачи хранятся в JSON, поэтому передаются только
+    простые значения: id, строки, числа. concurrency - сколько задач
+    этого вида выполнять одновременно, None - без ограничения;
+    retry_delay - пауза перед первым повтором, секунд.
+    """
+    def decorator(func):
+        _registry[name] = JobSpec(
+            name, func, priority, max_attempts, concurrency, retry_delay
+        )
+        return func
+    return decorator
+
+
+def registered():
+    return dict(_registry)
+
+
+def enqueue(name, *args, priority=None, delay=0):
+    """Ставит задачу в очередь в текущей транзакции."""
+    spec = _registry[name]
+    return Job.objects.create(
+        name=name,
+        arguments=json.dumps(args),
+        priority=spec.priority if priority is None else priority,
+        max_attempts=spec.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay)
+    )
+
+
+def _ready(now):
+    return Q(status=Job.QUEUED, run_at__lte=now) | Q(
+        status=Job.RUNNING, claimed_until__lt=now
+    )
+
+
+def _claim(job_id, spec, now):
+    """Берёт задачу одним UPDATE; True, если взял.
+
+    Проверка concurrency - подзапрос в том же UPDATE, поэтому два
+    обработчика не превысят ограничение, даже если выбрали задачи
+    одновременно.
+    """
+    quote = connection.ops.quote_name
+    adapt = connection.ops.adapt_datetimefield_value
+    table = quote(Job._meta.db_table)
+    sql = (
+        f'UPDATE {table} SET status = %s, claimed_until = %s, '
+        f'started = %s, attempts = attempts + 1 '
+        f'WHERE id = %s AND ((status = %s AND run_at <= %s) '
+        f'OR (status = %s AND claimed_until < %s))'
+    )
+    params = [
+        Job.RUNNING,
+        adapt(now + timedelta(seconds=settings.JOBS_LEASE)),
+        adapt(now),
+        job_id,
+        Job.QUEUED, adapt(now),
+        Job.RUNNING, adapt(now),
+    ]
+    if spec.concurrency:
+        sql += (
+            f' AND (SELECT COUNT(*) FROM {table} other '
+            f'WHERE other.name = %s AND other.status = %s '
+            f'AND other.claimed_until >= %s) < %s'
+        )
+        params += [spec.name, Job.RUNNING, adapt(now), spec.concurrency]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount == 1
+
+
+def claim_next(ready_by=None):
+    """Берёт готовую задачу с наибольшим приоритетом или возвращает None.
+
+    ready_by - брать только задачи, готовые к этому времени.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(_ready(ready_by or now)).order_by(
+        '-priority', 'run_at', 'pk'
+    ).values_list('pk', 'name')[:CLAIM_SCAN]
+    for job_id, name in candidates:
+        spec = _registry.get(name)
+        if spec is None:
+            Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+                status=Job.FAILED,
+                finished=now,
+                error=f'Неизвестная задача {name}'
+            )
+            continue
+        if _claim(job_id, spec, now):
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def heartbeat():
+    """Продлевает срок выполняемой задачи ещё на JOBS_LEASE секунд.
+
+    Долгая задача вызывает её между шагами, чтобы другой обработчик не
+    забрал её как брошенную; вне задачи ничего не делает.
+    """
+    job_id = _current.get()
+    if job_id is not None:
+        Job.objects.filter(pk=job_id, status=Job.RUNNING).update(
+            claimed_until=timezone.now() + timedelta(
+                seconds=settings.JOBS_LEASE
+            )
+        )
+
+
+def _ms(start, end):
+    return round((end - start).total_seconds() * 1000, 2)
+
+
+def run(job):
+    """Выполняет взятую задачу и записывает итог."""
+    spec = _registry[job.name]
+    error = ''
+    if job.attempts > job.max_attempts:
+        # Обработчик упал на последней попытке: больше не повторяем.
+        error = 'Попытки исчерпаны'
+    else:
+        token = _current.set(job.pk)
+        try:
+            spec.func(*json.loads(job.arguments))
+        except Exception:
+            error = traceback.format_exc()
+        finally:
+            _current.reset(token)
+    finished = timezone.now()
+    if not error:
+        status = Job.DONE
+        changes = {'finished': finished, 'error': ''}
+    elif job.attempts < job.max_attempts:
+        status = Job.QUEUED
+        delay = spec.retry_delay * 2 ** (job.attempts - 1)
+        changes = {'run_at': finished + timedelta(seconds=delay)}
+    else:
+        status = Job.FAILED
+        changes = {'finished': finished}
+    if error:
+        changes['error'] = error
+    Job.objects.filter(pk=job.pk).update(
+        status=status, claimed_until=None, **changes
+    )
+    line = {
+        'job': job.name,
+        'id': job.pk,
+        'status': status,
+        'attempt': job.attempts,
+        'wait_ms': _ms(job.run_at, job.started),
+        'run_ms': _ms(job.started, finished),
+    }
+    level = logging.WARNING if error else logging.INFO
+    logger.log(level, json.dumps(line, ensure_ascii=False))
+    if error:
+        logger.log(level, error)
+    return status
+
+
+def run_next(ready_by=None):
+    """Выполняет одну задачу; False, если готовых задач нет."""
+    job = claim_next(ready_by)
+    if job is None:
+        return False
+    run(job)
+    return True
+
+
+def work(loop=False, interval=1.0, should_stop=None):
+    """Цикл обработчика; возвращает число выполненных задач.
+
+    Без loop - один проход по задачам, готовым к его началу: повторы
+    упавших и задачи, поставленные во время прохода, ждут следующего
+    запуска, поэтому проход всегда заканчивается.
+    """
+    done = 0
+    ready_by = None if loop else timezone.now()
+    last_purge = time.monotonic()
+    while should_stop is None or not should_stop():
+        if run_next(ready_by):
+            done += 1
+            continue
+        if not loop:
+            break
+        if time.monotonic() - last_purge > 60:
+            purge()
+            last_purge = time.monotonic()
+        time.sleep(interval)
+    return done
+
+
+def purge():
+    """Удаляет выполненные задачи старше settings.JOBS_KEEP_DONE."""
+    border = timezone.now() - timedelta(seconds=settings.JOBS_KEEP_DONE)
+    return Job.objects.filter(
+        status=Job.DONE, finished__lt=border
+    ).delete()[0]
+
+
+def _percentile(values, share):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def metrics(window=3600, sample=1000):
+    """Глубина очереди и задержки по видам задач.
+
+    Для каждой задачи: число в каждом состоянии, возраст самой старой
+    готовой задачи и p50/p95 ожидания (от run_at до начала) и
+    выполнения по последним sample задачам за window секунд.
+    """
+    now = timezone.now()
+    names = set(_registry)
+    counts = {}
+    for name, status, total in Job.objects.values_list(
+        'name', 'status'
+    ).annotate(total=Count('pk')).order_by():
+        counts.setdefault(name, {})[status] = total
+        names.add(name)
+    oldest = dict(Job.objects.filter(
+        status=Job.QUEUED, run_at__lte=now
+    ).values_list('name').annotate(oldest=Min('run_at')).order_by())
+    timings = {}
+    recent = Job.objects.filter(
+        status=Job.DONE, finished__gte=now - timedelta(seconds=window)
+    ).order_by('-finished').values_list(
+        'name', 'run_at', 'started', 'finished'
+    )[:sample]
+    for name, run_at, started, finished in recent:
+        waits, runs = timings.setdefault(name, ([], []))
+        waits.append(_ms(run_at, started))
+        runs.append(_ms(started, finished))
+    rows = []
+    for name in sorted(names):
+        waits, runs = timings.get(name, ([], []))
+        rows.append({
+            'name': name,
+            'counts': {
+                status: counts.get(name, {}).get(status, 0)
+                for status, _ in Job.STATUSES
+            },
+            'oldest_age_s': (
+                round((now - oldest[name]).total_seconds(), 1)
+                if name in oldest else None
+            ),
+            'wait_p50_ms': _percentile(waits, 0.5),
+            'wait_p95_ms': _percentile(waits, 0.95),
+            'run_p50_ms': _percentile(runs, 0.5),
+            'run_p95_ms': _percentile(runs, 0.95),
+        })
+    return rows
@@ -0,0 +1,11 @@
+"""Логи детекторов, которые молчат на время тестов (core.testing)."""
+import logging
+
+silenced = False
+
+
+class UnlessSilenced(logging.Filter):
+    """Фильтр обработчика: assertLogs ставит свой и видит записи."""
+
+    def filter(self, record):
+        return not silenced
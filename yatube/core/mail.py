@@ -0,0 +1,36 @@
+"""Отправка писем фоновой задачей.
+
+QueuedEmailBackend вместо отправки ставит письмо в очередь core.jobs,
+а задача core.send_mail отправляет его через
+settings.QUEUED_EMAIL_BACKEND. Вложения не поддерживаются: сайт
+отправляет только письма восстановления пароля.
+"""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .jobs import enqueue, job
+
+MESSAGE_FIELDS = ('subject', 'body', 'from_email', 'to', 'cc', 'bcc',
+                  'reply_to')
+
+
+def serialize(message):
+    data = {field: getattr(message, field) for field in MESSAGE_FIELDS}
+    data['headers'] = message.extra_headers
+    data['alternatives'] = list(getattr(message, 'alternatives', []))
+    return data
+
+
+@job('core.send_mail', priority=5, max_attempts=5, retry_delay=30)
+def send_mail(data):
+    message = EmailMultiAlternatives(**data)
+    with get_connection(settings.QUEUED_EMAIL_BACKEND) as connection:
+        connection.send_messages([message])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            enqueue('core.send_mail', serialize(message))
+        return len(email_messages)
@@ -0,0 +1,143 @@
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+SCHEMA = (
+    'CREATE TABLE bench_post ('
+    'id INTEGER PRIMARY KEY, comments INTEGER NOT NULL DEFAULT 0)',
+    'CREATE TABLE bench_comment ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, post_id INTEGER NOT NULL, '
+    'text TEXT NOT NULL)',
+)
+POSTS = 50
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность конкурентной записи в SQLite '
+        'со стандартным бэкендом и с core.sqlite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Сколько потоков пишут одновременно.'
+        )
+        parser.add_argument(
+            '--transactions',
+            type=int,
+            default=200,
+            help='Сколько транзакций делает каждый поток.'
+        )
+        parser.add_argument(
+            '--modes',
+            default='stock,tuned',
+            help='Режимы из settings.DATABASE_ENGINES через запятую.'
+        )
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='yatube-bench-')
+        try:
+            self.stdout.write(
+                f'{options["threads"]} потоков по '
+                f'{options["transactions"]} транзакций, '
+                'каждая читает пост, добавляет комментарий и обновляет '
+                'счётчик (как add_comment с сигналами)'
+            )
+            for mode in options['modes'].split(','):
+                self.report(mode, self.run_mode(mode, directory, options))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run_mode(self, mode, directory, options):
+        alias = f'bench_{mode}'
+        connections.databases[alias] = {
+            **settings.DATABASE_ENGINES[mode],
+            'NAME': os.path.join(directory, f'{mode}.sqlite3'),
+        }
+        connections.ensure_defaults(alias)
+        with connections[alias].cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+            cursor.executemany(
+                'INSERT INTO bench_post (id) VALUES (%s)',
+                [(pk,) for pk in range(1, POSTS + 1)]
+            )
+        connections[alias].close()
+        results = []
+        barrier = threading.Barrier(options['threads'])
+        workers = [
+            threading.Thread(
+                target=self.worker,
+                args=(alias, number, options['transactions'], barrier,
+                      results)
+            )
+            for number in range(options['threads'])
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        del connections.databases[alias]
+        return elapsed, results
+
+    def worker(self, alias, number, count, barrier, results):
+        latencies, errors = [], 0
+        barrier.wait()
+        try:
+            for step in range(count):
+                post_id = (number * count + step) % POSTS + 1
+                started = time.perf_counter()
+                try:
+                    with transaction.atomic(using=alias):
+                        with connections[alias].cursor() as cursor:
+                            cursor.execute(
+                                'SELECT comments FROM bench_post '
+                                'WHERE id = %s', [post_id]
+                            )
+                            cursor.fetchone()
+                            cursor.execute(
+                                'INSERT INTO bench_comment (post_id, text) '
+                                'VALUES (%s, %s)', [post_id, 'x' * 200]
+                            )
+                            cursor.execute(
+                                'UPDATE bench_post SET comments = '
+                                'comments + 1 WHERE id = %s', [post_id]
+                            )
+                except OperationalError:
+                    # Как в запросе пользователя: ошибка, без повтора.
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connections[alias].close()
+        results.append((latencies, errors))
+
+    def report(self, mode, measured):
+        elapsed, results = measured
+        latencies = sorted(
+            latency for thread_latencies, _ in results
+            for latency in thread_latencies
+        )
+        errors = sum(thread_errors for _, thread_errors in results)
+        if not latencies:
+            self.stdout.write(f'{mode:>6}: все транзакции с ошибкой')
+            return
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'{mode:>6}: {len(latencies) / elapsed:8.1f} транзакций/с, '
+            f'ошибок «database is locked»: {errors}, '
+            f'p50 {statistics.median(latencies) * 1000:.1f} мс, '
+            f'p95 {p95 * 1000:.1f} мс'
+        )
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Ставит фоновую задачу в очередь, например из cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Имя задачи.')
+        parser.add_argument(
+            'arguments',
+            nargs='*',
+            help='Аргументы задачи в JSON, например 42 или \'"slug"\'.'
+        )
+        parser.add_argument(
+            '--priority',
+            type=int,
+            help='Приоритет вместо заданного у задачи.'
+        )
+
+    def handle(self, *args, **options):
+        if options['name'] not in jobs.registered():
+            raise CommandError('Неизвестная задача, есть: {}'.format(
+                ', '.join(sorted(jobs.registered()))
+            ))
+        try:
+            arguments = [json.loads(value) for value in options['arguments']]
+        except ValueError as error:
+            raise CommandError(f'Аргумент не JSON: {error}')
+        job = jobs.enqueue(
+            options['name'], *arguments, priority=options['priority']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Поставлена задача {job}'))
@@ -0,0 +1,65 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Не завершаться, а ждать новые задачи.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Пауза между проверками пустой очереди, секунд.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.JOBS_WORKERS,
+            help='Сколько задач выполнять одновременно; с 1 - без потоков.'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] == 1:
+            done = jobs.work(options['loop'], options['interval'])
+        else:
+            done = self.work_in_threads(options)
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
+
+    def work_in_threads(self, options):
+        stop = threading.Event()
+        done = []
+
+        def worker():
+            try:
+                done.append(jobs.work(
+                    options['loop'], options['interval'], stop.is_set
+                ))
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker, name=f'jobs-{number}')
+            for number in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            # Начатые задачи доделываются, новые не берутся.
+            stop.set()
+            for thread in threads:
+                thread.join()
+        return sum(done)
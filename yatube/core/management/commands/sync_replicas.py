@@ -0,0 +1,55 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик: замена '
+        'репликации для локальной проверки чтения с реплик.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Повторять копирование каждые N секунд, 0 - один раз.'
+        )
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            raise CommandError(
+                'Реплики не настроены: задайте YATUBE_REPLICAS.'
+            )
+        vendors = {
+            connections[alias].vendor
+            for alias in [DEFAULT_DB_ALIAS, *replicas]
+        }
+        if vendors != {'sqlite'}:
+            raise CommandError('Копировать можно только базы SQLite.')
+        while True:
+            for alias in replicas:
+                self.copy(primary['NAME'], settings.DATABASES[alias]['NAME'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Реплики обновлены: {", ".join(replicas)}'
+            ))
+            if options['interval'] <= 0:
+                return
+            time.sleep(options['interval'])
+
+    def copy(self, source_path, target_path):
+        # backup() копирует согласованный снимок, даже если в основную
+        # базу в это время пишут.
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
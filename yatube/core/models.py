@@ -0,0 +1,85 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди, см. core.jobs."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField(
+        'Задача',
+        max_length=100
+    )
+    arguments = models.TextField(
+        'Аргументы',
+        default='[]',
+        help_text='Список аргументов в JSON'
+    )
+    priority = models.SmallIntegerField(
+        'Приоритет',
+        default=0,
+        help_text='Задачи с большим приоритетом выполняются раньше'
+    )
+    status = models.CharField(
+        'Состояние',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'Попыток',
+        default=0
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        'Попыток не больше',
+        default=3
+    )
+    run_at = models.DateTimeField(
+        'Выполнить не раньше',
+        default=timezone.now
+    )
+    claimed_until = models.DateTimeField(
+        'Занята до',
+        null=True,
+        blank=True
+    )
+    created = models.DateTimeField(
+        'Поставлена',
+        auto_now_add=True
+    )
+    started = models.DateTimeField(
+        'Начата',
+        null=True,
+        blank=True
+    )
+    finished = models.DateTimeField(
+        'Завершена',
+        null=True,
+        blank=True
+    )
+    error = models.TextField(
+        'Последняя ошибка',
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'], name='job_next'
+            ),
+            models.Index(fields=['name', 'status'], name='job_name_status'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
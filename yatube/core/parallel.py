@@ -0,0 +1,79 @@
+"""Независимые запросы к базе одновременно.
+
+gather() выполняет функции в пуле потоков settings.PARALLEL_THREADS,
+у каждого потока своё соединение с базой. Потоки получают контекст
+запроса (маршрутизацию на реплики, замер времени, учёт запросов) и
+обёртки execute_wrapper соединений вызывающего потока, поэтому
+запросы из потоков видны в Server-Timing и в бюджете запросов.
+
+Внутри транзакции функции выполняются по очереди: другие соединения
+не видят её незакоммиченных данных. По очереди они выполняются и с
+базой SQLite в памяти (тесты): её соединения делят общий кэш с
+блокировками на уровне таблиц.
+"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PARALLEL_THREADS,
+            thread_name_prefix='parallel'
+        )
+    return _executor
+
+
+def _sequential():
+    return any(
+        connection.in_atomic_block
+        or connection.vendor == 'sqlite' and connection.is_in_memory_db()
+        for connection in connections.all()
+    )
+
+
+def _wrappers():
+    return {
+        connection.alias: list(connection.execute_wrappers)
+        for connection in connections.all()
+        if connection.execute_wrappers
+    }
+
+
+def _call(func, wrappers):
+    try:
+        with ExitStack() as stack:
+            for alias, items in wrappers.items():
+                for wrapper in items:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(wrapper)
+                    )
+            return func()
+    finally:
+        # Соединение потока живёт CONN_MAX_AGE, как у обработчика запросов.
+        close_old_connections()
+
+
+def gather(*funcs):
+    """Результаты функций без аргументов в том же порядке."""
+    if not settings.PARALLEL_QUERIES or len(funcs) < 2 or _sequential():
+        return [func() for func in funcs]
+    return run_parallel(funcs)
+
+
+def run_parallel(funcs):
+    wrappers = _wrappers()
+    futures = [
+        _get_executor().submit(
+            contextvars.copy_context().run, _call, func, wrappers
+        )
+        for func in funcs
+    ]
+    return [future.result() for future in futures]
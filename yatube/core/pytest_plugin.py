@@ -0,0 +1,60 @@
+"""Pytest-плагин: тест падает, если view превысил бюджет запросов.
+
+Подключается в conftest.py строкой pytest_plugins. На время каждого
+теста включает core.queries и сверяет число запросов каждого
+HTTP-запроса с бюджетом view (декоратор core.queries.query_budget)
+или с бюджетом из маркера теста:
+
+    @pytest.mark.query_budget(5)
+    def test_index(client):
+        ...
+
+Маркер с allow_duplicates=False дополнительно запрещает повторы.
+Логи детекторов и запросов на время тестов молчат (core.testing).
+"""
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(limit, allow_duplicates=True): сколько запросов к '
+        'базе разрешено каждому HTTP-запросу теста.'
+    )
+
+
+@pytest.fixture(autouse=True)
+def _query_budget(request):
+    from django.conf import settings
+
+    if not settings.configured:
+        yield
+        return
+    from django.test import override_settings
+
+    from core.queries import (QueryInspectorMiddleware, check_request,
+                              queries_inspected)
+    from core.testing import silenced_logs
+
+    marker = request.node.get_closest_marker('query_budget')
+    problems = request.node.query_budget_problems = []
+
+    def receiver(sender, route, queries, duplicates, budget, **kwargs):
+        problems.extend(
+            check_request(route, queries, duplicates, budget, marker)
+        )
+
+    queries_inspected.connect(receiver, sender=QueryInspectorMiddleware)
+    try:
+        with override_settings(QUERY_INSPECTION=True), silenced_logs():
+            yield
+    finally:
+        queries_inspected.disconnect(receiver)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    yield
+    problems = getattr(item, 'query_budget_problems', None)
+    if problems:
+        pytest.fail('\n'.join(problems), pytrace=False)
@@ -0,0 +1,231 @@
+"""Поиск лишних и медленных запросов к базе.
+
+Включается settings.QUERY_INSPECTION (по умолчанию в режиме отладки).
+QueryInspectorMiddleware перехватывает все запросы к базе за время
+HTTP-запроса и для каждого запоминает отпечаток - SQL без значений,
+с одним «?» вместо любых литералов и списков IN - и место в коде:
+строку шаблона, который его вызвал, и ближайший кадр кода проекта.
+
+В конце запроса в логгер yatube.queries пишутся:
+
+* повторы - одинаковые запросы или запросы, различающиеся только
+  параметрами (N+1);
+* запросы дольше settings.SLOW_QUERY_MS;
+* превышение бюджета view, заданного декоратором query_budget.
+
+Итог рассылается сигналом queries_inspected; на нём построены
+проверки бюджетов в тестах: core.testing для manage.py test и
+pytest-плагин core.pytest_plugin.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from collections import OrderedDict
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+from django.template.base import Node
+
+from . import routers, template_backend, timing
+
+logger = logging.getLogger('yatube.queries')
+
+# request, route, queries, duplicates, slow, budget
+queries_inspected = Signal()
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+IN_LIST_RE = re.compile(r'\bIN \(\?(?:, ?\?)*\)')
+SPACE_RE = re.compile(r'\s+')
+# Кадры, которые сами ничего не запрашивают, а только оборачивают.
+SKIPPED_FILES = {
+    os.path.abspath(module.__file__)
+    for module in (sys.modules[__name__], timing, template_backend, routers)
+}
+# Управление транзакциями повторяется законно.
+TRANSACTION_STATEMENTS = (
+    'BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE'
+)
+
+_RENDER_CODE = Node.render_annotated.__code__
+_current = ContextVar('inspected_queries', default=None)
+
+
+def query_budget(limit):
+    """Сколько запросов к базе разрешено view за один HTTP-запрос."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def fingerprint(sql):
+    """SQL без значений: запросы N+1 дают одинаковый отпечаток."""
+    sql = LITERAL_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def _origin():
+    """Строка шаблона и ближайший кадр кода проекта для запроса."""
+    template = code = None
+    frame = sys._getframe(2)
+    project = str(settings.BASE_DIR) + os.sep
+    while frame is not None and (template is None or code is None):
+        if template is None and frame.f_code is _RENDER_CODE:
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                template = f'{origin.template_name}:{token.lineno}'
+        elif code is None:
+            filename = frame.f_code.co_filename
+            if (filename.startswith(project)
+                    and filename not in SKIPPED_FILES
+                    and f'{os.sep}tests{os.sep}' not in filename):
+                code = '{}:{} in {}'.format(
+                    os.path.relpath(filename, project),
+                    frame.f_lineno,
+                    frame.f_code.co_name
+                )
+        frame = frame.f_back
+    return template, code
+
+
+class Query:
+    def __init__(self, alias, sql, params, duration, origin):
+        self.alias = alias
+        self.sql = sql
+        self.params = params
+        self.fingerprint = fingerprint(sql)
+        self.duration = duration
+        self.template, self.code = origin
+
+    @property
+    def location(self):
+        return ', '.join(
+            place for place in (self.template, self.code) if place
+        ) or 'неизвестно где'
+
+    def __str__(self):
+        return f'{self.duration * 1000:.1f} мс, {self.location}: {self.sql}'
+
+
+def _inspect(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries = _current.get()
+        if queries is not None:
+            queries.append(Query(
+                context['connection'].alias,
+                sql,
+                params,
+                time.perf_counter() - started,
+                _origin()
+            ))
+
+
+def duplicates(queries):
+    """{отпечаток: запросы} для отпечатков, встретившихся больше раза."""
+    groups = OrderedDict()
+    for query in queries:
+        if query.fingerprint.upper().startswith(TRANSACTION_STATEMENTS):
+            continue
+        groups.setdefault(query.fingerprint, []).append(query)
+    return OrderedDict(
+        (key, group) for key, group in groups.items() if len(group) > 1
+    )
+
+
+def describe_duplicates(key, group):
+    identical = len({
+        (query.sql, repr(query.params)) for query in group
+    }) == 1
+    kind = 'одинаковых' if identical else 'различающихся параметрами'
+    places = OrderedDict.fromkeys(query.location for query in group)
+    return '{} {} запросов из {}: {}'.format(
+        len(group), kind, '; '.join(places), key
+    )
+
+
+def check_request(route, queries, duplicates, budget, marker=None):
+    """Нарушения бюджета одного HTTP-запроса строками.
+
+    marker - маркер pytest query_budget: свой бюджет первым аргументом
+    и allow_duplicates.
+    """
+    allow_duplicates = True
+    if marker is not None:
+        budget = marker.args[0] if marker.args else budget
+        allow_duplicates = marker.kwargs.get('allow_duplicates', True)
+    problems = []
+    if budget is not None and len(queries) > budget:
+        problems.append(
+            f'{route}: {len(queries)} запросов при бюджете {budget}'
+        )
+        problems.extend(f'    {query}' for query in queries)
+    if not allow_duplicates:
+        problems.extend(
+            f'{route}: {describe_duplicates(key, group)}'
+            for key, group in duplicates.items()
+        )
+    return problems
+
+
+class QueryInspectorMiddleware:
+    """Ставится сразу после core.timing.RequestTimingMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_INSPECTION:
+            return self.get_response(request)
+        queries = []
+        token = _current.set(queries)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_inspect))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.report(request, queries)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+    def report(self, request, queries):
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match is not None else 'other'
+        budget = getattr(request, 'query_budget', None)
+        repeated = duplicates(queries)
+        slow = [
+            query for query in queries
+            if query.duration * 1000 >= settings.SLOW_QUERY_MS
+        ]
+        prefix = f'{request.method} {request.path} ({route})'
+        for key, group in repeated.items():
+            logger.warning('%s: %s', prefix, describe_duplicates(key, group))
+        for query in slow:
+            logger.warning('%s: медленный запрос %s', prefix, query)
+        if budget is not None and len(queries) > budget:
+            logger.warning(
+                '%s: %s запросов при бюджете %s', prefix, len(queries), budget
+            )
+        queries_inspected.send(
+            sender=self.__class__,
+            request=request,
+            route=route,
+            queries=queries,
+            duplicates=repeated,
+            slow=slow,
+            budget=budget
+        )
@@ -0,0 +1,105 @@
+"""Чтение с реплик базы для страниц, которые только читают.
+
+Middleware включает реплики на время запроса к view, помеченной
+@replica_reads, если это GET или HEAD. Любая запись в базу переводит
+оставшееся чтение запроса на основную базу, а ответ на POST и другие
+изменяющие запросы с записью ставит cookie: пока она жива, все запросы
+пользователя читают с основной базы и видят его собственные правки,
+даже если реплики ещё отстают.
+
+Без settings.DATABASE_REPLICAS роутер ничего не меняет.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'primary_reads'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_routing = ContextVar('db_routing', default=None)
+
+
+class _RequestRouting:
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+def replica_reads(view):
+    """Помечает view, которой можно читать с реплик."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapper.replica_reads = True
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if (routing is None or not routing.use_replica or routing.wrote
+                or not settings.DATABASE_REPLICAS):
+            return None
+        # Внутри транзакции читаем то, что в ней же и записали.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в основной базе.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема попадает на реплики вместе с данными.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaRoutingMiddleware:
+    """Должен стоять после SessionMiddleware и AuthenticationMiddleware.
+
+    Тогда сохранение сессии в конце запроса не считается правкой
+    пользователя, а вход на сайт и регистрация - считаются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = _RequestRouting()
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        # Служебные записи при чтении (ленивые счётчики и т.п.) правками
+        # пользователя не считаются.
+        if (routing.wrote and settings.DATABASE_REPLICAS
+                and request.method not in SAFE_METHODS):
+            response.set_cookie(
+                STICKY_COOKIE,
+                '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        if routing is None:
+            return None
+        routing.use_replica = (
+            getattr(view_func, 'replica_reads', False)
+            and request.method in SAFE_METHODS
+            and STICKY_COOKIE not in request.COOKIES
+        )
+        return None
@@ -0,0 +1,56 @@
+"""SQLite, настроенный для сайта под нагрузкой.
+
+ENGINE 'core.sqlite' - обычный бэкенд django.db.backends.sqlite3,
+который при подключении выставляет PRAGMA из DEFAULT_PRAGMAS (их можно
+переопределить в OPTIONS['pragmas']) и начинает транзакции с
+BEGIN IMMEDIATE.
+
+- WAL: читатели не ждут писателя, коммит пишет в журнал без fsync
+  основного файла; synchronous=NORMAL синхронизирует только на
+  контрольных точках, потерять можно лишь последние транзакции при
+  отключении питания, но не целостность базы.
+- busy_timeout: занятая база ждёт, а не падает сразу с
+  «database is locked».
+- BEGIN IMMEDIATE: транзакция сразу берёт блокировку записи. При
+  обычном BEGIN транзакция, которая сначала читает, а потом пишет
+  (add_comment, post_create с сигналами), не может дождаться
+  блокировки - SQLite отвечает «database is locked», не глядя на
+  busy_timeout, чтобы не было взаимной блокировки.
+
+Соединения переиспользуются через CONN_MAX_AGE в settings.DATABASES.
+"""
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - размер в КиБ, а не в страницах.
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        self.immediate_transactions = params.pop(
+            'immediate_transactions', True
+        )
+        # Таймаут модуля sqlite3 тоже ждёт блокировку, держим их равными.
+        params.setdefault('timeout', self.pragmas['busy_timeout'] / 1000)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        if self.immediate_transactions:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,39 @@
+"""DjangoTemplates, который замеряет отрисовку для core.timing.
+
+Время считается по шаблону верхнего уровня: include и extends
+отрисовываются внутри него и в замер уже входят. Шаблоны, которые код
+отрисовывает во время отрисовки другого (render_to_string карточки
+поста из тега), тоже входят во внешний замер и отдельно не считаются.
+"""
+from contextvars import ContextVar
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from . import timing
+
+_depth = ContextVar('template_depth', default=0)
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        depth = _depth.get()
+        token = _depth.set(depth + 1)
+        try:
+            if depth:
+                return super().render(context, request)
+            with timing.timer('template'):
+                return super().render(context, request)
+        finally:
+            _depth.reset(token)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
@@ -0,0 +1,59 @@
+"""Бюджеты запросов в тестах manage.py test.
+
+QueryBudgetRunner (settings.TEST_RUNNER) на время тестов включает
+core.queries: HTTP-запрос сверх бюджета view (core.queries.query_budget)
+поднимает QueryBudgetExceeded, и тестовый клиент роняет тест. Логи
+детекторов и запросов при этом молчат: повторы и медленные запросы в
+тестах не предупреждения, а бюджет проверяется падением. Под pytest
+то же делает плагин core.pytest_plugin.
+"""
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from . import log
+from .queries import QueryInspectorMiddleware, check_request, queries_inspected
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def silenced_logs():
+    """Глушит логи core.queries и core.timing (settings.LOGGING)."""
+    saved, log.silenced = log.silenced, True
+    try:
+        yield
+    finally:
+        log.silenced = saved
+
+
+def fail_over_budget(sender, route, queries, duplicates, budget, **kwargs):
+    problems = check_request(route, queries, duplicates, budget)
+    if problems:
+        raise QueryBudgetExceeded('\n'.join(problems))
+
+
+class QueryBudgetRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._stack = ExitStack()
+        self._stack.enter_context(silenced_logs())
+        inspection = settings.QUERY_INSPECTION
+        settings.QUERY_INSPECTION = True
+        self._stack.callback(
+            setattr, settings, 'QUERY_INSPECTION', inspection
+        )
+        queries_inspected.connect(
+            fail_over_budget, sender=QueryInspectorMiddleware
+        )
+        self._stack.callback(
+            queries_inspected.disconnect,
+            fail_over_budget, sender=QueryInspectorMiddleware
+        )
+
+    def teardown_test_environment(self, **kwargs):
+        self._stack.close()
+        super().teardown_test_environment(**kwargs)
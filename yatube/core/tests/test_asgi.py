@@ -0,0 +1,145 @@
+import asyncio
+from io import BytesIO
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from yatube.asgi import application
+
+from .. import concurrency
+from ..asgi import WSGIBridge, wsgi_environ
+
+
+def request(app, path, method='GET', body=b'', headers=()):
+    """Запрос к ASGI-приложению; список отправленных сообщений."""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': b'',
+        'headers': [
+            (name.encode(), value.encode()) for name, value in headers
+        ],
+    }
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+class Streaming(list):
+    streaming = True
+
+
+def echo(request, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    size = request['CONTENT_LENGTH']
+    chunks = [b'first ', request['wsgi.input'].read(int(size)), b'']
+    if request['PATH_INFO'] == '/stream/':
+        return Streaming(chunks)
+    return chunks
+
+
+def echo_get(request, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [request['QUERY_STRING'].encode()]
+
+
+class ASGITests(TestCase):
+    def test_django_page_through_bridge(self):
+        messages = request(application, '/about/author/')
+        self.assertEqual(messages[0]['type'], 'http.response.start')
+        self.assertEqual(messages[0]['status'], 200)
+        body = b''.join(m.get('body', b'') for m in messages[1:])
+        self.assertIn('Об авторе'.encode(), body)
+        self.assertFalse(messages[-1].get('more_body'))
+
+    def test_request_body(self):
+        """Тело запроса доходит до WSGI, обычный ответ уходит целиком."""
+        messages = request(
+            WSGIBridge(echo), '/', 'POST', b'second',
+            headers=[('content-length', '6')]
+        )
+        self.assertEqual(
+            [m.get('body') for m in messages[1:]], [b'first second']
+        )
+
+    def test_large_body_is_spooled_to_disk(self):
+        """Тело больше FILE_UPLOAD_MAX_MEMORY_SIZE не держится в памяти."""
+        seen = {}
+
+        def app(environ, start_response):
+            seen['rolled'] = environ['wsgi.input']._rolled
+            return echo(environ, start_response)
+
+        with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=4):
+            messages = request(
+                WSGIBridge(app), '/', 'POST', b'second',
+                headers=[('content-length', '6')]
+            )
+        self.assertTrue(seen['rolled'])
+        self.assertEqual(messages[1]['body'], b'first second')
+
+    @override_settings(ASGI_BODY_MAX_SIZE=4)
+    def test_body_over_limit_is_rejected(self):
+        messages = request(
+            WSGIBridge(echo), '/', 'POST', b'second',
+            headers=[('content-length', '6')]
+        )
+        self.assertEqual(messages[0]['status'], 413)
+
+    @override_settings(ASGI_BODY_MAX_SIZE=4)
+    def test_router_rejects_declared_large_body_on_every_route(self):
+        """413 до обработчика - и для моста, и для живой ленты."""
+        for path in ('/', reverse('live:index')):
+            with self.subTest(path=path):
+                messages = request(
+                    application, path, 'POST', b'second',
+                    headers=[('content-length', '6')]
+                )
+                self.assertEqual(messages[0]['status'], 413)
+                self.assertEqual(len(messages), 2)
+
+    def test_streaming_chunks(self):
+        messages = request(
+            WSGIBridge(echo), '/stream/', 'POST', b'second',
+            headers=[('content-length', '6')]
+        )
+        self.assertEqual(
+            [m.get('body') for m in messages[1:]],
+            [b'first ', b'second', b'']
+        )
+
+    def test_environ(self):
+        environ = wsgi_environ({
+            'type': 'http',
+            'method': 'GET',
+            'path': '/профиль/',
+            'query_string': b'a=1',
+            'headers': [
+                (b'content-type', b'text/html'),
+                (b'accept', b'a'),
+                (b'accept', b'b'),
+            ],
+        }, BytesIO())
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin1').decode(), '/профиль/'
+        )
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/html')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'a,b')
+
+
+class ConcurrencyBenchmarkTests(TestCase):
+    def test_modes_serve_every_request(self):
+        for measure in (concurrency.measure_wsgi, concurrency.measure_asgi):
+            with self.subTest(mode=measure.__name__):
+                result = measure(echo_get, ['/', '/?a=1'], 3, 2, 2, 0)
+                self.assertEqual(result['requests'], 6)
+                self.assertEqual(result['errors'], 0)
@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from ..cache import SQLiteCache, TieredCache
+
+CACHE_DIR = tempfile.mkdtemp()
+SHARED_PATH = os.path.join(CACHE_DIR, 'cache.sqlite3')
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.LocMemCache',
+        'LOCATION': 'tests',
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': SHARED_PATH,
+    },
+}
+
+
+def worker_cache(name):
+    """Кэш отдельного процесса: свой LRU, общий SQLite."""
+    return TieredCache(name, {'OPTIONS': {'SHARED': 'shared'}})
+
+
+@override_settings(CACHES=CACHES)
+class SharedCacheTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.shared = SQLiteCache(SHARED_PATH, {})
+        self.shared.clear()
+        self.shared.stats.reset()
+
+    def test_sqlite_cache_operations(self):
+        self.shared.set('key', {'value': 1})
+        self.assertEqual(self.shared.get('key'), {'value': 1})
+        self.assertFalse(self.shared.add('key', 2))
+        self.assertTrue(self.shared.add('other', 2))
+        self.assertEqual(self.shared.incr('other'), 3)
+        self.assertEqual(
+            self.shared.get_many(['key', 'other', 'missing']),
+            {'key': {'value': 1}, 'other': 3}
+        )
+        self.shared.delete('key')
+        self.assertIsNone(self.shared.get('key'))
+        self.shared.set('expired', 1, timeout=0)
+        self.assertFalse(self.shared.has_key('expired'))
+        self.assertEqual(
+            self.shared.stats.snapshot(), {'hits': 3, 'misses': 2}
+        )
+
+    def test_tiered_cache_serves_local_copy(self):
+        """Повторное чтение берётся из памяти процесса."""
+        worker = worker_cache('first')
+        worker.stats.reset()
+        worker.set('fragment', 'html')
+        self.shared.delete('fragment')
+        self.assertEqual(worker.get('fragment'), 'html')
+        self.assertEqual(worker.stats.snapshot(), {'local_hits': 1})
+
+    def test_version_keys_shared_between_processes(self):
+        """Ключи версий видны другому процессу сразу."""
+        first, second = worker_cache('first'), worker_cache('second')
+        first.set('post_card:post:1:version', 'old')
+        self.assertEqual(second.get('post_card:post:1:version'), 'old')
+        first.set('post_card:post:1:version', 'new')
+        self.assertEqual(second.get('post_card:post:1:version'), 'new')
+
+    def test_delete_reaches_shared_tier(self):
+        first, second = worker_cache('first'), worker_cache('second')
+        first.set('fragment', 'html')
+        first.delete('fragment')
+        self.assertIsNone(second.get('fragment'))
+        self.assertIsNone(first.get('fragment'))
@@ -0,0 +1,59 @@
+import gzip
+from unittest import mock, skipUnless
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from .. import compression
+
+BODY = 'Зима близко. ' * 100
+
+
+class CompressionTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def compress(self, response, accept='gzip, deflate'):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING=accept)
+        return compression.compress(request, response)
+
+    def test_gzip(self):
+        """Ответ сжимается, ETag становится слабым."""
+        response = HttpResponse(BODY)
+        response['ETag'] = '"abc"'
+        with mock.patch.object(compression, 'brotli', None):
+            response = self.compress(response, 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.content).decode(), BODY)
+
+    def test_streaming_gzip(self):
+        response = self.compress(StreamingHttpResponse(
+            part.encode() for part in BODY.split('.')
+        ))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(response.getvalue()).decode(),
+            BODY.replace('.', '')
+        )
+
+    def test_left_alone(self):
+        """Без поддержки у клиента, короткий ответ и ошибки не сжимаются."""
+        cases = {
+            'не принимает': (HttpResponse(BODY), 'identity'),
+            'короткий': (HttpResponse('ok'), 'gzip'),
+            'ошибка': (HttpResponse(BODY, status=404), 'gzip'),
+        }
+        for name, (response, accept) in cases.items():
+            with self.subTest(name):
+                response = self.compress(response, accept)
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+    @skipUnless(compression.brotli, 'нет пакета brotli')
+    def test_brotli_preferred(self):
+        response = self.compress(HttpResponse(BODY), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(
+            compression.brotli.decompress(response.content).decode(), BODY
+        )
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+User = get_user_model()
+
+
+class ConditionalPageTests(TestCase):
+    def test_static_page_not_modified(self):
+        """Статичная страница по ETag отдаёт 304 без тела."""
+        client = Client()
+        url = reverse('about:author')
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_etag_depends_on_user(self):
+        """Гость и пользователь получают разные валидаторы."""
+        url = reverse('about:tech')
+        etag = Client().get(url)['ETag']
+        client = Client()
+        client.force_login(User.objects.create_user('Varys'))
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
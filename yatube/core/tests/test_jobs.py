@@ -0,0 +1,190 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Follow, Notification, Post
+
+from .. import jobs
+from ..models import Job
+
+User = get_user_model()
+CALLS = []
+
+
+@jobs.job('tests.record', retry_delay=0)
+def record(value):
+    CALLS.append(value)
+
+
+@jobs.job('tests.fail', max_attempts=2, retry_delay=0)
+def fail():
+    raise ValueError('сбой')
+
+
+@jobs.job('tests.single', concurrency=1)
+def single():
+    pass
+
+
+@jobs.job('tests.heartbeat')
+def beat():
+    jobs.heartbeat()
+    CALLS.append(Job.objects.get(status=Job.RUNNING).claimed_until)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_priority_then_order(self):
+        """Сначала задачи с большим приоритетом, затем по очереди."""
+        jobs.enqueue('tests.record', 'первая')
+        jobs.enqueue('tests.record', 'срочная', priority=5)
+        jobs.enqueue('tests.record', 'вторая')
+        self.assertEqual(jobs.work(), 3)
+        self.assertEqual(CALLS, ['срочная', 'первая', 'вторая'])
+        self.assertEqual(
+            Job.objects.filter(status=Job.DONE).count(), 3
+        )
+
+    def test_delay(self):
+        jobs.enqueue('tests.record', 1, delay=60)
+        self.assertFalse(jobs.run_next())
+
+    def test_retry_then_fail(self):
+        """Упавшая задача повторяется, затем остаётся failed."""
+        job = jobs.enqueue('tests.fail')
+        with self.assertLogs('yatube.jobs', 'WARNING'):
+            # Один проход - одна попытка: повтор ждёт следующего.
+            self.assertEqual(jobs.work(), 1)
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.QUEUED)
+            self.assertEqual(jobs.work(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('ValueError: сбой', job.error)
+
+    def test_concurrency_limit(self):
+        """Задачу не берут, пока выполняется такая же сверх лимита."""
+        first = jobs.enqueue('tests.single')
+        jobs.enqueue('tests.single')
+        self.assertEqual(jobs.claim_next(), first)
+        self.assertIsNone(jobs.claim_next())
+
+    def test_expired_lease_reclaimed(self):
+        """Задачу упавшего обработчика берёт другой."""
+        job = jobs.enqueue('tests.record', 1)
+        jobs.claim_next()
+        Job.objects.filter(pk=job.pk).update(
+            claimed_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertTrue(jobs.run_next())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+
+    def test_heartbeat_extends_lease(self):
+        """Долгая задача продлевает свой срок, пока выполняется."""
+        jobs.enqueue('tests.heartbeat')
+        job = jobs.claim_next()
+        Job.objects.filter(pk=job.pk).update(claimed_until=timezone.now())
+        jobs.run(job)
+        self.assertGreater(CALLS[0], timezone.now() + timedelta(
+            seconds=settings.JOBS_LEASE - 60
+        ))
+
+    def test_unknown_job_fails(self):
+        Job.objects.create(name='tests.missing')
+        self.assertFalse(jobs.run_next())
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_metrics(self):
+        jobs.enqueue('tests.record', 1)
+        jobs.enqueue('tests.record', 2)
+        jobs.run_next()
+        row = next(
+            row for row in jobs.metrics() if row['name'] == 'tests.record'
+        )
+        self.assertEqual(row['counts'][Job.QUEUED], 1)
+        self.assertEqual(row['counts'][Job.DONE], 1)
+        self.assertIsNotNone(row['oldest_age_s'])
+        self.assertIsNotNone(row['run_p95_ms'])
+
+    def test_purge(self):
+        job = jobs.enqueue('tests.record', 1)
+        jobs.run_next()
+        Job.objects.filter(pk=job.pk).update(
+            finished=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(jobs.purge(), 1)
+
+    def test_metrics_page(self):
+        staff = User.objects.create_user('staff', is_staff=True)
+        jobs.enqueue('tests.record', 1)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('jobs'))
+        self.assertContains(response, 'tests.record')
+
+
+class JobCommandTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_run_jobs(self):
+        for number in range(3):
+            jobs.enqueue('tests.record', number)
+        call_command('run_jobs', workers=1, stdout=open(os.devnull, 'w'))
+        self.assertEqual(sorted(CALLS), [0, 1, 2])
+
+    def test_enqueue_job(self):
+        call_command(
+            'enqueue_job', 'tests.record', '"значение"',
+            stdout=open(os.devnull, 'w')
+        )
+        jobs.run_next()
+        self.assertEqual(CALLS, ['значение'])
+
+
+class QueuedWorkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user(
+            'reader', email='reader@example.com', password='secret-42'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @override_settings(NOTIFICATION_ASYNC=True)
+    def test_notifications_job(self):
+        """Публикация ставит задачу, подписчик получает уведомление."""
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            Job.objects.filter(name='posts.notify_followers').exists()
+        )
+        self.assertFalse(Notification.objects.exists())
+        jobs.work()
+        self.assertTrue(
+            Notification.objects.filter(user=self.reader, post=post).exists()
+        )
+
+    def test_email_sent_by_job(self):
+        """Письмо восстановления пароля отправляет фоновая задача."""
+        with override_settings(
+            EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+            QUEUED_EMAIL_BACKEND='django.core.mail.backends.locmem.'
+                                 'EmailBackend',
+        ):
+            self.client.post(
+                reverse('password_reset'), {'email': 'reader@example.com'}
+            )
+            self.assertEqual(mail.outbox, [])
+            jobs.work()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
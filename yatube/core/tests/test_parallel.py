@@ -0,0 +1,52 @@
+import threading
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .. import parallel
+
+User = get_user_model()
+request_id = ContextVar('request_id', default=None)
+
+
+def current():
+    return request_id.get(), threading.current_thread().name
+
+
+class GatherTests(TestCase):
+    def test_sequential_in_transaction(self):
+        """В транзакции всё выполняется в вызывающем потоке."""
+        results = parallel.gather(current, current)
+        name = threading.current_thread().name
+        self.assertEqual([thread for _, thread in results], [name, name])
+
+    @override_settings(PARALLEL_QUERIES=False)
+    def test_disabled(self):
+        self.assertEqual(parallel.gather(lambda: 1, lambda: 2), [1, 2])
+
+
+class RunParallelTests(TransactionTestCase):
+    def test_context_and_wrappers(self):
+        """Потоки видят контекст запроса, их запросы - обёртки соединения."""
+        User.objects.create_user('reader')
+        seen = []
+
+        def wrapper(execute, sql, params, many, context):
+            seen.append(threading.current_thread().name)
+            return execute(sql, params, many, context)
+
+        token = request_id.set('запрос')
+        try:
+            with connection.execute_wrapper(wrapper):
+                results = parallel.run_parallel([
+                    current, User.objects.count, current
+                ])
+        finally:
+            request_id.reset(token)
+        self.assertEqual(results[1], 1)
+        self.assertEqual(results[0][0], 'запрос')
+        self.assertTrue(results[0][1].startswith('parallel'))
+        self.assertEqual(len(seen), 1)
+        self.assertTrue(seen[0].startswith('parallel'))
@@ -0,0 +1,145 @@
+import logging
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.template import Context, Origin, Template
+from django.test import RequestFactory, TestCase, override_settings
+
+from posts.models import Post
+
+from ..log import UnlessSilenced
+from ..queries import (QueryInspectorMiddleware, check_request, fingerprint,
+                       query_budget, queries_inspected)
+from ..testing import QueryBudgetExceeded, fail_over_budget
+
+User = get_user_model()
+TEMPLATE = '''{% for post in posts %}
+{{ post.author.username }}
+{% endfor %}'''
+
+
+@query_budget(2)
+def feed(request):
+    origin = Origin('n_plus_one.html', template_name='n_plus_one.html')
+    posts = Post.objects.order_by('pk')
+    return HttpResponse(
+        Template(TEMPLATE, origin=origin).render(Context({'posts': posts}))
+    )
+
+
+class Inspector(QueryInspectorMiddleware):
+    """Отчёты этого класса не проверяют ни core.testing, ни
+    pytest-плагин: тесты здесь нарочно превышают бюджет."""
+
+
+@override_settings(QUERY_INSPECTION=True, SLOW_QUERY_MS=10 ** 6)
+class QueryInspectorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('first', 'second', 'third'):
+            Post.objects.create(
+                author=User.objects.create_user(name), text='Тестовый пост'
+            )
+
+    def inspect(self, view):
+        reports = []
+
+        def receiver(sender, **kwargs):
+            reports.append(kwargs)
+
+        middleware = Inspector(view)
+        request = RequestFactory().get('/')
+        middleware.process_view(request, view, (), {})
+        queries_inspected.connect(receiver)
+        try:
+            with self.assertLogs('yatube.queries', 'WARNING') as logs:
+                middleware(request)
+        finally:
+            queries_inspected.disconnect(receiver)
+        return reports[0], logs.output
+
+    def test_fingerprint(self):
+        """Литералы, параметры и списки IN не меняют отпечаток."""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE a = %s AND b IN (1, 2, 3)"),
+            fingerprint("SELECT *  FROM t WHERE a = 'x'\nAND b IN (%s)"),
+        )
+        self.assertNotEqual(
+            fingerprint('SELECT a FROM t'), fingerprint('SELECT b FROM t')
+        )
+
+    def test_n_plus_one_reported_with_template_line(self):
+        report, logs = self.inspect(feed)
+        self.assertEqual(len(report['queries']), 4)
+        self.assertEqual(report['budget'], 2)
+        [group] = report['duplicates'].values()
+        self.assertEqual(len(group), 3)
+        self.assertIn('3 различающихся параметрами', logs[0])
+        self.assertIn('n_plus_one.html:2', logs[0])
+        self.assertIn('4 запросов при бюджете 2', logs[-1])
+
+    def test_identical_queries_reported(self):
+        def view(request):
+            Post.objects.count()
+            Post.objects.count()
+            return HttpResponse()
+
+        report, logs = self.inspect(view)
+        self.assertIn('2 одинаковых', logs[0])
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_queries_reported(self):
+        def view(request):
+            Post.objects.count()
+            return HttpResponse()
+
+        report, logs = self.inspect(view)
+        self.assertEqual(len(report['slow']), 1)
+        self.assertIn('медленный запрос', logs[0])
+
+    @override_settings(QUERY_INSPECTION=False)
+    def test_disabled(self):
+        middleware = Inspector(feed)
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('yatube.queries', 'WARNING'):
+                middleware(RequestFactory().get('/'))
+
+
+class BudgetCheckTests(TestCase):
+    queries = [SimpleNamespace(sql='SELECT 1')] * 3
+
+    def test_view_budget(self):
+        self.assertEqual(check_request('feed', self.queries, {}, 3), [])
+        problems = check_request('feed', self.queries, {}, 2)
+        self.assertIn('feed: 3 запросов при бюджете 2', problems[0])
+
+    def test_marker_overrides_view_budget(self):
+        marker = SimpleNamespace(args=(5,), kwargs={})
+        self.assertEqual(
+            check_request('feed', self.queries, {}, 2, marker), []
+        )
+
+    def test_marker_forbids_duplicates(self):
+        marker = SimpleNamespace(args=(), kwargs={'allow_duplicates': False})
+        group = [SimpleNamespace(sql='SELECT 1', params=(), location='x')] * 2
+        problems = check_request(
+            'feed', group, {'SELECT ?': group}, None, marker
+        )
+        self.assertEqual(len(problems), 1)
+        self.assertIn('2 одинаковых', problems[0])
+
+
+class TestRunnerTests(TestCase):
+    queries = [SimpleNamespace(sql='SELECT 1')] * 3
+
+    def test_over_budget_fails_test(self):
+        """В manage.py test view сверх бюджета роняет тест."""
+        fail_over_budget(None, 'feed', self.queries, {}, 3)
+        with self.assertRaisesMessage(
+            QueryBudgetExceeded, 'feed: 3 запросов при бюджете 2'
+        ):
+            fail_over_budget(None, 'feed', self.queries, {}, 2)
+
+    def test_detector_logs_silenced(self):
+        self.assertFalse(UnlessSilenced().filter(logging.makeLogRecord({})))
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..routers import STICKY_COOKIE, ReplicaRoutingMiddleware, replica_reads
+
+User = get_user_model()
+
+
+def read_view(request):
+    return HttpResponse(router.db_for_read(User))
+
+
+def write_then_read_view(request):
+    router.db_for_write(User)
+    return HttpResponse(router.db_for_read(User))
+
+
+def run(view, method='get', cookies=None):
+    """Прогоняет запрос через middleware так же, как обработчик Django."""
+    request = getattr(RequestFactory(), method)('/')
+    request.COOKIES.update(cookies or {})
+    middleware = ReplicaRoutingMiddleware(lambda request: (
+        middleware.process_view(request, view, (), {}) or view(request)
+    ))
+    return middleware(request)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    def test_read_only_view_reads_replica(self):
+        response = run(replica_reads(read_view))
+        self.assertEqual(response.content, b'replica1')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_other_views_read_primary(self):
+        self.assertEqual(run(read_view).content, b'default')
+        self.assertEqual(
+            run(replica_reads(read_view), method='post').content, b'default'
+        )
+
+    def test_write_sticks_to_primary(self):
+        """После записи запрос и следующие запросы читают основную базу."""
+        response = run(write_then_read_view, method='post')
+        self.assertEqual(response.content, b'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        response = run(
+            replica_reads(read_view), cookies={STICKY_COOKIE: '1'}
+        )
+        self.assertEqual(response.content, b'default')
+
+    def test_write_while_reading(self):
+        """Служебная запись при GET не делает cookie, но читает основную."""
+        response = run(replica_reads(write_then_read_view))
+        self.assertEqual(response.content, b'default')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_outside_request(self):
+        self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_replicas_not_migrated(self):
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+
+
+class NoReplicasTests(SimpleTestCase):
+    def test_without_replicas_nothing_changes(self):
+        self.assertEqual(run(replica_reads(read_view)).content, b'default')
+        response = run(write_then_read_view, method='post')
+        self.assertEqual(response.content, b'default')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import SimpleTestCase
+
+ALIAS = 'tuned_sqlite'
+
+
+class TunedSQLiteTests(SimpleTestCase):
+    databases = {ALIAS}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[ALIAS] = {
+            'ENGINE': 'core.sqlite',
+            'NAME': os.path.join(cls.directory, 'tuned.sqlite3'),
+            'OPTIONS': {'pragmas': {'busy_timeout': 2000}},
+        }
+        connections.ensure_defaults(ALIAS)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[ALIAS].close()
+        del connections.databases[ALIAS]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def pragma(self, name):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 2000)
+
+    def test_transactions_take_write_lock(self):
+        """BEGIN IMMEDIATE: вторая пишущая транзакция ждёт и падает."""
+        other = connections[ALIAS].copy()
+        other.settings_dict['OPTIONS'] = {'pragmas': {'busy_timeout': 50}}
+        try:
+            with transaction.atomic(using=ALIAS):
+                connections[ALIAS].cursor().execute('SELECT 1')
+                with self.assertRaisesMessage(Exception, 'locked'):
+                    other.ensure_connection()
+                    other._start_transaction_under_autocommit()
+        finally:
+            other.close()
+
+    def test_benchmark_runs(self):
+        output = StringIO()
+        call_command(
+            'benchmark_sqlite', threads=2, transactions=5, stdout=output
+        )
+        self.assertIn('tuned:', output.getvalue())
+        self.assertIn('stock:', output.getvalue())
@@ -0,0 +1,108 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import timing
+
+User = get_user_model()
+ENTRY_RE = re.compile(r'(\w+);(?:dur=[\d.]+;)?desc="([^"]*)"')
+
+
+@override_settings(SERVER_TIMING_PUBLIC=False, REQUEST_HISTOGRAMS=True)
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+        Post.objects.create(author=cls.staff, text='Тестовый пост')
+
+    def setUp(self):
+        timing.reset_histograms()
+
+    def server_timing(self, response):
+        return dict(ENTRY_RE.findall(response['Server-Timing']))
+
+    def test_header_only_for_staff(self):
+        """Server-Timing видят сотрудники, гости - нет."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('posts:index'))
+        metrics = self.server_timing(response)
+        self.assertEqual(
+            set(metrics), {'db', 'template', 'cache', 'total'}
+        )
+        self.assertIn('queries', metrics['db'])
+
+    @override_settings(SERVER_TIMING_PUBLIC=True)
+    def test_db_queries_counted(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            self.server_timing(response)['db'],
+            f'DB, {len(queries)} queries'
+        )
+
+    def test_nested_render_timed_once(self):
+        """Шаблон внутри отрисовки другого не удваивает время шаблонов."""
+        engine = engines.all()[0]
+        inner = engine.from_string('inner')
+        outer = engine.from_string('outer {{ nested }}')
+        timings = timing.RequestTimings()
+        token = timing._current.set(timings)
+        try:
+            rendered = outer.render({'nested': inner.render})
+        finally:
+            timing._current.reset(token)
+        self.assertEqual(rendered, 'outer inner')
+        self.assertEqual(timings.counts['template'], 1)
+
+    def test_log_line(self):
+        """В лог пишется одна строка JSON на запрос."""
+        with self.assertLogs('yatube.requests', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(len(logs.records), 1)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['route'], 'posts:index')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['db_queries'], 0)
+        self.assertGreater(line['template_ms'], 0)
+        self.assertEqual(line['thumbnails_ms'], 0)
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_is_warning(self):
+        with self.assertLogs('yatube.requests', 'WARNING'):
+            self.client.get(reverse('posts:index'))
+
+    def test_histograms_page(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        histogram = timing.histograms()[('posts:index', 'total')]
+        self.assertEqual(histogram.count, 2)
+        self.assertIsNotNone(histogram.quantile(0.99))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('timings'))
+        self.assertContains(response, 'posts:index')
+        self.client.post(reverse('timings'))
+        self.assertNotIn(('posts:index', 'total'), timing.histograms())
+
+    def test_histograms_page_for_staff_only(self):
+        response = self.client.get(reverse('timings'))
+        self.assertEqual(response.status_code, 302)
+
+
+class HistogramTests(TestCase):
+    def test_quantiles(self):
+        histogram = timing.Histogram()
+        for value in [0.5] * 90 + [30] * 9 + [9000]:
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(0.5), 1)
+        self.assertEqual(histogram.quantile(0.95), 50)
+        self.assertIsNone(histogram.quantile(1))
@@ -0,0 +1,243 @@
+"""Куда ушло время запроса.
+
+RequestTimingMiddleware заводит на время запроса RequestTimings в
+contextvar. База, шаблоны, кэш и миниатюры дописывают туда своё время
+и счётчики через record(), timer() и cache_event(); вне запроса эти
+вызовы ничего не делают. В конце запроса итог уходит:
+
+* в заголовок Server-Timing - в режиме отладки и для сотрудников;
+* в строку JSON в логгере yatube.requests: INFO для всех запросов,
+  WARNING для медленных (settings.SLOW_REQUEST_MS);
+* в гистограммы процесса по адресам, если включено
+  settings.REQUEST_HISTOGRAMS; их показывает страница admin/timings/.
+
+Миниатюры в фоновой задаче (THUMBNAIL_ASYNC) в запрос не попадают.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+logger = logging.getLogger('yatube.requests')
+
+# Верхние границы корзин гистограммы, мс.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# Что показывать в Server-Timing: метрика -> описание. Заголовки
+# передаются в latin-1, поэтому описания латиницей.
+SERVER_TIMING_METRICS = {
+    'db': 'DB',
+    'template': 'Templates',
+    'thumbnails': 'Thumbnails',
+}
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Время и счётчики одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.counts = {}
+        self.cache = {}
+        # Запросы из core.parallel пишут сюда из нескольких потоков.
+        self._lock = threading.Lock()
+
+    def record(self, metric, seconds, count=1):
+        with self._lock:
+            self.durations[metric] = self.durations.get(metric, 0) + seconds
+            self.counts[metric] = self.counts.get(metric, 0) + count
+
+    def cache_event(self, name, event, count):
+        with self._lock:
+            events = self.cache.setdefault(name, {})
+            events[event] = events.get(event, 0) + count
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def ms(self, metric):
+        return round(self.durations.get(metric, 0) * 1000, 2)
+
+
+def record(metric, seconds, count=1):
+    timings = _current.get()
+    if timings is not None:
+        timings.record(metric, seconds, count)
+
+
+@contextmanager
+def timer(metric):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(metric, time.perf_counter() - started)
+
+
+def cache_event(name, event, count=1):
+    timings = _current.get()
+    if timings is not None:
+        timings.cache_event(name, event, count)
+
+
+def _time_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record('db', time.perf_counter() - started)
+
+
+def cache_totals(timings):
+    """Попадания и промахи кэша default, как их видит код сайта.
+
+    Многоуровневый кэш считает и свои события, и события общего
+    кэша под ним, поэтому берутся только счётчики верхнего уровня.
+    """
+    stats = getattr(caches['default'], 'stats', None)
+    events = timings.cache.get(getattr(stats, 'name', None), {})
+    hits = sum(
+        count for event, count in events.items() if event.endswith('hits')
+    )
+    return hits, events.get('misses', 0)
+
+
+class Histogram:
+    """Распределение времени по корзинам BUCKETS_MS, общее для потоков."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0
+
+    def observe(self, value_ms):
+        index = next(
+            (number for number, bound in enumerate(BUCKETS_MS)
+             if value_ms <= bound),
+            len(BUCKETS_MS)
+        )
+        with self._lock:
+            self.buckets[index] += 1
+            self.count += 1
+            self.total_ms += value_ms
+
+    def quantile(self, share):
+        """Верхняя граница корзины, в которую попал квантиль."""
+        with self._lock:
+            needed = self.count * share
+            seen = 0
+            for bound, count in zip(BUCKETS_MS + (None,), self.buckets):
+                seen += count
+                if count and seen >= needed:
+                    return bound
+        return None
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histograms():
+    """{(адрес, метрика): Histogram} для всех замеренных адресов."""
+    with _histograms_lock:
+        return dict(_histograms)
+
+
+def reset_histograms():
+    with _histograms_lock:
+        _histograms.clear()
+
+
+def observe(route, metric, value_ms):
+    with _histograms_lock:
+        histogram = _histograms.setdefault((route, metric), Histogram())
+    histogram.observe(value_ms)
+
+
+class RequestTimingMiddleware:
+    """Должен стоять первым, чтобы замерять и остальные middleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_time_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_ms = round(timings.elapsed() * 1000, 2)
+        route = self.route(request)
+        if self.show_header(request):
+            response['Server-Timing'] = self.server_timing(timings, total_ms)
+        self.log(request, response, route, timings, total_ms)
+        if settings.REQUEST_HISTOGRAMS:
+            observe(route, 'total', total_ms)
+            for metric in SERVER_TIMING_METRICS:
+                if metric in timings.durations:
+                    observe(route, metric, timings.ms(metric))
+        return response
+
+    def route(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match is not None else 'other'
+
+    def show_header(self, request):
+        user = getattr(request, 'user', None)
+        return settings.SERVER_TIMING_PUBLIC or (
+            user is not None and user.is_staff
+        )
+
+    def server_timing(self, timings, total_ms):
+        entries = []
+        for metric, description in SERVER_TIMING_METRICS.items():
+            if metric in timings.durations:
+                if metric == 'db':
+                    description += f', {timings.counts[metric]} queries'
+                entries.append(
+                    f'{metric};dur={timings.ms(metric)};'
+                    f'desc="{description}"'
+                )
+        hits, misses = cache_totals(timings)
+        if hits or misses:
+            entries.append(
+                f'cache;desc="Cache, {hits} hits, {misses} misses"'
+            )
+        entries.append(f'total;dur={total_ms};desc="Total"')
+        return ', '.join(entries)
+
+    def log(self, request, response, route, timings, total_ms):
+        hits, misses = cache_totals(timings)
+        line = {
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'total_ms': total_ms,
+            'db_ms': timings.ms('db'),
+            'db_queries': timings.counts.get('db', 0),
+            'template_ms': timings.ms('template'),
+            'thumbnails_ms': timings.ms('thumbnails'),
+            'cache_hits': hits,
+            'cache_misses': misses,
+        }
+        level = (
+            logging.WARNING if total_ms >= settings.SLOW_REQUEST_MS
+            else logging.INFO
+        )
+        logger.log(level, json.dumps(line, ensure_ascii=False))
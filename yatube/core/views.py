@@ -1,4 +1,8 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import redirect, render
+
+from . import jobs, timing
 
 
 def page_not_found(request, exception):
@@ -15,3 +19,44 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+def timings(request):
+    """Гистограммы времени запросов этого процесса по адресам."""
+    if request.method == 'POST':
+        timing.reset_histograms()
+        return redirect('timings')
+    routes = {}
+    for (route, metric), histogram in sorted(timing.histograms().items()):
+        routes.setdefault(route, {})[metric] = histogram
+    rows = []
+    for route, metrics in routes.items():
+        total = metrics['total']
+        rows.append({
+            'route': route,
+            'count': total.count,
+            'average': {
+                metric: histogram.total_ms / histogram.count
+                for metric, histogram in metrics.items()
+            },
+            'p50': total.quantile(0.5),
+            'p95': total.quantile(0.95),
+            'p99': total.quantile(0.99),
+            'buckets': total.buckets,
+        })
+    return render(request, 'core/timings.html', {
+        'title': 'Время запросов',
+        'rows': rows,
+        'bounds': timing.BUCKETS_MS,
+        'enabled': settings.REQUEST_HISTOGRAMS,
+    })
+
+
+@staff_member_required
+def jobs_metrics(request):
+    """Глубина очереди фоновых задач и их задержки."""
+    return render(request, 'core/jobs.html', {
+        'title': 'Фоновые задачи',
+        'rows': jobs.metrics(),
+    })
@@ -0,0 +1,267 @@
+"""JSON API для чтения лент: главная, группа, профиль и пост.
+
+Посты читаются через values() только с нужными колонками и
+превращаются в словари без объектов моделей. Клиент выбирает поля
+параметром fields (например ?fields=id,text,author), листает курсором
+из next. Ответ собирается потоком по одному посту и сжимается brotli
+или gzip (core.compression). Свежесть и 304 - те же, что у HTML-страниц.
+"""
+import json
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from core.compression import compressed
+from core.conditional import conditional_page
+from core.queries import query_budget
+from core.routers import replica_reads
+from yatube.settings import COMMENTS_PER_PAGE, NUMBER_OF_POSTS
+
+from . import freshness
+from .group_feed import get_group
+from .models import Comment, Post, User
+from .stats import get_stats
+from .utils import CURSOR_PARAM, KeysetPaginator
+
+FIELDS_PARAM = 'fields'
+# Поле ответа -> колонка values().
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'thumbnails': 'thumbnails',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+IMAGE_STORAGE = Post._meta.get_field('image').storage
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+class FieldError(ValueError):
+    pass
+
+
+def requested_fields(request, available):
+    """Поля из ?fields=, по умолчанию все; неизвестное поле - ошибка."""
+    raw = request.GET.get(FIELDS_PARAM)
+    if not raw:
+        return list(available)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown or not fields:
+        raise FieldError('Неизвестные поля: {}. Доступны: {}'.format(
+            ', '.join(unknown), ', '.join(available)
+        ))
+    return fields
+
+
+def _value(field, value):
+    if value is None:
+        return None
+    if field == 'image':
+        return IMAGE_STORAGE.url(value) if value else None
+    if field == 'thumbnails':
+        return json.loads(value) if value else {}
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def serialize(row, fields, columns):
+    return {
+        field: _value(field, row[columns[field]]) for field in fields
+    }
+
+
+def post_rows(posts, fields):
+    """values() постов только с нужными колонками.
+
+    pk и pub_date выбираются всегда: по ним строится курсор.
+    """
+    if 'comment_count' in fields:
+        posts = posts.with_comment_count()
+    columns = {'pk', 'pub_date'}
+    columns.update(POST_FIELDS[field] for field in fields)
+    return posts.values(*columns)
+
+
+def comment_rows(comments, fields):
+    columns = {'pk', 'created'}
+    columns.update(COMMENT_FIELDS[field] for field in fields)
+    return comments.values(*columns)
+
+
+def page_of(rows, per_page, cursor, key_field='pub_date'):
+    paginator = KeysetPaginator(rows, per_page, key_field=key_field)
+    return paginator.get_page(cursor)
+
+
+def next_url(request, page, path=None):
+    if not page.has_next():
+        return None
+    query = request.GET.copy()
+    query[CURSOR_PARAM] = page.paginator.next_cursor
+    return '{}?{}'.format(path or request.path, query.urlencode())
+
+
+def _stream(head, items, tail):
+    """Объект JSON по частям: head, список results по элементу, tail."""
+    yield ('{' + ''.join(
+        f'{_dumps(key)}:{_dumps(value)},' for key, value in head.items()
+    ) + '"results":[').encode()
+    for number, item in enumerate(items):
+        yield ((',' if number else '') + _dumps(item)).encode()
+    yield ('],' + ','.join(
+        f'{_dumps(key)}:{_dumps(value)}' for key, value in tail.items()
+    ) + '}').encode()
+
+
+def feed_response(request, posts, head=None):
+    """Страница постов потоком: {...head, results: [...], next: url}."""
+    try:
+        fields = requested_fields(request, POST_FIELDS)
+    except FieldError as error:
+        return error_response(str(error), 400)
+    # Страница выбирается сразу, пока действует маршрутизация
+    # запроса; потоком отдаётся только сериализация.
+    page = page_of(
+        post_rows(posts, fields), NUMBER_OF_POSTS,
+        request.GET.get(CURSOR_PARAM)
+    )
+    items = (serialize(row, fields, POST_FIELDS) for row in page)
+    return StreamingHttpResponse(
+        _stream(head or {}, items, {'next': next_url(request, page)}),
+        content_type='application/json'
+    )
+
+
+def error_response(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def not_found():
+    return error_response('Не найдено', 404)
+
+
+@query_budget(6)
+@compressed
+@replica_reads
+@conditional_page(freshness.index_changed)
+def index(request):
+    """Лента главной страницы."""
+    return feed_response(request, Post.objects.all())
+
+
+@query_budget(6)
+@compressed
+@replica_reads
+@conditional_page(freshness.group_changed)
+def group_posts(request, slug):
+    """Группа и её посты."""
+    group = get_group(slug)
+    if group is None:
+        return not_found()
+    return feed_response(request, group.posts.all(), {'group': {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }})
+
+
+@query_budget(8)
+@compressed
+@replica_reads
+@conditional_page(freshness.profile_changed)
+def profile(request, username):
+    """Автор со счётчиками и его посты."""
+    author = User.objects.filter(username=username).values(
+        'pk', 'username', 'first_name', 'last_name'
+    ).first()
+    if author is None:
+        return not_found()
+    stats = get_stats(author['pk'])
+    return feed_response(
+        request, Post.objects.filter(author_id=author['pk']),
+        {'author': {
+            'username': author['username'],
+            'full_name': ' '.join(filter(None, (
+                author['first_name'], author['last_name']
+            ))),
+            'posts_count': stats.posts_count,
+            'followers_count': stats.followers_count,
+            'following_count': stats.following_count,
+        }}
+    )
+
+
+@query_budget(6)
+@compressed
+@replica_reads
+@conditional_page(freshness.post_changed)
+def post_detail(request, post_id):
+    """Пост и первая страница его комментариев."""
+    try:
+        fields = requested_fields(request, POST_FIELDS)
+    except FieldError as error:
+        return error_response(str(error), 400)
+    row = post_rows(Post.objects.filter(pk=post_id), fields).first()
+    if row is None:
+        return not_found()
+    comments = page_of(
+        comment_rows(
+            Comment.objects.filter(post_id=post_id), list(COMMENT_FIELDS)
+        ),
+        COMMENTS_PER_PAGE,
+        None,
+        key_field='created'
+    )
+    # Параметр fields относится к посту, у комментариев поля все.
+    comments_path = reverse('api:post_comments', args=[post_id])
+    next_comments = None
+    if comments.has_next():
+        next_comments = '{}?{}'.format(comments_path, urlencode({
+            CURSOR_PARAM: comments.paginator.next_cursor
+        }))
+    return JsonResponse({
+        'post': serialize(row, fields, POST_FIELDS),
+        'comments': [
+            serialize(comment, COMMENT_FIELDS, COMMENT_FIELDS)
+            for comment in comments
+        ],
+        'comments_next': next_comments,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@query_budget(6)
+@compressed
+@replica_reads
+@conditional_page(freshness.post_changed)
+def post_comments(request, post_id):
+    """Следующие страницы комментариев поста."""
+    try:
+        fields = requested_fields(request, COMMENT_FIELDS)
+    except FieldError as error:
+        return error_response(str(error), 400)
+    if not Post.objects.filter(pk=post_id).exists():
+        return not_found()
+    page = page_of(
+        comment_rows(Comment.objects.filter(post_id=post_id), fields),
+        COMMENTS_PER_PAGE,
+        request.GET.get(CURSOR_PARAM),
+        key_field='created'
+    )
+    items = (serialize(row, fields, COMMENT_FIELDS) for row in page)
+    return StreamingHttpResponse(
+        _stream({}, items, {'next': next_url(request, page)}),
+        content_type='application/json'
+    )
@@ -0,0 +1,416 @@
+"""Нагрузочный замер страниц posts.urls на больших объёмах данных.
+
+seed() наполняет пустую базу пользователями, группами, постами,
+комментариями и подписками. Авторы, группы и комментируемые посты
+выбираются по закону Ципфа, поэтому у нескольких авторов десятки
+тысяч подписчиков, а у большинства - единицы, как на живом сайте.
+После вставки пересчитываются производные таблицы: статистика
+авторов, поисковый индекс и ленты подписок.
+
+measure() обходит все именованные адреса posts.urls и для каждого
+считает p50 и p99 времени ответа, число запросов к базе и пик
+выделенной памяти. compare() сравнивает результат с сохранённым
+эталоном и возвращает список ухудшений.
+"""
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from itertools import accumulate
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from . import search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+SCALE = {
+    'users': 100_000,
+    'groups': 200,
+    'posts': 1_000_000,
+    'comments': 500_000,
+    'follows_per_user': 5,
+}
+# Показатель степени в законе Ципфа: чем больше, тем сильнее перекос.
+SKEW = 1.1
+BATCH_SIZE = 10_000
+VOCABULARY_SIZE = 3000
+SYLLABLES = (
+    'ба', 'ве', 'го', 'ду', 'жи', 'за', 'ки', 'ло', 'ми', 'но',
+    'пу', 'ра', 'се', 'то', 'фу', 'ха', 'це', 'чи', 'ша', 'ют',
+)
+USERNAME = 'bench{}'
+# Допуски сравнения с эталоном: время шумит сильнее памяти, хвост
+# сильнее медианы, а число запросов не должно расти вовсе.
+TIME_TOLERANCE = {'p50_ms': 0.25, 'p99_ms': 0.5}
+TIME_SLACK_MS = 1.0
+MEMORY_TOLERANCE = 0.25
+
+
+def zipf_weights(count, skew=SKEW):
+    """Накопленные веса для random.choices: первые элементы популярнее."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def _insert(model, fields, rows):
+    """Пачками вставляет строки в обход save() и сигналов.
+
+    bulk_create не подходит: auto_now_add перезаписал бы даты, а
+    им нужно быть разнесёнными по году.
+    """
+    columns = [model._meta.get_field(name).column for name in fields]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(model._meta.db_table),
+        ', '.join(connection.ops.quote_name(column) for column in columns),
+        ', '.join(['%s'] * len(columns))
+    )
+    batch = []
+    with connection.cursor() as cursor:
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+def _dates(count, now):
+    """count возрастающих дат за последний год, в формате базы."""
+    step = timedelta(days=365) / max(count, 1)
+    start = now - timedelta(days=365)
+    for number in range(count):
+        yield connection.ops.adapt_datetimefield_value(start + step * number)
+
+
+def seed(scale=None, random_seed=0, stdout=None):
+    """Наполняет пустую базу данными в масштабе scale."""
+    scale = {**SCALE, **(scale or {})}
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    log = stdout.write if stdout is not None else (lambda message: None)
+    vocabulary = [
+        ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        for _ in range(VOCABULARY_SIZE)
+    ]
+    word_weights = zipf_weights(VOCABULARY_SIZE)
+
+    def text(low, high):
+        return ' '.join(rng.choices(
+            vocabulary, cum_weights=word_weights, k=rng.randint(low, high)
+        )).capitalize()
+
+    with transaction.atomic():
+        User.objects.bulk_create(
+            (
+                User(username=USERNAME.format(number), password='!')
+                for number in range(scale['users'])
+            )
+        )
+        Group.objects.bulk_create(
+            Group(
+                title=f'Группа {number}',
+                slug=f'bench-{number}',
+                description=text(5, 20)
+            )
+            for number in range(scale['groups'])
+        )
+        user_ids = list(User.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ))
+        group_ids = list(Group.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ))
+        log(f'Пользователей: {len(user_ids)}, групп: {len(group_ids)}')
+
+        user_weights = zipf_weights(len(user_ids))
+        group_weights = zipf_weights(len(group_ids))
+        # Самые пишущие авторы не совпадают с самыми читаемыми, иначе
+        # ленты подписчиков разрастаются до десятков миллионов строк.
+        writers = user_ids[:]
+        rng.shuffle(writers)
+        authors = rng.choices(
+            writers, cum_weights=user_weights, k=scale['posts']
+        )
+        _insert(
+            Post,
+            ('text', 'pub_date', 'author', 'group', 'image', 'thumbnails'),
+            (
+                (
+                    text(8, 60),
+                    pub_date,
+                    author_id,
+                    rng.choices(group_ids, cum_weights=group_weights)[0]
+                    if rng.random() < 0.6 else None,
+                    '',
+                    ''
+                )
+                for author_id, pub_date in zip(
+                    authors, _dates(scale['posts'], now)
+                )
+            )
+        )
+        post_ids = list(Post.objects.order_by('-pub_date').values_list(
+            'pk', flat=True
+        ))
+        log(f'Постов: {len(post_ids)}')
+
+        # Чаще комментируют свежие посты.
+        post_weights = zipf_weights(len(post_ids), skew=0.8)
+        _insert(
+            Comment,
+            ('post', 'author', 'text', 'created'),
+            (
+                (
+                    rng.choices(post_ids, cum_weights=post_weights)[0],
+                    rng.choice(user_ids),
+                    text(3, 30),
+                    created
+                )
+                for created in _dates(scale['comments'], now)
+            )
+        )
+        log(f'Комментариев: {scale["comments"]}')
+
+        follows = []
+        for user_id in user_ids:
+            count = min(
+                int(rng.expovariate(1 / scale['follows_per_user'])) + 1,
+                len(user_ids) - 1
+            )
+            authors = set(rng.choices(
+                user_ids, cum_weights=user_weights, k=count
+            ))
+            authors.discard(user_id)
+            follows.extend(
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in authors
+            )
+        Follow.objects.bulk_create(follows)
+        log(f'Подписок: {len(follows)}')
+
+    rebuild_derived(stdout)
+    return scale
+
+
+def rebuild_derived(stdout=None):
+    """Пересчитывает таблицы, которые обычно ведут сигналы.
+
+    Без stdout, как и seed(), ничего не выводит.
+    """
+    call_command('rebuild_author_stats', stdout=stdout or StringIO())
+    search.reindex()
+    timeline.rebuild()
+
+
+class Target:
+    """Что запрашивать у каждого адреса: данные выбираются после seed()."""
+
+    def __init__(self):
+        self.reader = Follow.objects.values('user').annotate(
+            follows=Count('pk')
+        ).order_by('-follows', 'user').values_list('user', flat=True)[0]
+        reader_name = User.objects.get(pk=self.reader).username
+        self.own_post = Post.objects.filter(
+            author_id=self.reader
+        ).values_list('pk', flat=True).first()
+        if self.own_post is None:
+            self.own_post = Post.objects.create(
+                author_id=self.reader, text='Пост читателя'
+            ).pk
+        popular = Follow.objects.values('author').annotate(
+            followers=Count('pk')
+        ).order_by('-followers', 'author').values_list('author', flat=True)
+        self.popular_name = User.objects.get(pk=popular[0]).username
+        # Подписка и отписка замеряются на авторе, которого читатель
+        # ещё не читает.
+        self.other_name = User.objects.exclude(
+            pk=self.reader
+        ).exclude(following__user=self.reader).values_list(
+            'username', flat=True
+        ).order_by('pk').first()
+        self.group_slug = Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total', 'pk').values_list('slug', flat=True)[0]
+        self.commented_post = Comment.objects.values('post').annotate(
+            total=Count('pk')
+        ).order_by('-total', 'post').values_list('post', flat=True)[0]
+        self.query = search.tokenize(
+            Post.objects.values_list('text', flat=True).order_by('pk')[0]
+        )[0]
+        self.routes = {
+            'index': ('get', reverse('posts:index'), None),
+            'search': ('get', reverse('posts:search'), {'q': self.query}),
+            'group_list': (
+                'get', reverse('posts:group_list', args=[self.group_slug]),
+                None
+            ),
+            'profile': (
+                'get', reverse('posts:profile', args=[self.popular_name]),
+                None
+            ),
+            'post_detail': (
+                'get',
+                reverse('posts:post_detail', args=[self.commented_post]),
+                None
+            ),
+            'post_comments': (
+                'get',
+                reverse('posts:post_comments', args=[self.commented_post]),
+                None
+            ),
+            'post_create': ('get', reverse('posts:post_create'), None),
+            'post_edit': (
+                'get', reverse('posts:post_edit', args=[self.own_post]), None
+            ),
+            'add_comment': (
+                'post',
+                reverse('posts:add_comment', args=[self.commented_post]),
+                {'text': 'Комментарий из замера'}
+            ),
+            'follow_index': ('get', reverse('posts:follow_index'), None),
+            'notifications': (
+                'get', reverse('posts:notifications'), None
+            ),
+            'notifications_read': (
+                'post', reverse('posts:notifications_read'), {}
+            ),
+            'profile_follow': (
+                'get', reverse('posts:profile_follow', args=[self.other_name]),
+                None
+            ),
+            'profile_unfollow': (
+                'get',
+                reverse('posts:profile_unfollow', args=[self.other_name]),
+                None
+            ),
+        }
+        self.client = Client()
+        self.client.force_login(User.objects.get(username=reader_name))
+
+
+def route_names():
+    """Имена всех адресов posts.urls."""
+    resolver = get_resolver()
+    namespace = resolver.namespace_dict['posts'][1]
+    return sorted(
+        name for name in namespace.reverse_dict if isinstance(name, str)
+    )
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+class QueryCounter:
+    """execute_wrapper, считающий запросы из любых потоков."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _request(target, name):
+    method, url, data = target.routes[name]
+    return getattr(target.client, method)(url, data)
+
+
+def measure(requests=200, warmup=3, memory_rounds=3, routes=None):
+    """Замеряет каждый адрес posts.urls requests раз.
+
+    Адреса чередуются внутри каждого круга, поэтому подписка и
+    отписка идут парой, а кэши прогреты так же, как на живом сайте.
+    tracemalloc замедляет код в разы, поэтому память меряется
+    отдельными кругами после замера времени.
+    """
+    target = Target()
+    missing = set(route_names()) - set(target.routes)
+    if missing:
+        raise ValueError(
+            'Не знаю, как замерить: {}'.format(', '.join(sorted(missing)))
+        )
+    names = routes or sorted(target.routes)
+    samples = {name: {'times': [], 'queries': [], 'memory': []}
+               for name in names}
+    statuses = {}
+    for round_number in range(warmup + requests):
+        for name in names:
+            # Обёртку соединения core.parallel передаёт своим потокам,
+            # поэтому учтены и запросы, выполненные одновременно.
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                started = time.perf_counter()
+                response = _request(target, name)
+                elapsed = time.perf_counter() - started
+            statuses[name] = response.status_code
+            if round_number >= warmup:
+                samples[name]['times'].append(elapsed * 1000)
+                samples[name]['queries'].append(queries.count)
+    for _ in range(memory_rounds):
+        for name in names:
+            tracemalloc.start()
+            try:
+                _request(target, name)
+                samples[name]['memory'].append(
+                    tracemalloc.get_traced_memory()[1] / 1024
+                )
+            finally:
+                tracemalloc.stop()
+    return {
+        name: {
+            'status': statuses[name],
+            'p50_ms': round(statistics.median(sample['times']), 2),
+            'p99_ms': round(percentile(sample['times'], 0.99), 2),
+            'queries': max(sample['queries']),
+            'memory_kb': round(max(sample['memory'], default=0), 1),
+        }
+        for name, sample in samples.items()
+    }
+
+
+def compare(results, baseline, time_tolerance=TIME_TOLERANCE,
+            memory_tolerance=MEMORY_TOLERANCE):
+    """Ухудшения результата относительно эталона списком строк."""
+    regressions = []
+    for name, expected in sorted(baseline.items()):
+        actual = results.get(name)
+        if actual is None:
+            regressions.append(f'{name}: адрес не замерен')
+            continue
+        if actual['status'] != expected['status']:
+            regressions.append(
+                f'{name}: ответ {actual["status"]} вместо '
+                f'{expected["status"]}'
+            )
+        if actual['queries'] > expected['queries']:
+            regressions.append(
+                f'{name}: запросов {actual["queries"]} вместо '
+                f'{expected["queries"]}'
+            )
+        for metric, tolerance in time_tolerance.items():
+            limit = expected[metric] * (1 + tolerance) + TIME_SLACK_MS
+            if actual[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {actual[metric]} больше '
+                    f'{limit:.2f}'
+                )
+        limit = expected['memory_kb'] * (1 + memory_tolerance)
+        if actual['memory_kb'] > limit:
+            regressions.append(
+                f'{name}: память {actual["memory_kb"]} КБ больше '
+                f'{limit:.1f} КБ'
+            )
+    return regressions
@@ -0,0 +1,64 @@
+"""Счётчики ссылок на файлы картинок постов.
+
+Хранилище картинок раскладывает файлы по хешу содержимого, и один
+файл может принадлежать нескольким постам. Файл и его миниатюры
+удаляются, только когда на него не осталось ни одного поста.
+"""
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from . import thumbnails
+from .models import ImageBlob, Post
+
+
+def count_refs(name):
+    """Сколько постов ссылается на файл, по таблице постов."""
+    return Post.objects.filter(image=name).count()
+
+
+def incref(name):
+    if not name:
+        return
+    with transaction.atomic():
+        if ImageBlob.objects.filter(name=name).update(refs=F('refs') + 1):
+            return
+    # Строки нет (файл загружен до появления счётчиков или строку уже
+    # собрали): пост сохранён, значит подсчёт по факту учтёт и его.
+    try:
+        with transaction.atomic():
+            ImageBlob.objects.create(name=name, refs=count_refs(name))
+    except IntegrityError:
+        incref(name)
+
+
+def decref(name):
+    """Уменьшает счётчик; файл без ссылок удаляется после коммита."""
+    if not name:
+        return
+    with transaction.atomic():
+        updated = ImageBlob.objects.filter(name=name, refs__gt=0).update(
+            refs=F('refs') - 1
+        )
+        if not updated:
+            ImageBlob.objects.update_or_create(
+                name=name, defaults={'refs': count_refs(name)}
+            )
+    transaction.on_commit(lambda: collect(name))
+
+
+def collect(name):
+    """Удаляет файл и его миниатюры, если ссылок на него больше нет.
+
+    Строка удаляется условием refs=0 одним запросом: если пост с той
+    же картинкой появился после decref(), файл останется.
+    """
+    deleted, _ = ImageBlob.objects.filter(name=name, refs=0).delete()
+    if not deleted:
+        return
+    try:
+        Post._meta.get_field('image').storage.delete(name)
+    except SuspiciousFileOperation:
+        # Путь вне MEDIA_ROOT: файл не из хранилища, трогать его нельзя.
+        return
+    thumbnails.delete_variants(name)
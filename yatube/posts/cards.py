@@ -0,0 +1,70 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+CARD_TEMPLATE = 'includes/post.html'
+
+
+def _version_key(kind, pk):
+    return f'post_card:{kind}:{pk}:version'
+
+
+def bump_version(kind, pk):
+    """Меняет версию поста, автора или группы.
+
+    Версия - случайный токен, а не счётчик: если кэш вытеснит ключ
+    версии, новая версия не совпадёт со старой, и устаревшая карточка
+    не всплывёт снова.
+    """
+    cache.set(_version_key(kind, pk), uuid.uuid4().hex[:12], None)
+
+
+def bump_versions(kind, pks):
+    """bump_version для многих объектов одним обращением к кэшу."""
+    cache.set_many(
+        {_version_key(kind, pk): uuid.uuid4().hex[:12] for pk in pks}, None
+    )
+
+
+def _versions(post):
+    keys = {
+        'post': _version_key('post', post.pk),
+        'author': _version_key('author', post.author_id),
+        'group': _version_key('group', post.group_id),
+    }
+    found = cache.get_many(keys.values())
+    versions = {}
+    for kind, key in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = uuid.uuid4().hex[:12]
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions[kind] = version
+    return versions
+
+
+def card_key(post, hide_group=False):
+    """Ключ карточки: id поста и версии поста, автора и группы."""
+    versions = _versions(post)
+    return 'post_card:{}:{}:{}:{}:{}'.format(
+        post.pk,
+        versions['post'],
+        versions['author'],
+        versions['group'],
+        int(bool(hide_group)),
+    )
+
+
+def render_card(post, hide_group=False):
+    """Карточка поста из кэша или свежеотрисованная."""
+    key = card_key(post, hide_group)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(
+            CARD_TEMPLATE, {'post': post, 'hide_group': hide_group}
+        )
+        cache.set(key, html, settings.POST_CARD_TIMEOUT)
+    return html
@@ -1,9 +1,25 @@
 from django import forms
 
 from .models import Post, Comment
+from .uploads import RejectedUpload
 
 
 class PostForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Отклонённые при загрузке файлы убираем из данных формы,
+        # чтобы поле не проверяло их заново, а причину отказа
+        # показываем как ошибку поля.
+        self.upload_errors = {
+            name: upload.reason
+            for name, upload in self.files.items()
+            if isinstance(upload, RejectedUpload)
+        }
+        if self.upload_errors:
+            self.files = self.files.copy()
+            for name in self.upload_errors:
+                del self.files[name]
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -17,6 +33,11 @@ class PostForm(forms.ModelForm):
             'image': 'Добавить изображение',
         }
 
+    def clean_image(self):
+        if 'image' in self.upload_errors:
+            raise forms.ValidationError(self.upload_errors['image'])
+        return self.cleaned_data['image']
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
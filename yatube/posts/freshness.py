@@ -0,0 +1,111 @@
+"""Время последнего изменения страниц для условных GET-запросов.
+
+Для каждой области (вся лента, пост, автор, группа) в ScopeChange
+хранится время последней правки, которая видна на её страницах.
+Сигналы обновляют его после коммита: иначе параллельный запрос мог
+бы получить новое время вместе со старым содержимым и закэшировать
+их вместе. View узнаёт свежесть страницы одним запросом к ScopeChange.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import group_feed
+from .models import Post, ScopeChange, User
+
+# Лента на главной: любой пост, комментарий или миниатюра.
+POSTS = 'posts'
+# Имена авторов и названия групп выводятся в карточках на любых страницах.
+USERS = 'users'
+GROUPS = 'groups'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def author_scope(user_id):
+    return f'author:{user_id}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def post_scopes(post):
+    """Области, на страницах которых виден пост."""
+    scopes = [POSTS, post_scope(post.pk), author_scope(post.author_id)]
+    if post.group_id is not None:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def _write(scopes, now):
+    ScopeChange.objects.bulk_create(
+        [ScopeChange(scope=scope, changed=now) for scope in scopes],
+        ignore_conflicts=True
+    )
+    ScopeChange.objects.filter(scope__in=scopes).update(changed=now)
+
+
+def touch(*scopes):
+    """Отмечает изменение областей после коммита текущей транзакции."""
+    scopes = sorted(set(scopes))
+    transaction.on_commit(lambda: _write(scopes, timezone.now()))
+
+
+def touch_now(scopes, batch_size=500):
+    """Отмечает изменение областей сразу: после записи в обход сигналов."""
+    scopes = sorted(set(scopes))
+    now = timezone.now()
+    for start in range(0, len(scopes), batch_size):
+        _write(scopes[start:start + batch_size], now)
+
+
+def last_changed(*scopes):
+    """Последнее изменение среди областей или None.
+
+    Отметки пишут только сигналы и миграция: GET может уйти на
+    реплику. Если об области ещё ничего не известно, страницу нельзя
+    сравнивать, и она отдаётся целиком.
+    """
+    found = dict(ScopeChange.objects.filter(scope__in=scopes).values_list(
+        'scope', 'changed'
+    ))
+    if len(found) < len(set(scopes)):
+        return None
+    return max(found.values())
+
+
+# Функции свежести для posts.views. Каждая делает не больше двух
+# коротких запросов (группа берётся из кэша posts.group_feed); если
+# объекта нет, возвращает None, и view ответит 404 сама.
+
+def index_changed(request):
+    return last_changed(POSTS, USERS, GROUPS)
+
+
+def group_changed(request, slug):
+    group = group_feed.get_group(slug)
+    if group is None:
+        return None
+    return last_changed(group_scope(group.pk), USERS)
+
+
+def profile_changed(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return last_changed(author_scope(author_id), GROUPS)
+
+
+def post_changed(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return last_changed(
+        post_scope(post_id), author_scope(author_id), USERS, GROUPS
+    )
@@ -0,0 +1,110 @@
+"""Кэш страницы группы: группа по slug и id постов первой страницы.
+
+Кэш обновляется при записи: сигналы удаляют устаревшие ключи сразу,
+а после коммита кладут в кэш свежие значения, чтобы первый читатель
+после правки не шёл в базу. С общим для процессов кэшем
+(settings.CACHE_WARMING_JOBS) первую страницу группы заполняет
+фоновая задача, а не запрос автора. Таймаут только освобождает память.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core import jobs
+from yatube.settings import NUMBER_OF_POSTS
+
+from .models import Group, Post
+
+# Значение в кэше для slug, по которому группы нет.
+MISSING = 'missing'
+
+
+def _group_key(slug):
+    return f'group_feed:slug:{slug}'
+
+
+def _page_key(group_id):
+    return f'group_feed:{group_id}:first_page'
+
+
+def _load_page_ids(group_id):
+    # На одну запись больше страницы: по ней видно, есть ли следующая.
+    return list(
+        Post.objects.filter(group_id=group_id).order_by(
+            '-pub_date', '-pk'
+        ).values_list('pk', flat=True)[:NUMBER_OF_POSTS + 1]
+    )
+
+
+def get_group(slug):
+    """Группа по slug из кэша или из базы; None, если её нет.
+
+    Отсутствие группы тоже кэшируется: на 404 проверка свежести и
+    view не ищут её в базе дважды. Создание группы сбрасывает ключ.
+    """
+    key = _group_key(slug)
+    group = cache.get(key)
+    if group is None:
+        group = Group.objects.filter(slug=slug).first()
+        if group is None:
+            cache.set(key, MISSING, settings.GROUP_MISSING_TIMEOUT)
+        else:
+            cache.set(key, group, settings.GROUP_FEED_TIMEOUT)
+    elif group == MISSING:
+        group = None
+    return group
+
+
+def first_page_ids(group_id):
+    """id постов первой страницы группы, от новых к старым."""
+    key = _page_key(group_id)
+    post_ids = cache.get(key)
+    if post_ids is None:
+        post_ids = _load_page_ids(group_id)
+        cache.set(key, post_ids, settings.GROUP_FEED_TIMEOUT)
+    return post_ids
+
+
+def refresh_first_page(group_id):
+    """Пост вошёл в группу, покинул её или удалён."""
+    if group_id is None:
+        return
+    cache.delete(_page_key(group_id))
+    if settings.CACHE_WARMING_JOBS:
+        jobs.enqueue('posts.warm_group_feed', group_id)
+    else:
+        transaction.on_commit(lambda: warm_first_page(group_id))
+
+
+def warm_first_page(group_id):
+    cache.set(
+        _page_key(group_id), _load_page_ids(group_id),
+        settings.GROUP_FEED_TIMEOUT
+    )
+
+
+def refresh_group(group, old_slug=None):
+    """Группу изменили: описание по новому slug, старый slug забыт."""
+    if old_slug and old_slug != group.slug:
+        cache.delete(_group_key(old_slug))
+    cache.delete(_group_key(group.slug))
+    transaction.on_commit(lambda: cache.set(
+        _group_key(group.slug), group, settings.GROUP_FEED_TIMEOUT
+    ))
+
+
+def refresh_groups(groups):
+    """Группы созданы разом (bulk_create): сигналов не было.
+
+    Сбрасывает и отметку MISSING для их slug, иначе адрес новой группы
+    отдавал бы 404 до GROUP_MISSING_TIMEOUT.
+    """
+    groups = {_group_key(group.slug): group for group in groups}
+    cache.delete_many(list(groups))
+    transaction.on_commit(
+        lambda: cache.set_many(groups, settings.GROUP_FEED_TIMEOUT)
+    )
+
+
+def forget_group(group):
+    cache.delete_many([_group_key(group.slug), _page_key(group.pk)])
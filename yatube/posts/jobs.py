@@ -0,0 +1,48 @@
+"""Фоновые задачи постов для очереди core.jobs."""
+from django.conf import settings
+from django.core.management import call_command
+
+from core.jobs import job
+
+from . import group_feed, notifications, search, thumbnails, timeline
+
+
+@job('posts.generate_thumbnails', concurrency=settings.THUMBNAIL_WORKERS)
+def generate_thumbnails(post_id):
+    thumbnails.generate_for_post(post_id)
+
+
+@job('posts.notify_followers', priority=1, max_attempts=5, retry_delay=30,
+     concurrency=settings.NOTIFICATION_WORKERS)
+def notify_followers(post_id):
+    notifications.fan_out(post_id)
+
+
+@job('posts.push_post', priority=1)
+def push_post(post_id):
+    timeline.push_post(post_id)
+
+
+@job('posts.backfill_timeline', priority=1)
+def backfill_timeline(user_id, author_id):
+    timeline.backfill(user_id, author_id)
+
+
+@job('posts.backfill_followers')
+def backfill_followers(author_id):
+    timeline.backfill_followers(author_id)
+
+
+@job('posts.warm_group_feed', priority=2)
+def warm_group_feed(group_id):
+    group_feed.warm_first_page(group_id)
+
+
+@job('posts.reindex_group', concurrency=1)
+def reindex_group(group_id):
+    search.reindex_group(group_id)
+
+
+@job('posts.rebuild_author_stats', priority=-1, concurrency=1)
+def rebuild_author_stats():
+    call_command('rebuild_author_stats')
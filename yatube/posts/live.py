@@ -0,0 +1,249 @@
+"""Живая лента: новые посты приходят на главную и в подписки по SSE.
+
+Карточка нового поста отрисовывается один раз, после коммита, в
+процессе, который сохранил пост, и уходит в канал между процессами
+settings.LIVE_BACKPLANE. Канал отдаёт событие брокеру каждого
+процесса, брокер - всем подписчикам: очередям SSE-соединений
+приложения yatube.asgi. LocalBackplane - заглушка для одного
+процесса, сразу передающая событие своему брокеру; для нескольких
+процессов его заменит канал с тем же интерфейсом, например Redis
+pub/sub.
+
+Соединения держит ASGI-приложение без потока на клиента. Под WSGI
+те же адреса отвечают 204, и браузер не переподключается. Подписки
+пользователя читаются при подключении: новая подписка попадёт в поток
+после переподключения.
+"""
+import asyncio
+import json
+import threading
+from importlib import import_module
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+from core.asgi import cookies, header, run_sync, send_response
+
+from . import cards
+from .models import Follow, Post
+
+
+class Subscription:
+    """Очередь событий одного соединения."""
+
+    def __init__(self, broker, loop, accept=None):
+        self.broker = broker
+        self.loop = loop
+        self.accept = accept
+        self.queue = asyncio.Queue(settings.LIVE_QUEUE_SIZE)
+
+    def offer(self, event):
+        """Вызывается из любого потока."""
+        if self.accept is None or self.accept(event):
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        # Медленный клиент теряет самые старые карточки, а не память
+        # процесса.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """Раздача событий подписчикам внутри процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self, accept=None):
+        """Подписка для текущего цикла событий; accept(event) - фильтр."""
+        subscription = Subscription(
+            self, asyncio.get_running_loop(), accept
+        )
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.offer(event)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+broker = Broker()
+
+
+class LocalBackplane:
+    """Канал между процессами для одного процесса."""
+
+    def listening(self):
+        """Есть ли кому слать: иначе карточку не стоит рисовать."""
+        return len(broker) > 0
+
+    def publish(self, event):
+        broker.publish(event)
+
+
+_backplane = None
+
+
+def get_backplane():
+    global _backplane
+    if _backplane is None:
+        _backplane = import_string(settings.LIVE_BACKPLANE)()
+    return _backplane
+
+
+def post_event(post):
+    return {
+        'id': post.pk,
+        'author_id': post.author_id,
+        'html': cards.render_card(post),
+    }
+
+
+def publish_post(post_id):
+    """Рассылает карточку поста, если кто-то слушает."""
+    backplane = get_backplane()
+    if not backplane.listening():
+        return
+    post = Post.objects.for_feed().filter(pk=post_id).first()
+    if post is not None:
+        backplane.publish(post_event(post))
+
+
+def schedule(post):
+    post_id = post.pk
+    transaction.on_commit(lambda: publish_post(post_id))
+
+
+def backfill(after_id, author_ids=None):
+    """События постов новее after_id, пропущенных при переподключении."""
+    posts = Post.objects.for_feed().filter(pk__gt=after_id)
+    if author_ids is not None:
+        posts = posts.filter(author_id__in=author_ids)
+    return [
+        post_event(post)
+        for post in posts.order_by('pk')[:settings.LIVE_BACKFILL]
+    ]
+
+
+def format_event(event):
+    data = json.dumps({'id': event['id'], 'html': event['html']})
+    return f'id: {event["id"]}\nevent: post\ndata: {data}\n\n'.encode()
+
+
+def followed_authors(scope):
+    """id авторов, на которых подписан пользователь сессии, или None."""
+    session_key = cookies(scope).get(settings.SESSION_COOKIE_NAME)
+    if not session_key:
+        return None
+    engine = import_module(settings.SESSION_ENGINE)
+    user = get_user(SimpleNamespace(
+        session=engine.SessionStore(session_key)
+    ))
+    if not user.is_authenticated:
+        return None
+    return set(Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    ))
+
+
+async def stream(scope, receive, send, author_ids=None):
+    """Поток SSE: пропущенные посты по Last-Event-ID, затем новые."""
+    accept = None
+    if author_ids is not None:
+        def accept(event):
+            return event['author_id'] in author_ids
+    subscription = broker.subscribe(accept)
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {settings.LIVE_RETRY_MS}\n\n'.encode(),
+            'more_body': True,
+        })
+        last_id = header(scope, 'last-event-id')
+        if last_id.isdigit():
+            for event in await run_sync(backfill, int(last_id), author_ids):
+                await send({
+                    'type': 'http.response.body',
+                    'body': format_event(event),
+                    'more_body': True,
+                })
+        disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+        try:
+            while not disconnect.done():
+                event = asyncio.ensure_future(subscription.get())
+                await asyncio.wait(
+                    {event, disconnect},
+                    timeout=settings.LIVE_HEARTBEAT,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if event.done():
+                    body = format_event(event.result())
+                else:
+                    event.cancel()
+                    # Комментарий не виден браузеру, но держит прокси
+                    # и замечает отключившихся клиентов.
+                    body = b': ping\n\n'
+                if not disconnect.done():
+                    await send({
+                        'type': 'http.response.body',
+                        'body': body,
+                        'more_body': True,
+                    })
+        finally:
+            disconnect.cancel()
+    finally:
+        subscription.close()
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def index_stream(scope, receive, send):
+    await stream(scope, receive, send)
+
+
+async def follow_stream(scope, receive, send):
+    author_ids = await run_sync(followed_authors, scope)
+    if author_ids is None:
+        await send_response(send, 403)
+        return
+    await stream(scope, receive, send, author_ids)
+
+
+def unavailable(request):
+    """Под WSGI живой ленты нет: 204 останавливает EventSource."""
+    return HttpResponse(status=204)
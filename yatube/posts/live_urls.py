@@ -0,0 +1,20 @@
+from django.urls import path
+
+from . import live
+
+app_name = 'live'
+
+# Под ASGI эти адреса обслуживает yatube.asgi напрямую, сюда
+# попадают только запросы к WSGI-приложению.
+urlpatterns = [
+    path(
+        '',
+        live.unavailable,
+        name='index'
+    ),
+    path(
+        'follow/',
+        live.unavailable,
+        name='follow'
+    ),
+]
@@ -0,0 +1,114 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+from django.urls import reverse
+
+from core import concurrency
+from posts import benchmark
+from posts.models import Post
+
+from .benchmark_routes import SCALE_OPTIONS
+from .benchmark_routes import Command as RoutesCommand
+
+# Страницы для чтения, которые yatube.asgi обслуживает без потока на
+# время отдачи ответа.
+READ_ROUTES = ('index', 'group_list', 'profile', 'post_detail')
+
+
+class Command(RoutesCommand):
+    help = (
+        'Сравнивает, сколько медленных клиентов одновременно обслуживают '
+        'WSGI и ASGI при одинаковом числе потоков.'
+    )
+
+    def add_arguments(self, parser):
+        for name in SCALE_OPTIONS:
+            parser.add_argument(
+                '--' + name.replace('_', '-'),
+                type=int,
+                default=benchmark.SCALE[name],
+                help=f'Масштаб данных, по умолчанию {benchmark.SCALE[name]}.'
+            )
+        parser.add_argument(
+            '--database',
+            default=os.path.join(settings.BASE_DIR, 'db.benchmark.sqlite3'),
+            help='Файл базы для замера, общий с benchmark_routes.'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Не удалять базу после замера и взять готовую, если есть.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=10,
+            help='Сколько запросов подряд шлёт каждый клиент.'
+        )
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=100,
+            help='Сколько клиентов шлют запросы одновременно.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Потоков у сервера в обоих режимах.'
+        )
+        parser.add_argument(
+            '--client-delay',
+            type=float,
+            default=0.2,
+            help='Сколько секунд клиент принимает ответ.'
+        )
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['workers'] < 1:
+            raise CommandError('Нужен хотя бы один клиент и один поток.')
+        scale = {name: options[name] for name in SCALE_OPTIONS}
+        setup_test_environment()
+        old_name = self.use_database(options)
+        try:
+            self.clear_caches()
+            if not Post.objects.exists():
+                benchmark.seed(scale, stdout=self.stdout)
+            target = benchmark.Target()
+            paths = [target.routes[name][1] for name in READ_ROUTES]
+            paths.append(reverse('about:author'))
+            application = get_wsgi_application()
+            arguments = (
+                paths, options['clients'], options['requests'],
+                options['workers'], options['client_delay']
+            )
+            # Прогрев: кэши карточек и страниц одинаковы для обоих замеров.
+            concurrency.measure_wsgi(application, paths, 1, len(paths), 1, 0)
+            results = {
+                'wsgi': concurrency.measure_wsgi(application, *arguments),
+                'asgi': concurrency.measure_asgi(application, *arguments),
+            }
+        finally:
+            self.clear_caches()
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keep']
+            )
+            teardown_test_environment()
+        self.report(results)
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"режим":<8}{"запросов":>10}{"ошибок":>8}{"в секунду":>12}'
+            f'{"p50, мс":>10}{"p95, мс":>10}'
+        )
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:<8}{result["requests"]:>10}{result["errors"]:>8}'
+                f'{result["rps"]:>12}{result["p50_ms"]:>10}'
+                f'{result["p95_ms"]:>10}'
+            )
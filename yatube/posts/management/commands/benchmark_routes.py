@@ -0,0 +1,143 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from posts import benchmark
+from posts.models import Post
+
+SCALE_OPTIONS = ('users', 'groups', 'posts', 'comments', 'follows_per_user')
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет отдельную базу большим объёмом данных, замеряет все '
+        'адреса posts.urls и сравнивает результат с эталоном.'
+    )
+
+    def add_arguments(self, parser):
+        for name in SCALE_OPTIONS:
+            parser.add_argument(
+                '--' + name.replace('_', '-'),
+                type=int,
+                default=benchmark.SCALE[name],
+                help=f'Масштаб данных, по умолчанию {benchmark.SCALE[name]}.'
+            )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Сколько раз запросить каждый адрес: от числа зависит '
+                 'точность p99.'
+        )
+        parser.add_argument(
+            '--database',
+            default=os.path.join(settings.BASE_DIR, 'db.benchmark.sqlite3'),
+            help='Файл базы для замера.'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Не удалять базу после замера и взять готовую, если есть.'
+        )
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(
+                settings.BASE_DIR, 'benchmarks', 'routes.json'
+            ),
+            help='Файл эталона.'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Записать результат как новый эталон.'
+        )
+
+    def handle(self, *args, **options):
+        scale = {name: options[name] for name in SCALE_OPTIONS}
+        setup_test_environment()
+        old_name = self.use_database(options)
+        try:
+            self.clear_caches()
+            if Post.objects.exists():
+                self.stdout.write('Данные уже есть, наполнение пропущено')
+            else:
+                benchmark.seed(scale, stdout=self.stdout)
+            results = benchmark.measure(options['requests'])
+        finally:
+            self.clear_caches()
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keep']
+            )
+            teardown_test_environment()
+        self.report(results)
+        if options['save_baseline']:
+            self.save_baseline(options['baseline'], scale, results)
+        else:
+            self.check_baseline(options['baseline'], scale, results)
+
+    def use_database(self, options):
+        """Создаёт базу замера вместо основной, как это делают тесты."""
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер рассчитан на SQLite.')
+        old_name = connection.settings_dict['NAME']
+        connection.settings_dict['TEST']['NAME'] = options['database']
+        name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+            keepdb=options['keep']
+        )
+        # Чтения с реплик должны видеть те же данные.
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = name
+        return old_name
+
+    def clear_caches(self):
+        # Иначе кэш отдаст ленты и карточки из основной базы.
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"адрес":<18}{"код":>5}{"p50, мс":>10}{"p99, мс":>10}'
+            f'{"запросов":>10}{"память, КБ":>12}'
+        )
+        for name, result in sorted(results.items()):
+            self.stdout.write(
+                f'{name:<18}{result["status"]:>5}{result["p50_ms"]:>10}'
+                f'{result["p99_ms"]:>10}{result["queries"]:>10}'
+                f'{result["memory_kb"]:>12}'
+            )
+
+    def save_baseline(self, path, scale, results):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(
+                {'scale': scale, 'routes': results}, file,
+                indent=2, sort_keys=True
+            )
+            file.write('\n')
+        self.stdout.write(self.style.SUCCESS(f'Эталон записан в {path}'))
+
+    def check_baseline(self, path, scale, results):
+        if not os.path.exists(path):
+            raise CommandError(
+                f'Нет эталона {path}, запустите с --save-baseline.'
+            )
+        with open(path) as file:
+            baseline = json.load(file)
+        if baseline['scale'] != scale:
+            raise CommandError(
+                f'Эталон снят на другом объёме данных: {baseline["scale"]}.'
+            )
+        regressions = benchmark.compare(results, baseline['routes'])
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(line))
+            raise CommandError(f'Ухудшений: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Ухудшений нет'))
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в JSONL или CSV '
+        'без загрузки таблиц в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=transfer.FORMATS,
+            default='jsonl',
+            help='JSONL - все модели в одном файле, CSV - одна модель.'
+        )
+        parser.add_argument(
+            '--model',
+            action='append',
+            choices=transfer.MODELS,
+            dest='models',
+            help='Что выгружать, можно повторять; по умолчанию всё.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл выгрузки, по умолчанию стандартный вывод.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы за раз.'
+        )
+
+    def handle(self, *args, **options):
+        # Порядок моделей важен для загрузки: комментарии после постов.
+        models = [
+            model for model in transfer.MODELS
+            if model in (options['models'] or transfer.MODELS)
+        ]
+        if options['format'] == 'csv' and len(models) != 1:
+            raise CommandError(
+                'В CSV выгружается одна модель: укажите --model.'
+            )
+        if options['output']:
+            with open(options['output'], 'w', newline='') as file:
+                counts = self.export(file, models, options)
+        else:
+            counts = self.export(self.stdout, models, options)
+        # Итог в stderr: в stdout может идти сама выгрузка.
+        self.stderr.write(', '.join(
+            f'{model}: {count}' for model, count in counts.items()
+        ))
+
+    def export(self, file, models, options):
+        write = getattr(transfer, 'write_' + options['format'])
+        return {
+            model: write(file, model, transfer.export_records(
+                model, options['chunk_size']
+            ))
+            for model in models
+        }
@@ -0,0 +1,78 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из файлов JSONL '
+        'или CSV пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            help='Файлы в порядке зависимостей: группы, посты, комментарии, '
+                 'подписки.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=transfer.FORMATS,
+            help='По умолчанию по расширению файла.'
+        )
+        parser.add_argument(
+            '--model',
+            choices=transfer.MODELS,
+            help='Модель CSV-файла; по умолчанию по имени файла, '
+                 'например posts.csv.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей писать в одной транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        importer = transfer.Importer(options['batch_size'])
+        try:
+            for path in options['paths']:
+                self.load(importer, path, options)
+        finally:
+            # Записанные до ошибки пачки тоже должны попасть в ленты
+            # и статистику.
+            importer.finish()
+        for model in ('user',) + transfer.MODELS:
+            line = f'{model}: загружено {importer.created[model]}'
+            if importer.skipped[model]:
+                line += f', пропущено {importer.skipped[model]}'
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена'))
+
+    def load(self, importer, path, options):
+        with open(path, newline='') as file:
+            try:
+                importer.load(self.records(file, path, options))
+            except KeyError as error:
+                raise CommandError(f'{path}: в записи нет поля {error}')
+            except ValueError as error:
+                raise CommandError(f'{path}: {error}')
+
+    def records(self, file, path, options):
+        name, extension = os.path.splitext(os.path.basename(path))
+        file_format = options['format'] or extension.lstrip('.')
+        if file_format == 'jsonl':
+            return transfer.read_jsonl(file)
+        if file_format != 'csv':
+            raise CommandError(
+                f'{path}: неизвестный формат, укажите --format.'
+            )
+        model = options['model'] or name.rstrip('s')
+        if model not in transfer.MODELS:
+            raise CommandError(
+                f'{path}: неизвестная модель, укажите --model.'
+            )
+        return transfer.read_csv(file, model)
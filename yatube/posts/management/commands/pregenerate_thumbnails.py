@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import jobs
+from posts.models import Post
+from posts.thumbnails import generate_for_post, run_in_worker
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры для уже загруженных картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать миниатюры и у постов, где они уже есть.'
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Поставить задачи в очередь run_jobs вместо подготовки здесь.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.THUMBNAIL_WORKERS,
+            help='Сколько потоков готовят миниатюры, 0 - без потоков.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Сколько постов отдавать потокам за раз.'
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            posts = posts.filter(thumbnails='')
+        post_ids = posts.order_by('pk').values_list('pk', flat=True)
+        if options['enqueue']:
+            done = 0
+            for post_id in post_ids.iterator():
+                jobs.enqueue('posts.generate_thumbnails', post_id)
+                done += 1
+            self.stdout.write(self.style.SUCCESS(
+                f'Поставлено задач на миниатюры: {done}'
+            ))
+            return
+        if options['workers'] <= 0:
+            generate = partial(generate_for_post, force=options['all'])
+            done = sum(1 for _ in map(generate, post_ids))
+        else:
+            done = self.run_pool(post_ids, options)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано постов с картинками: {done}'
+        ))
+
+    def run_pool(self, post_ids, options):
+        run = partial(run_in_worker, force=options['all'])
+        done = 0
+        chunk = []
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for post_id in post_ids.iterator():
+                chunk.append(post_id)
+                if len(chunk) == options['chunk_size']:
+                    done += len(list(pool.map(run, chunk)))
+                    chunk = []
+            done += len(list(pool.map(run, chunk)))
+        return done
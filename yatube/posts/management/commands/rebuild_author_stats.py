@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts.models import AuthorStats, User
+from posts.stats import COUNTERS, compute_all
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает или проверяет счётчики статистики авторов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить сохранённые счётчики с реальными.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк статистики записывать за раз.'
+        )
+
+    def handle(self, *args, **options):
+        totals = compute_all()
+        if options['verify']:
+            return self.verify(totals)
+        self.rebuild(totals, options['batch_size'])
+
+    def expected(self, totals, user_id):
+        counts = totals.get(user_id, {})
+        return {counter: counts.get(counter, 0) for counter in COUNTERS}
+
+    def rebuild(self, totals, batch_size):
+        user_ids = User.objects.values_list('pk', flat=True)
+        # Django 2.2 не урезает batch_size до предела бэкенда, а SQLite
+        # не принимает больше 500 строк в одном INSERT.
+        batch_size = min(batch_size, connection.ops.bulk_batch_size(
+            AuthorStats._meta.concrete_fields, []
+        ))
+        with transaction.atomic():
+            AuthorStats.objects.all().delete()
+            AuthorStats.objects.bulk_create(
+                (
+                    AuthorStats(
+                        user_id=user_id, **self.expected(totals, user_id)
+                    )
+                    for user_id in user_ids.iterator()
+                ),
+                batch_size=batch_size
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано строк статистики: {AuthorStats.objects.count()}'
+        ))
+
+    def verify(self, totals):
+        mismatches = 0
+        fields = ('user_id',) + tuple(COUNTERS)
+        for row in AuthorStats.objects.values(*fields).iterator():
+            user_id = row.pop('user_id')
+            expected = self.expected(totals, user_id)
+            if row != expected:
+                mismatches += 1
+                self.stdout.write(
+                    f'user {user_id}: сохранено {row}, на самом деле '
+                    f'{expected}'
+                )
+        if mismatches:
+            raise CommandError(
+                f'Расхождений в статистике авторов: {mismatches}'
+            )
+        self.stdout.write(self.style.SUCCESS('Статистика авторов в порядке'))
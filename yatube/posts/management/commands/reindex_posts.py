@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import reindex, uses_fts
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько постов индексировать за раз.'
+        )
+
+    def handle(self, *args, **options):
+        done = reindex(options['batch_size'])
+        backend = 'FTS5' if uses_fts() else 'обратный индекс'
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {done} ({backend})'
+        ))
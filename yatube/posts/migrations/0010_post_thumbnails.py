@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_authorstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails',
+            field=models.TextField(blank=True, editable=False, help_text='JSON с адресами миниатюр, см. posts.thumbnails', verbose_name='Готовые миниатюры'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:14
+
+import sqlite3
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_fts_table(apps, schema_editor):
+    """Таблица FTS5 posts_search, заполненная уже опубликованными постами.
+
+    Без FTS5 поиск идёт по SearchTerm; его заполняет команда
+    reindex_posts.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        sqlite3.connect(':memory:').execute(
+            'CREATE VIRTUAL TABLE probe USING fts5(text)'
+        )
+    except sqlite3.Error:
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING '
+        "fts5(text, group_text, tokenize='unicode61 remove_diacritics 2')"
+    )
+    # Регистр FTS5 различать не умеет, а «ё» от «е» отличает: как и
+    # posts.search.normalize, приводим «ё» к «е».
+    schema_editor.execute(
+        "INSERT INTO posts_search (rowid, text, group_text) "
+        "SELECT post.id, "
+        "REPLACE(REPLACE(post.text, 'ё', 'е'), 'Ё', 'е'), "
+        "REPLACE(REPLACE(COALESCE(grp.title || ' ' || grp.description, ''), "
+        "'ё', 'е'), 'Ё', 'е') "
+        "FROM posts_post post "
+        "LEFT JOIN posts_group grp ON grp.id = post.group_id"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_auto_20261017_0710'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('weight', models.PositiveIntegerField(verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post')),
+            ],
+            options={
+                'verbose_name': 'Слово поиска',
+                'verbose_name_plural': 'Слова поиска',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_comment_post_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScopeChange',
+            fields=[
+                ('scope', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Область')),
+                ('changed', models.DateTimeField(verbose_name='Изменено')),
+            ],
+            options={
+                'verbose_name': 'Изменение страниц',
+                'verbose_name_plural': 'Изменения страниц',
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+from django.utils import timezone
+
+BATCH_SIZE = 500
+
+
+def seed_stats(apps, schema_editor):
+    """Строки статистики для пользователей, у которых их ещё нет."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    counters = {
+        'posts_count': (apps.get_model('posts', 'Post'), 'author'),
+        'comments_count': (apps.get_model('posts', 'Comment'), 'author'),
+        'followers_count': (apps.get_model('posts', 'Follow'), 'author'),
+        'following_count': (apps.get_model('posts', 'Follow'), 'user'),
+    }
+    totals = {}
+    for counter, (model, field) in counters.items():
+        rows = model.objects.order_by().values(field).annotate(
+            total=Count('pk')
+        )
+        for row in rows:
+            totals.setdefault(row[field], {})[counter] = row['total']
+    user_ids = User.objects.exclude(
+        pk__in=AuthorStats.objects.values('user_id')
+    ).values_list('pk', flat=True)
+    AuthorStats.objects.bulk_create(
+        [
+            AuthorStats(user_id=user_id, **totals.get(user_id, {}))
+            for user_id in user_ids
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def seed_scopes(apps, schema_editor):
+    """Отметки свежести для всех страниц: дальше их пишут сигналы."""
+    ScopeChange = apps.get_model('posts', 'ScopeChange')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    scopes = ['posts', 'users', 'groups']
+    scopes += [
+        f'author:{pk}' for pk in User.objects.values_list('pk', flat=True)
+    ]
+    scopes += [
+        f'group:{pk}' for pk in apps.get_model(
+            'posts', 'Group'
+        ).objects.values_list('pk', flat=True)
+    ]
+    scopes += [
+        f'post:{pk}' for pk in apps.get_model(
+            'posts', 'Post'
+        ).objects.values_list('pk', flat=True)
+    ]
+    now = timezone.now()
+    ScopeChange.objects.bulk_create(
+        [ScopeChange(scope=scope, changed=now) for scope in scopes],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+    """GET-запросы только читают статистику и отметки свежести."""
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0016_timeline_keyset'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_stats, migrations.RunPython.noop),
+        migrations.RunPython(seed_scopes, migrations.RunPython.noop),
+    ]
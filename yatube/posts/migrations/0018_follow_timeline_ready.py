@@ -0,0 +1,56 @@
+# Generated by Django 2.2.16 on 2026-10-17 09:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """Ленты подписок, появившихся до 0008, никто не раскладывал.
+
+    Каждой подписке на непопулярного автора достаются его последние
+    TIMELINE_BACKFILL_SIZE постов, как при новой подписке; посты
+    популярных авторов читаются при запросе ленты. После этого все
+    подписки готовы.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    tables = {
+        'timeline': apps.get_model('posts', 'TimelineEntry')._meta.db_table,
+        'follow': Follow._meta.db_table,
+        'post': apps.get_model('posts', 'Post')._meta.db_table,
+        'stats': apps.get_model('posts', 'AuthorStats')._meta.db_table,
+    }
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {timeline} (user_id, post_id, author_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+            'FROM {follow} follow '
+            'JOIN ('
+            '  SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+            '    PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+            '  ) AS position FROM {post}'
+            ') post ON post.author_id = follow.author_id '
+            'JOIN {stats} stats ON stats.user_id = follow.author_id '
+            'WHERE stats.followers_count <= %s AND post.position <= %s '
+            'AND NOT EXISTS ('
+            '  SELECT 1 FROM {timeline} entry '
+            '  WHERE entry.user_id = follow.user_id AND entry.post_id = post.id'
+            ')'.format(**tables),
+            [settings.TIMELINE_FANOUT_LIMIT, settings.TIMELINE_BACKFILL_SIZE]
+        )
+    Follow.objects.update(timeline_ready=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_seed_read_markers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='follow',
+            name='timeline_ready',
+            field=models.BooleanField(default=False, verbose_name='Лента заполнена'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-17 10:01
+
+import json
+
+from django.db import migrations
+
+
+def enqueue_orphans(apps, schema_editor):
+    """Рассылки без задачи раньше дорабатывала send_notifications."""
+    Job = apps.get_model('core', 'Job')
+    NotificationFanout = apps.get_model('posts', 'NotificationFanout')
+    queued = set(Job.objects.filter(
+        name='posts.notify_followers', status__in=('queued', 'running')
+    ).values_list('arguments', flat=True))
+    Job.objects.bulk_create(
+        [
+            Job(
+                name='posts.notify_followers',
+                arguments=json.dumps([post_id]),
+                priority=1
+            )
+            for post_id in NotificationFanout.objects.values_list(
+                'post_id', flat=True
+            )
+            if json.dumps([post_id]) not in queued
+        ],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_job'),
+        ('posts', '0018_follow_timeline_ready'),
+    ]
+
+    operations = [
+        migrations.RunPython(enqueue_orphans, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='notificationfanout',
+            name='claimed_until',
+        ),
+    ]
@@ -1,8 +1,27 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
+# Поля автора, которые не нужны для вывода карточки поста.
+FEED_DEFERRED_FIELDS = (
+    'author__password',
+    'author__last_login',
+    'author__is_superuser',
+    'author__email',
+    'author__is_staff',
+    'author__is_active',
+    'author__date_joined',
+    'group__description',
+)
+
 
 class Group(models.Model):
     title = models.CharField(
@@ -25,6 +44,25 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def with_comment_count(self):
+        """Число комментариев в поле comment_count.
+
+        Комментарии считаются подзапросом, а не JOIN с GROUP BY: иначе
+        база группирует все посты, прежде чем отрезать страницу.
+        """
+        comments = Comment.objects.filter(post=OuterRef('pk')).order_by(
+        ).values('post').annotate(total=Count('pk')).values('total')
+        return self.annotate(comment_count=Coalesce(Subquery(comments), 0))
+
+    def for_feed(self):
+        """Посты для ленты: автор и группа одним запросом,
+        число комментариев в поле comment_count."""
+        return self.select_related('author', 'group').defer(
+            *FEED_DEFERRED_FIELDS
+        ).with_comment_count()
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
@@ -54,17 +92,39 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        blank=True,
+        db_index=True,
+        storage=ContentAddressedStorage()
+    )
+    thumbnails = models.TextField(
+        'Готовые миниатюры',
+        blank=True,
+        editable=False,
+        help_text='JSON с адресами миниатюр, см. posts.thumbnails'
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'], name='post_author_pub_date'
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def thumbnail_urls(self):
+        """Миниатюры по именам из settings.POST_THUMBNAILS."""
+        if not self.thumbnails:
+            return {}
+        return json.loads(self.thumbnails)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -91,6 +151,11 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Коментарий'
         verbose_name_plural = 'Коментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created'], name='comment_post_created'
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -107,9 +172,221 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name="following"
     )
+    # Посты автора разложены по ленте подписчика (posts.timeline),
+    # до этого они подмешиваются в ленту при чтении.
+    timeline_ready = models.BooleanField(
+        default=False,
+        verbose_name='Лента заполнена'
+    )
 
     class Meta:
         constraints = [models.UniqueConstraint(fields=['user', 'author'],
                                                name='unique_following')]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [models.UniqueConstraint(fields=['user', 'post'],
+                                               name='unique_timeline_post')]
+        indexes = [models.Index(fields=['user', '-pub_date', '-post'],
+                                name='timeline_user_pub_date_post')]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        'Постов',
+        default=0
+    )
+    comments_count = models.PositiveIntegerField(
+        'Комментариев',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        'Подписок',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class ImageBlob(models.Model):
+    name = models.CharField(
+        'Файл',
+        max_length=100,
+        primary_key=True
+    )
+    refs = models.PositiveIntegerField(
+        'Ссылок',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
+
+
+class SearchTerm(models.Model):
+    """Строка обратного индекса поиска: слово и пост, где оно встречается.
+
+    Используется, только если в SQLite нет FTS5 или база не SQLite,
+    см. posts.search.
+    """
+    term = models.CharField(
+        'Слово',
+        max_length=64
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    weight = models.PositiveIntegerField(
+        'Вес'
+    )
+
+    class Meta:
+        verbose_name = 'Слово поиска'
+        verbose_name_plural = 'Слова поиска'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'], name='unique_search_term'
+            ),
+        ]
+
+
+class ScopeChange(models.Model):
+    """Время последнего изменения страниц одной области.
+
+    Область - строка вида posts, post:<id>, author:<id>, group:<id>,
+    см. posts.freshness.
+    """
+    scope = models.CharField(
+        'Область',
+        max_length=64,
+        primary_key=True
+    )
+    changed = models.DateTimeField(
+        'Изменено'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение страниц'
+        verbose_name_plural = 'Изменения страниц'
+
+    def __str__(self):
+        return self.scope
+
+
+class Notification(models.Model):
+    """Уведомление подписчика о новом посте, см. posts.notifications."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Пост'
+    )
+    created = models.DateTimeField(
+        'Создано',
+        auto_now_add=True
+    )
+    is_read = models.BooleanField(
+        'Прочитано',
+        default=False
+    )
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        constraints = [models.UniqueConstraint(fields=['user', 'post'],
+                                               name='unique_notification')]
+        indexes = [
+            models.Index(
+                fields=['user', 'is_read'], name='notification_unread'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class NotificationFanout(models.Model):
+    """Ход рассылки уведомлений о посте.
+
+    last_follow_id - последняя обработанная подписка, с неё продолжит
+    повтор задачи posts.notify_followers (core.jobs), если эта упадёт.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пост'
+    )
+    last_follow_id = models.PositiveIntegerField(
+        'Последняя подписка',
+        default=0
+    )
+    created = models.DateTimeField(
+        'Поставлена',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'Рассылка уведомлений'
+        verbose_name_plural = 'Рассылки уведомлений'
+
+    def __str__(self):
+        return str(self.post_id)
@@ -0,0 +1,306 @@
+"""Полнотекстовый поиск по постам.
+
+Индексируется текст поста и название с описанием его группы. В SQLite
+с FTS5 индекс - виртуальная таблица posts_search с rowid = id поста,
+ранжирование по bm25. Иначе используется обратный индекс в таблице
+SearchTerm: слово, пост и вес, ранжирование по tf-idf.
+
+Таблицу FTS5 создаёт и заполняет миграция 0012. Индекс обновляется
+сигналами вместе с постами, посты переименованной группы - фоновой
+задачей; целиком его пересобирает команда reindex_posts. Запросы
+к FTS5 идут в базу, которую роутер выбирает для постов: чтение - на
+реплику, запись - в основную.
+
+Каждое слово запроса ищется как префикс, посты должны содержать все
+слова.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import (BooleanField, Case, ExpressionWrapper, F,
+                              FloatField, IntegerField, Max, Q, Sum, When)
+from django.db.models.expressions import RawSQL
+
+from core import jobs
+
+from .models import Post, SearchTerm
+
+FTS_TABLE = 'posts_search'
+# Вес слова из текста поста против слова из названия или описания группы.
+TEXT_WEIGHT = 2
+GROUP_WEIGHT = 1
+MAX_QUERY_TERMS = 8
+WORD_RE = re.compile(r'\w+')
+
+
+_fts_tables = {}
+
+
+def _read_connection():
+    return connections[router.db_for_read(Post)]
+
+
+def _write_connection():
+    return connections[router.db_for_write(Post)]
+
+
+def uses_fts(connection=None):
+    """Есть ли в базе connection (по умолчанию основной) таблица FTS5."""
+    if connection is None:
+        connection = connections[DEFAULT_DB_ALIAS]
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[name]
+
+
+def normalize(text):
+    # unicode61 не считает «ё» буквой «е» с диакритикой.
+    return text.lower().replace('ё', 'е')
+
+
+def tokenize(text):
+    return WORD_RE.findall(normalize(text))
+
+
+def _documents(posts):
+    """(id, текст, текст группы) для постов с подгруженной группой."""
+    for post in posts:
+        group_text = ''
+        if post.group is not None:
+            group_text = f'{post.group.title} {post.group.description}'
+        yield post.pk, normalize(post.text), normalize(group_text)
+
+
+def _terms(post_id, text, group_text):
+    weights = Counter()
+    for term in tokenize(text):
+        weights[term[:64]] += TEXT_WEIGHT
+    for term in tokenize(group_text):
+        weights[term[:64]] += GROUP_WEIGHT
+    return [
+        SearchTerm(term=term, post_id=post_id, weight=weight)
+        for term, weight in weights.items()
+    ]
+
+
+def _write(documents):
+    documents = list(documents)
+    post_ids = [document[0] for document in documents]
+    connection = _write_connection()
+    with transaction.atomic(using=connection.alias):
+        if uses_fts(connection):
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                    [(post_id,) for post_id in post_ids]
+                )
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, text, group_text) '
+                    f'VALUES (%s, %s, %s)',
+                    documents
+                )
+            return
+        SearchTerm.objects.filter(post_id__in=post_ids).delete()
+        SearchTerm.objects.bulk_create(
+            term for document in documents for term in _terms(*document)
+        )
+
+
+def index_posts(posts):
+    """Переиндексирует посты; группы лучше подгрузить select_related."""
+    _write(_documents(posts))
+
+
+def remove_post(post_id):
+    connection = _write_connection()
+    if uses_fts(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+    else:
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+
+def _index_batches(posts, batch_size):
+    posts = posts.select_related('group').only(
+        'text', 'group__title', 'group__description'
+    ).order_by('pk')
+    done = 0
+    batch = []
+    for post in posts.iterator(chunk_size=batch_size):
+        batch.append(post)
+        if len(batch) == batch_size:
+            index_posts(batch)
+            done += len(batch)
+            batch = []
+    index_posts(batch)
+    return done + len(batch)
+
+
+def reindex(batch_size=500):
+    """Пересобирает индекс целиком, возвращает число постов."""
+    connection = _write_connection()
+    with transaction.atomic(using=connection.alias):
+        if uses_fts(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        else:
+            SearchTerm.objects.all().delete()
+        return _index_batches(Post.objects.all(), batch_size)
+
+
+def reindex_group(group_id, batch_size=500):
+    """Переиндексирует посты группы, возвращает их число."""
+    return _index_batches(Post.objects.filter(group_id=group_id), batch_size)
+
+
+def schedule_group(group_id):
+    """Ставит переиндексацию постов группы в очередь фоновых задач."""
+    jobs.enqueue('posts.reindex_group', group_id)
+
+
+class SearchResults:
+    """Найденные посты в порядке релевантности.
+
+    Отдаёт count() и срезы, поэтому подходит для Paginator: из базы
+    читаются только id нужной страницы, посты - одним запросом
+    Post.objects.for_feed().
+    """
+
+    def __init__(self, query):
+        self.terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        self._count = None
+        self._ranked = None
+
+    def __bool__(self):
+        return bool(self.terms)
+
+    def _fts_match(self):
+        return ' '.join(
+            '"{}"*'.format(term.replace('"', '""')) for term in self.terms
+        )
+
+    def _term_range(self, term):
+        # Диапазон вместо LIKE, чтобы работал индекс по слову.
+        return Q(term__gte=term, term__lt=term + '\uffff')
+
+    def _ranked_terms(self):
+        """Посты со всеми словами запроса и их tf-idf.
+
+        None, если какого-то слова нет в индексе. idf считается один
+        раз на объект: count() и страница используют одни и те же.
+        """
+        if self._ranked is None:
+            self._ranked = (self._rank_terms(),)
+        return self._ranked[0]
+
+    def _rank_terms(self):
+        total = Post.objects.count() or 1
+        matched = {}
+        score = []
+        for number, term in enumerate(self.terms):
+            found = self._term_range(term)
+            documents = SearchTerm.objects.filter(found).values(
+                'post'
+            ).distinct().count()
+            if not documents:
+                return None
+            idf = math.log(1 + total / documents)
+            matched[f'has_{number}'] = Max(Case(
+                When(found, then=1), default=0, output_field=IntegerField()
+            ))
+            score.append(When(found, then=ExpressionWrapper(
+                F('weight') * idf, output_field=FloatField()
+            )))
+        any_term = Q(
+            *[self._term_range(term) for term in self.terms], _connector=Q.OR
+        )
+        ranked = SearchTerm.objects.filter(any_term).values('post').annotate(
+            **matched,
+            score=Sum(Case(*score, default=0, output_field=FloatField())),
+        )
+        return ranked.filter(**{name: 1 for name in matched})
+
+    def count(self):
+        if self._count is None:
+            connection = _read_connection()
+            if not self.terms:
+                self._count = 0
+            elif uses_fts(connection):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT count(*) FROM {FTS_TABLE} '
+                        f'WHERE {FTS_TABLE} MATCH %s',
+                        [self._fts_match()]
+                    )
+                    self._count = cursor.fetchone()[0]
+            else:
+                ranked = self._ranked_terms()
+                self._count = 0 if ranked is None else ranked.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def _ids(self, offset, limit):
+        if not self.terms or limit <= 0:
+            return []
+        connection = _read_connection()
+        if uses_fts(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT rowid FROM {FTS_TABLE} '
+                    f'WHERE {FTS_TABLE} MATCH %s '
+                    f'ORDER BY bm25({FTS_TABLE}, %s, %s), rowid DESC '
+                    f'LIMIT %s OFFSET %s',
+                    [self._fts_match(), TEXT_WEIGHT, GROUP_WEIGHT,
+                     limit, offset]
+                )
+                return [row[0] for row in cursor.fetchall()]
+        ranked = self._ranked_terms()
+        if ranked is None:
+            return []
+        ranked = ranked.order_by('-score', '-post')
+        return list(
+            ranked.values_list('post', flat=True)[offset:offset + limit]
+        )
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        stop = self.count() if item.stop is None else item.stop
+        ids = self._ids(start, stop - start)
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def filter(self, queryset):
+        """Сужает queryset постов до найденных, без ранжирования."""
+        if not self.terms:
+            return queryset.none()
+        if uses_fts(connections[queryset.db]):
+            # RawSQL в pk__in даёт IN ((SELECT ...)), а это в SQLite
+            # скалярный подзапрос с одной строкой, поэтому условие
+            # целиком - логическая аннотация.
+            table = queryset.model._meta.db_table
+            return queryset.annotate(search_match=RawSQL(
+                f'"{table}"."id" IN (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s)',
+                [self._fts_match()],
+                output_field=BooleanField()
+            )).filter(search_match=True)
+        ranked = self._ranked_terms()
+        if ranked is None:
+            return queryset.none()
+        return queryset.filter(pk__in=ranked.values('post'))
+
+
+def search(query):
+    return SearchResults(query)
@@ -0,0 +1,294 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (blobs, cards, freshness, group_feed, live, notifications,
+               search, stats, thumbnails, timeline)
+from .models import Comment, Follow, Group, Post, User
+
+# Поля пользователя, которые выводятся в карточке поста.
+CARD_USER_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+# Счётчики обновляются раньше лент: лента решает, популярен ли автор,
+# по уже обновлённому числу подписчиков.
+@receiver(pre_save, sender=Post)
+def remember_saved_post(sender, instance, **kwargs):
+    """Запоминает прежних автора, группу и картинку поста.
+
+    Автор нужен, чтобы перенести счётчик постов, автор и группа - чтобы
+    обновить время изменения их страниц, картинка - чтобы сбросить
+    устаревшие миниатюры.
+    """
+    saved = None
+    if instance.pk is not None:
+        saved = Post.objects.filter(pk=instance.pk).values_list(
+            'author_id', 'group_id', 'image'
+        ).first()
+    (
+        instance._saved_author_id,
+        instance._saved_group_id,
+        instance._saved_image,
+    ) = saved or (None, None, None)
+    if instance.image.name != instance._saved_image:
+        instance.thumbnails = ''
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, posts_count=1)
+    elif instance._saved_author_id != instance.author_id:
+        stats.bump(instance._saved_author_id, posts_count=-1)
+        stats.bump(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    stats.bump(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    stats.bump(instance.author_id, comments_count=-1)
+
+
+@receiver(post_save, sender=User)
+def seed_stats(sender, instance, created, **kwargs):
+    """Строка статистики есть у каждого пользователя: GET её только читает."""
+    if created:
+        stats.seed(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, followers_count=1)
+        stats.bump(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    stats.bump(instance.author_id, followers_count=-1)
+    stats.bump(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def push_to_timelines(sender, instance, created, **kwargs):
+    """Новый пост попадает в ленты подписчиков автора."""
+    if created:
+        timeline.schedule_push(instance)
+
+
+@receiver(post_save, sender=Post)
+def notify_followers(sender, instance, created, **kwargs):
+    """Подписчики узнают о новом посте из фоновой рассылки."""
+    if created:
+        notifications.schedule(instance)
+
+
+@receiver(post_save, sender=Post)
+def publish_live_post(sender, instance, created, **kwargs):
+    """Открытые главная и подписки получают карточку нового поста."""
+    if created:
+        live.schedule(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """После подписки в ленту подтягиваются посты автора."""
+    if created:
+        timeline.schedule_backfill(instance)
+
+
+@receiver(pre_delete, sender=Follow)
+def remember_followers(sender, instance, **kwargs):
+    """Сколько подписчиков было у автора до отписки: для prune."""
+    instance._followers_before = Follow.objects.filter(
+        author_id=instance.author_id
+    ).count()
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    """После отписки посты автора уходят из ленты."""
+    timeline.prune(
+        instance.user_id, instance.author_id, instance._followers_before
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    cards.bump_version('post', instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_card(sender, instance, **kwargs):
+    """В карточке выводится число комментариев."""
+    cards.bump_version('post', instance.post_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, update_fields=None, **kwargs):
+    """Переименование автора меняет все его карточки разом.
+
+    Вход на сайт сохраняет только last_login и карточки не трогает.
+    """
+    if update_fields is None or CARD_USER_FIELDS & set(update_fields):
+        cards.bump_version('author', instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    cards.bump_version('group', instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def prepare_thumbnails(sender, instance, **kwargs):
+    """Новая картинка поста уходит на подготовку миниатюр."""
+    if instance.image and instance.image.name != instance._saved_image:
+        thumbnails.schedule(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, **kwargs):
+    """Ссылки на файлы картинок: одинаковые картинки хранятся один раз."""
+    if instance.image.name != (instance._saved_image or ''):
+        blobs.incref(instance.image.name)
+        blobs.decref(instance._saved_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    blobs.decref(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_posts([instance])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def reindex_group_posts(sender, instance, created, **kwargs):
+    """Название и описание группы ищутся вместе с её постами.
+
+    Посты переиндексирует фоновая задача и только после смены текста.
+    """
+    text = (instance.title, instance.description)
+    if not created and instance._saved_text != text:
+        search.schedule_group(instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    instance._post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def reindex_ungrouped_posts(sender, instance, **kwargs):
+    """Посты удалённой группы остаются без неё и без её текста в индексе."""
+    search.index_posts(
+        Post.objects.filter(pk__in=instance._post_ids).select_related('group')
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_post_pages(sender, instance, **kwargs):
+    """Пост виден на главной, у автора, в группе и на своей странице."""
+    scopes = freshness.post_scopes(instance)
+    # После переноса пост пропадает со страниц прежних автора и группы.
+    author_id = getattr(instance, '_saved_author_id', None)
+    group_id = getattr(instance, '_saved_group_id', None)
+    if author_id is not None:
+        scopes.append(freshness.author_scope(author_id))
+    if group_id is not None:
+        scopes.append(freshness.group_scope(group_id))
+    freshness.touch(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_commented_pages(sender, instance, **kwargs):
+    """Число комментариев есть в карточках, их число - в профиле автора."""
+    post = Post.objects.filter(pk=instance.post_id).only(
+        'author_id', 'group_id'
+    ).first()
+    scopes = [freshness.author_scope(instance.author_id)]
+    if post is not None:
+        scopes.extend(freshness.post_scopes(post))
+    freshness.touch(*scopes)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def touch_follow_pages(sender, instance, **kwargs):
+    """В профиле выводятся счётчики подписок и кнопка подписки."""
+    freshness.touch(
+        freshness.author_scope(instance.author_id),
+        freshness.author_scope(instance.user_id),
+    )
+
+
+@receiver(post_save, sender=User)
+def touch_user_pages(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or CARD_USER_FIELDS & set(update_fields):
+        freshness.touch(
+            freshness.USERS, freshness.author_scope(instance.pk)
+        )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def touch_group_pages(sender, instance, **kwargs):
+    freshness.touch(freshness.GROUPS, freshness.group_scope(instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def refresh_group_pages(sender, instance, created, **kwargs):
+    """Первая страница группы меняется, когда пост входит в неё или уходит."""
+    if created:
+        group_feed.refresh_first_page(instance.group_id)
+    elif instance._saved_group_id != instance.group_id:
+        group_feed.refresh_first_page(instance._saved_group_id)
+        group_feed.refresh_first_page(instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def refresh_deleted_post_group(sender, instance, **kwargs):
+    group_feed.refresh_first_page(instance.group_id)
+
+
+@receiver(pre_save, sender=Group)
+def remember_saved_group(sender, instance, **kwargs):
+    """Запоминает прежние адрес и текст группы для кэша и поиска."""
+    saved = None
+    if instance.pk is not None:
+        saved = Group.objects.filter(pk=instance.pk).values_list(
+            'slug', 'title', 'description'
+        ).first()
+    instance._saved_slug = saved and saved[0]
+    instance._saved_text = saved and saved[1:]
+
+
+@receiver(post_save, sender=Group)
+def refresh_cached_group(sender, instance, **kwargs):
+    group_feed.refresh_group(instance, instance._saved_slug)
+
+
+@receiver(post_delete, sender=Group)
+def forget_cached_group(sender, instance, **kwargs):
+    group_feed.forget_group(instance)
@@ -0,0 +1,104 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, Comment, Follow, Post
+
+# Счётчик -> (модель, поле с пользователем).
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'comments_count': (Comment, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def compute(user_id):
+    """Считает счётчики пользователя по исходным таблицам."""
+    return {
+        counter: model.objects.filter(**{field: user_id}).count()
+        for counter, (model, field) in COUNTERS.items()
+    }
+
+
+def compute_all():
+    """Счётчики всех пользователей: по одному GROUP BY на счётчик."""
+    totals = {}
+    for counter, (model, field) in COUNTERS.items():
+        rows = model.objects.filter(
+            **{f'{field}__isnull': False}
+        ).order_by().values(field).annotate(total=Count('pk'))
+        for row in rows.iterator():
+            totals.setdefault(row[field], {})[counter] = row['total']
+    return totals
+
+
+def recompute(user_ids, batch_size=500):
+    """Пересчитывает строки статистики только пользователей user_ids.
+
+    На каждую пачку пользователей - по одному GROUP BY на счётчик.
+    """
+    user_ids = sorted(set(user_ids))
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start:start + batch_size]
+        totals = {user_id: {} for user_id in chunk}
+        for counter, (model, field) in COUNTERS.items():
+            rows = model.objects.filter(
+                **{f'{field}__in': chunk}
+            ).order_by().values(field).annotate(total=Count('pk'))
+            for row in rows:
+                totals[row[field]][counter] = row['total']
+        with transaction.atomic():
+            AuthorStats.objects.filter(user_id__in=chunk).delete()
+            AuthorStats.objects.bulk_create([
+                AuthorStats(user_id=user_id, **counts)
+                for user_id, counts in totals.items()
+            ])
+
+
+def get_stats(user):
+    """Статистика автора только на чтение.
+
+    Строку создают запись пользователя и миграция. Если её всё же нет
+    (пользователь записан в обход сигналов), счётчики считаются по
+    исходным таблицам без записи: GET может уйти на реплику.
+    """
+    user_id = getattr(user, 'pk', user)
+    stats = AuthorStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        stats = AuthorStats(user_id=user_id, **compute(user_id))
+    return stats
+
+
+def seed(user_id):
+    """Строка статистики нового пользователя: все счётчики нулевые."""
+    AuthorStats.objects.bulk_create(
+        [AuthorStats(user_id=user_id)], ignore_conflicts=True
+    )
+
+
+def ensure(user_id):
+    """Создаёт строку статистики по исходным таблицам, если её нет."""
+    try:
+        with transaction.atomic():
+            AuthorStats.objects.create(user_id=user_id, **compute(user_id))
+    except IntegrityError:
+        pass
+
+
+def bump(user_id, **deltas):
+    """Атомарно сдвигает счётчики пользователя.
+
+    Если строки статистики нет, она считается целиком, уже с этой
+    правкой.
+    """
+    if user_id is None:
+        return
+    with transaction.atomic():
+        for counter, delta in deltas.items():
+            stats = AuthorStats.objects.filter(user_id=user_id)
+            if delta < 0:
+                stats = stats.filter(**{f'{counter}__gte': -delta})
+            updated = stats.update(**{counter: F(counter) + delta})
+            if not updated and delta > 0:
+                ensure(user_id)
+                return
@@ -0,0 +1,43 @@
+import hashlib
+import posixpath
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, где имя файла - SHA-256 его содержимого.
+
+    Файл кладётся в <каталог upload_to>/<2 символа хеша>/<хеш><расширение>.
+    Одинаковые картинки получают одно имя и хранятся один раз; сколько
+    постов ссылается на файл, считает posts.blobs.
+    """
+
+    @staticmethod
+    def hash_content(content):
+        hasher = hashlib.sha256()
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        content.seek(0)
+        return hasher.hexdigest()
+
+    def content_name(self, name, content):
+        # Хеш уже посчитан при потоковой загрузке (posts.uploads).
+        digest = getattr(content, 'content_hash', None)
+        if digest is None:
+            digest = self.hash_content(content)
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
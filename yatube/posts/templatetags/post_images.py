@@ -0,0 +1,45 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(post, slot, css_class=''):
+    """Выводит <picture> с вариантами миниатюры поста.
+
+    Браузер сам выбирает формат по <source type> и ширину по
+    srcset/sizes, поэтому телефону не достаётся картинка для десктопа.
+    Пока фоновая задача не подготовила миниатюры, выводит исходную
+    картинку в размере слота: запрос страницы картинку не открывает.
+    """
+    thumbnail = post.thumbnail_urls.get(slot)
+    if not thumbnail:
+        if not post.image:
+            return ''
+        width, height = settings.POST_THUMBNAILS[slot]['size']
+        return format_html(
+            '<img class="{}" src="{}" width="{}" height="{}" '
+            'style="object-fit: cover" loading="lazy" alt="">',
+            css_class, post.image.url, width, height
+        )
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (source['type'], source['srcset'], thumbnail['sizes'])
+            for source in thumbnail['sources']
+        )
+    )
+    return format_html(
+        '<picture>{}<img class="{}" src="{}" srcset="{}" sizes="{}" '
+        'width="{}" height="{}" loading="lazy" alt=""></picture>',
+        sources,
+        css_class,
+        thumbnail['url'],
+        thumbnail['srcset'],
+        thumbnail['sizes'],
+        thumbnail['width'],
+        thumbnail['height'],
+    )
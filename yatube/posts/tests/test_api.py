@@ -0,0 +1,146 @@
+import gzip
+import json
+
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from yatube.settings import COMMENTS_PER_PAGE, NUMBER_OF_POSTS
+
+from ..models import Comment, Follow, Group, Post, User
+
+USERNAME = 'Brienne'
+SLUG = 'tarth'
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            USERNAME, first_name='Бриенна', last_name='Тарт'
+        )
+        cls.reader = User.objects.create_user('Podrick')
+        cls.group = Group.objects.create(
+            title='Тарт', slug=SLUG, description='Сапфировый остров'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+            for number in range(NUMBER_OF_POSTS + 3)
+        ]
+        cls.post = cls.posts[-1]
+        for number in range(COMMENTS_PER_PAGE + 1):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Ответ {number}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        content = response.getvalue() if response.streaming else (
+            response.content
+        )
+        return json.loads(content)
+
+    def test_index_pages_by_cursor(self):
+        """Лента листается курсором из next до конца без повторов."""
+        url = reverse('api:index')
+        seen = []
+        while url:
+            data = self.get_json(url)
+            seen.extend(post['id'] for post in data['results'])
+            url = data['next']
+        self.assertEqual(
+            seen, [post.pk for post in reversed(self.posts)]
+        )
+
+    def test_post_fields(self):
+        data = self.get_json(reverse('api:index'))
+        self.assertEqual(data['results'][0], {
+            'id': self.post.pk,
+            'text': self.post.text,
+            'pub_date': self.post.pub_date.isoformat(),
+            'author': USERNAME,
+            'group': SLUG,
+            'image': None,
+            'thumbnails': {},
+            'comment_count': COMMENTS_PER_PAGE + 1,
+        })
+
+    def test_sparse_fields(self):
+        """?fields= выбирает поля ответа и колонки запроса."""
+        url = reverse('api:index')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_json(url, fields='id,author')
+        self.assertEqual(set(data['results'][0]), {'id', 'author'})
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('"posts_post"."text"', sql)
+        self.assertNotIn('posts_comment', sql)
+        # Поля сохраняются в ссылке на следующую страницу.
+        self.assertEqual(
+            set(self.get_json(data['next'])['results'][0]), {'id', 'author'}
+        )
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('api:index'), {'fields': 'email'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', json.loads(response.content)['error'])
+
+    def test_group_and_profile(self):
+        group = self.get_json(reverse('api:group_list', args=[SLUG]))
+        self.assertEqual(group['group']['title'], self.group.title)
+        self.assertEqual(len(group['results']), NUMBER_OF_POSTS)
+        profile = self.get_json(reverse('api:profile', args=[USERNAME]))
+        self.assertEqual(profile['author'], {
+            'username': USERNAME,
+            'full_name': 'Бриенна Тарт',
+            'posts_count': len(self.posts),
+            'followers_count': 1,
+            'following_count': 0,
+        })
+        self.assertEqual(len(profile['results']), NUMBER_OF_POSTS)
+
+    def test_post_detail_and_comments(self):
+        data = self.get_json(
+            reverse('api:post_detail', args=[self.post.pk]), fields='text'
+        )
+        self.assertEqual(data['post'], {'text': self.post.text})
+        self.assertEqual(len(data['comments']), COMMENTS_PER_PAGE)
+        rest = self.get_json(data['comments_next'])
+        self.assertEqual(len(rest['results']), 1)
+        self.assertEqual(rest['results'][0]['text'], 'Ответ 0')
+        self.assertIsNone(rest['next'])
+
+    def test_missing_objects(self):
+        for url in (
+            reverse('api:group_list', args=['missing']),
+            reverse('api:profile', args=['missing']),
+            reverse('api:post_detail', args=[0]),
+            reverse('api:post_comments', args=[0]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('error', json.loads(response.content))
+
+    def test_gzip(self):
+        """Ответ сжимается, если клиент принимает gzip."""
+        response = self.client.get(
+            reverse('api:index'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.getvalue()))
+        self.assertEqual(len(data['results']), NUMBER_OF_POSTS)
+
+    def test_not_modified(self):
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,45 @@
+from io import StringIO
+
+from django.test import TestCase
+
+from .. import benchmark
+
+SCALE = {
+    'users': 30,
+    'groups': 3,
+    'posts': 60,
+    'comments': 40,
+    'follows_per_user': 3,
+}
+
+
+class RouteBenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        benchmark.seed(SCALE, stdout=StringIO())
+
+    def test_measures_every_route(self):
+        """Замер проходит по всем адресам posts.urls без ошибок."""
+        results = benchmark.measure(requests=2, warmup=0, memory_rounds=1)
+        self.assertEqual(sorted(results), benchmark.route_names())
+        for name, result in results.items():
+            with self.subTest(route=name):
+                self.assertLess(result['status'], 400)
+                self.assertGreater(result['queries'], 0)
+                self.assertGreater(result['memory_kb'], 0)
+
+    def test_compare_reports_regressions(self):
+        """Лишний запрос, медленный ответ или новый код ответа - ухудшение."""
+        baseline = {'index': {
+            'status': 200, 'p50_ms': 10, 'p99_ms': 20,
+            'queries': 4, 'memory_kb': 100,
+        }}
+        self.assertEqual(benchmark.compare(baseline, baseline), [])
+        noisy = {'index': {**baseline['index'], 'p99_ms': 24}}
+        self.assertEqual(benchmark.compare(noisy, baseline), [])
+        worse = {'index': {
+            'status': 500, 'p50_ms': 30, 'p99_ms': 20,
+            'queries': 5, 'memory_kb': 200,
+        }}
+        self.assertEqual(len(benchmark.compare(worse, baseline)), 4)
+        self.assertEqual(len(benchmark.compare({}, baseline)), 1)
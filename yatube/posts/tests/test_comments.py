@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from yatube.settings import COMMENTS_PER_PAGE
+
+from ..models import Comment, Post, User
+
+USERNAME = 'Brienne'
+READER = 'Podrick'
+TEXT = 'Тестовый пост'
+COMMENTS_ALL = COMMENTS_PER_PAGE * 2 + 3
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(USERNAME)
+        cls.reader = User.objects.create_user(READER)
+        cls.post = Post.objects.create(text=TEXT, author=cls.author)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.reader, text=f'Комментарий {i}')
+            for i in range(COMMENTS_ALL)
+        )
+        cls.comments = list(
+            cls.post.comments.order_by('-created', '-pk')
+            .values_list('text', flat=True)
+        )
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_first_page_only(self):
+        """На странице поста только первая страница комментариев."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        page = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in page],
+            self.comments[:COMMENTS_PER_PAGE]
+        )
+        self.assertTrue(page.has_next())
+        self.assertContains(response, 'id="more-comments"')
+
+    def test_fragments_load_the_rest(self):
+        """Фрагменты по цепочке next_url отдают все остальные комментарии."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        loaded = [comment.text for comment in response.context['comments']]
+        url = '{}?cursor={}'.format(
+            reverse('posts:post_comments', args=[self.post.pk]),
+            response.context['comments'].paginator.next_cursor
+        )
+        while url:
+            response = self.client.get(url)
+            page = [comment.text for comment in response.context['comments']]
+            self.assertIn(page[-1], response.json()['html'])
+            loaded.extend(page)
+            url = response.json()['next_url']
+        self.assertEqual(loaded, self.comments)
+
+    def test_page_queries_do_not_depend_on_comments(self):
+        """Авторы комментариев подгружаются тем же запросом.
+
+        Два запроса из пяти - проверка свежести страницы.
+        """
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.client.get(url)
+        with self.assertNumQueries(5):
+            self.client.get(url)
+
+    def test_unknown_post(self):
+        response = self.client.get(reverse('posts:post_comments', args=[0]))
+        self.assertEqual(response.status_code, 404)
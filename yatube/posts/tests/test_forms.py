@@ -1,7 +1,7 @@
-from http import HTTPStatus
-
+import hashlib
 import shutil
 import tempfile
+from http import HTTPStatus
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -27,6 +27,12 @@ SMALL_GIF = (
     b'\x02\x00\x01\x00\x00\x02\x02\x0C'
     b'\x0A\x00\x3B'
 )
+SMALL_GIF_HASH = hashlib.sha256(SMALL_GIF).hexdigest()
+SMALL_GIF_NAME = f'posts/{SMALL_GIF_HASH[:2]}/{SMALL_GIF_HASH}.gif'
+# Та же картинка с другой палитрой: другое содержимое - другое имя.
+BIG_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\xFF\x00\x00', 1)
+BIG_GIF_HASH = hashlib.sha256(BIG_GIF).hexdigest()
+BIG_GIF_NAME = f'posts/{BIG_GIF_HASH[:2]}/{BIG_GIF_HASH}.gif'
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -93,7 +99,7 @@ class PostFormTests(TestCase):
             Post.objects.filter(
                 text=NEW_TEXT,
                 group=self.group.id,
-                image='posts/small.gif'
+                image=SMALL_GIF_NAME
             ).exists()
         )
 
@@ -102,7 +108,7 @@ class PostFormTests(TestCase):
         posts_count = Post.objects.count()
         uploaded = SimpleUploadedFile(
             name='big.gif',
-            content=SMALL_GIF,
+            content=BIG_GIF,
             content_type='image/gif'
         )
         form_data = {
@@ -123,9 +129,10 @@ class PostFormTests(TestCase):
             Post.objects.filter(
                 text=CHANGE_TEXT,
                 group=self.group,
-                image='posts/big.gif'
+                image=BIG_GIF_NAME
             ).exists()
         )
+        self.assertNotEqual(BIG_GIF_NAME, SMALL_GIF_NAME)
 
     def test_create_comment(self):
         """Валидная форма создает запись в Comment."""
@@ -0,0 +1,103 @@
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, ScopeChange, User
+
+AUTHOR = 'Davos'
+READER = 'Shireen'
+SLUG = 'onions'
+TEXT = 'Тестовый пост'
+
+
+class ConditionalGetTests(TransactionTestCase):
+    """Время изменения пишется после коммита, нужны настоящие транзакции."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(AUTHOR)
+        self.reader = User.objects.create_user(READER)
+        self.group = Group.objects.create(title='Луковый', slug=SLUG)
+        self.post = Post.objects.create(
+            text=TEXT, author=self.author, group=self.group
+        )
+        self.client = Client()
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=[SLUG]),
+            'profile': reverse('posts:profile', args=[AUTHOR]),
+            'post': reverse('posts:post_detail', args=[self.post.pk]),
+        }
+
+    def etags(self):
+        return {
+            name: self.client.get(url)['ETag']
+            for name, url in self.urls.items()
+        }
+
+    def assertNotModified(self, etags, names):
+        for name in names:
+            with self.subTest(page=name):
+                response = self.client.get(
+                    self.urls[name], HTTP_IF_NONE_MATCH=etags[name]
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def assertModified(self, etags, names):
+        for name in names:
+            with self.subTest(page=name):
+                response = self.client.get(
+                    self.urls[name], HTTP_IF_NONE_MATCH=etags[name]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_not_modified_without_page_queries(self):
+        """304 отдаётся по ScopeChange, без запросов страницы."""
+        etags = self.etags()
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                self.urls['post'], HTTP_IF_NONE_MATCH=etags['post']
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertNotModified(etags, self.urls)
+
+    def test_new_post_changes_its_pages(self):
+        etags = self.etags()
+        Post.objects.create(text=TEXT, author=self.author)
+        self.assertModified(etags, ['index', 'profile', 'post'])
+        self.assertNotModified(etags, ['group'])
+
+    def test_comment_changes_cards(self):
+        etags = self.etags()
+        Comment.objects.create(post=self.post, author=self.reader, text=TEXT)
+        self.assertModified(etags, self.urls)
+
+    def test_follow_changes_profile(self):
+        etags = self.etags()
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertModified(etags, ['profile', 'post'])
+        self.assertNotModified(etags, ['index', 'group'])
+
+    def test_group_rename(self):
+        etags = self.etags()
+        self.group.title = 'Чесночный'
+        self.group.save()
+        self.assertModified(etags, self.urls)
+
+    def test_missing_objects(self):
+        for url in (
+            reverse('posts:group_list', args=['missing']),
+            reverse('posts:profile', args=['missing']),
+            reverse('posts:post_detail', args=[0]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertNotIn('ETag', response)
+
+    def test_unknown_scope_is_not_written_on_read(self):
+        """Без отметки страница отдаётся целиком, GET ничего не пишет."""
+        ScopeChange.objects.filter(scope=f'post:{self.post.pk}').delete()
+        response = self.client.get(self.urls['post'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertFalse(ScopeChange.objects.filter(
+            scope=f'post:{self.post.pk}').exists())
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from yatube.settings import NUMBER_OF_POSTS
+
+from ..models import Group, Post, User
+
+USERNAME = 'Jorah'
+TEXT = 'Тестовый пост'
+
+
+class GroupFeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(USERNAME)
+        cls.group = Group.objects.create(title='Мирин', slug='meereen')
+        cls.other_group = Group.objects.create(title='Юнкай', slug='yunkai')
+        cls.post = Post.objects.create(
+            text=TEXT, author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def group_posts(self, group):
+        response = self.client.get(
+            reverse('posts:group_list', args=[group.slug])
+        )
+        return list(response.context['page_obj'])
+
+    def test_post_moves_between_groups(self):
+        """Правка поста со сменой группы обновляет обе страницы."""
+        self.assertEqual(self.group_posts(self.group), [self.post])
+        self.assertEqual(self.group_posts(self.other_group), [])
+        self.client.post(
+            reverse('posts:post_edit', args=[self.post.pk]),
+            {'text': TEXT, 'group': self.other_group.pk}
+        )
+        self.assertEqual(self.group_posts(self.group), [])
+        self.assertEqual(self.group_posts(self.other_group), [self.post])
+
+    def test_new_and_deleted_post(self):
+        self.group_posts(self.group)
+        post = Post.objects.create(
+            text=TEXT, author=self.user, group=self.group
+        )
+        self.assertEqual(self.group_posts(self.group), [post, self.post])
+        post.delete()
+        self.assertEqual(self.group_posts(self.group), [self.post])
+
+    def test_group_edit(self):
+        """Смена slug и названия группы видна сразу."""
+        self.group_posts(self.group)
+        old_url = reverse('posts:group_list', args=[self.group.slug])
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'slavers-bay'
+        group.title = 'Залив Работорговцев'
+        group.save()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        response = self.client.get(
+            reverse('posts:group_list', args=[group.slug])
+        )
+        self.assertContains(response, group.title)
+
+    def test_missing_group_looked_up_once(self):
+        """На 404 группа ищется в базе один раз, а не дважды."""
+        url = reverse('posts:group_list', args=['astapor'])
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        group = Group.objects.create(title='Астапор', slug='astapor')
+        response = self.client.get(url)
+        self.assertEqual(response.context['group'], group)
+
+    def test_cached_first_page_has_next(self):
+        Post.objects.bulk_create(
+            Post(text=TEXT, author=self.user, group=self.group)
+            for _ in range(NUMBER_OF_POSTS)
+        )
+        url = reverse('posts:group_list', args=[self.group.slug])
+        self.client.get(url)
+        page_obj = self.client.get(url).context['page_obj']
+        self.assertEqual(len(page_obj), NUMBER_OF_POSTS)
+        self.assertTrue(page_obj.has_next())
+        response = self.client.get(
+            url, {'cursor': page_obj.paginator.next_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), [self.post])
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from .. import live
+from ..models import Follow, Post, User
+
+AUTHOR = 'Daenerys'
+TEXT = 'Драконы вернулись'
+
+
+def open_stream(handler, publish=(), cookie=None, last_id=None):
+    """Подключается к потоку, публикует события, отдаёт тело ответа.
+
+    События публикуются из другого потока после начала ответа, поток
+    закрывается, когда пришли все ожидаемые карточки или пинг.
+    """
+    messages = []
+    headers = []
+    if cookie:
+        headers.append((b'cookie', cookie.encode()))
+    if last_id:
+        headers.append((b'last-event-id', str(last_id).encode()))
+
+    async def run():
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+            body = message.get('body', b'')
+            if body.startswith(b'retry:'):
+                publisher = threading.Thread(
+                    target=lambda: [live.broker.publish(e) for e in publish]
+                )
+                publisher.start()
+                publisher.join()
+            elif body.startswith(b'id:') or body.startswith(b': ping'):
+                disconnected.set()
+
+        scope = {'type': 'http', 'path': '/live/', 'headers': headers}
+        await asyncio.wait_for(handler(scope, receive, send), 5)
+
+    asyncio.run(run())
+    return messages
+
+
+def events(messages):
+    found = []
+    for message in messages[1:]:
+        body = message.get('body', b'').decode()
+        if body.startswith('id:'):
+            found.append(json.loads(body.split('data: ', 1)[1]))
+    return found
+
+
+def event(post_id, author_id):
+    return {'id': post_id, 'author_id': author_id, 'html': f'<p>{post_id}</p>'}
+
+
+@override_settings(LIVE_HEARTBEAT=0.05)
+class LiveStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(AUTHOR)
+
+    def test_stream_receives_published_card(self):
+        messages = open_stream(
+            live.index_stream, [event(1, self.author.pk)]
+        )
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/event-stream'), messages[0]['headers']
+        )
+        self.assertEqual(events(messages), [{'id': 1, 'html': '<p>1</p>'}])
+        self.assertEqual(len(live.broker), 0)
+
+    def test_heartbeat(self):
+        messages = open_stream(live.index_stream)
+        self.assertEqual(messages[-1]['body'], b': ping\n\n')
+
+    def test_slow_client_keeps_newest(self):
+        """Переполненная очередь теряет самые старые события."""
+        async def run():
+            subscription = live.broker.subscribe()
+            try:
+                for number in range(settings.LIVE_QUEUE_SIZE + 2):
+                    subscription.offer(event(number, self.author.pk))
+                await asyncio.sleep(0)
+                return (await subscription.get())['id']
+            finally:
+                subscription.close()
+
+        self.assertEqual(asyncio.run(run()), 2)
+
+    def test_publish_renders_card_once(self):
+        """Карточка рисуется из includes/post.html только при слушателях."""
+        post = Post.objects.create(text=TEXT, author=self.author)
+
+        async def run():
+            subscriptions = [live.broker.subscribe() for _ in range(2)]
+            with self.assertTemplateUsed('includes/post.html', count=1):
+                live.publish_post(post.pk)
+            try:
+                return [await item.get() for item in subscriptions]
+            finally:
+                for item in subscriptions:
+                    item.close()
+
+        with self.assertTemplateNotUsed('includes/post.html'):
+            live.publish_post(post.pk)
+        first, second = asyncio.run(run())
+        self.assertIs(first, second)
+        self.assertIn(TEXT, first['html'])
+
+    def test_follow_stream_requires_login(self):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(live.follow_stream(
+            {'type': 'http', 'headers': []}, None, send
+        ))
+        self.assertEqual(messages[0]['status'], 403)
+
+    def test_wsgi_fallback(self):
+        """Под WSGI адрес потока отвечает 204."""
+        for name in ('live:index', 'live:follow'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                self.assertEqual(response.status_code, 204)
+
+    def test_index_page_connects(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'data-url="{reverse("live:index")}"')
+        response = self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertNotContains(response, 'live-feed')
+
+
+@override_settings(LIVE_HEARTBEAT=0.05)
+class LiveFollowStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(AUTHOR)
+        self.other = User.objects.create_user('Cersei')
+        self.reader = User.objects.create_user('Jorah')
+        Follow.objects.create(user=self.reader, author=self.author)
+        client = Client()
+        client.force_login(self.reader)
+        self.cookie = '{}={}'.format(
+            settings.SESSION_COOKIE_NAME,
+            client.cookies[settings.SESSION_COOKIE_NAME].value
+        )
+
+    def test_only_followed_authors(self):
+        messages = open_stream(
+            live.follow_stream,
+            [event(1, self.other.pk), event(2, self.author.pk)],
+            cookie=self.cookie
+        )
+        self.assertEqual([item['id'] for item in events(messages)], [2])
+
+    def test_backfill_after_reconnect(self):
+        """По Last-Event-ID досылаются пропущенные посты подписок."""
+        seen = Post.objects.create(text='Старый', author=self.author)
+        Post.objects.create(text='Чужой', author=self.other)
+        missed = Post.objects.create(text=TEXT, author=self.author)
+        messages = open_stream(
+            live.follow_stream, cookie=self.cookie, last_id=seen.pk
+        )
+        found = events(messages)
+        self.assertEqual([item['id'] for item in found], [missed.pk])
+        self.assertIn(TEXT, found[0]['html'])
@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+from .. import notifications
+from ..models import Follow, Notification, NotificationFanout, Post, User
+
+AUTHOR = 'Melisandre'
+TEXT = 'Ночь темна и полна ужасов'
+
+
+@override_settings(NOTIFICATION_ASYNC=False, NOTIFICATION_BATCH_SIZE=2)
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(AUTHOR)
+        cls.readers = [
+            User.objects.create_user(f'reader{number}')
+            for number in range(5)
+        ]
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.readers[0])
+
+    def test_new_post_notifies_followers(self):
+        """Каждый подписчик получает одно уведомление, задача удаляется."""
+        post = Post.objects.create(text=TEXT, author=self.author)
+        self.assertEqual(
+            set(Notification.objects.filter(post=post).values_list(
+                'user', flat=True
+            )),
+            {reader.pk for reader in self.readers}
+        )
+        self.assertFalse(NotificationFanout.objects.exists())
+
+    def queue_post(self):
+        with override_settings(NOTIFICATION_ASYNC=True):
+            return Post.objects.create(text=TEXT, author=self.author)
+
+    def test_request_only_enqueues(self):
+        """Публикация только ставит задачу, рассылает обработчик."""
+        post = self.queue_post()
+        self.assertFalse(Notification.objects.exists())
+        self.assertTrue(NotificationFanout.objects.filter(post=post).exists())
+        jobs.work()
+        self.assertEqual(
+            Notification.objects.filter(post=post).count(), len(self.readers)
+        )
+        self.assertFalse(NotificationFanout.objects.exists())
+
+    def test_abandoned_task_resumes(self):
+        """Повтор задачи продолжается с последней подписки."""
+        post = self.queue_post()
+        second = Follow.objects.filter(author=self.author).order_by('pk')[1]
+        NotificationFanout.objects.filter(post=post).update(
+            last_follow_id=second.pk
+        )
+        jobs.work()
+        self.assertEqual(
+            Notification.objects.filter(post=post).count(),
+            len(self.readers) - 2
+        )
+        self.assertFalse(NotificationFanout.objects.exists())
+
+    def test_failing_task_backs_off_then_fails(self):
+        """Сбойная рассылка повторяется с паузой и не крутится по кругу."""
+        post = self.queue_post()
+        job = Job.objects.get(name='posts.notify_followers')
+        broken = mock.patch.object(
+            Notification.objects, 'bulk_create', side_effect=ValueError
+        )
+        with broken, self.assertLogs('yatube.jobs', 'WARNING'):
+            for attempt in range(1, job.max_attempts + 1):
+                jobs.work()
+                job.refresh_from_db()
+                self.assertEqual(job.attempts, attempt)
+                if job.status == Job.QUEUED:
+                    # Повтор отложен: проход без него уже ничего не делает.
+                    self.assertGreater(job.run_at, timezone.now())
+                    self.assertFalse(jobs.run_next())
+                    Job.objects.filter(pk=job.pk).update(
+                        run_at=timezone.now()
+                    )
+        self.assertEqual(job.status, Job.FAILED)
+        # Строка рассылки остаётся: после исправления задачу можно
+        # поставить заново, и она продолжит с последней подписки.
+        self.assertTrue(NotificationFanout.objects.filter(post=post).exists())
+
+    def test_finished_task_is_noop(self):
+        post = Post.objects.create(text=TEXT, author=self.author)
+        self.assertEqual(notifications.fan_out(post.pk), 0)
+
+    def test_notifications_page(self):
+        """Страница показывает непрочитанное по авторам и отмечает его."""
+        post = Post.objects.create(text=TEXT, author=self.author)
+        url = reverse('posts:notifications')
+        response = self.client.get(url)
+        self.assertEqual(response.context['unread_count'], 1)
+        self.assertEqual(response.context['authors'], [(AUTHOR, 1)])
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.client.post(reverse('posts:notifications_read'))
+        response = self.client.get(url)
+        self.assertEqual(response.context['unread_count'], 0)
+        self.assertEqual(list(response.context['page_obj']), [])
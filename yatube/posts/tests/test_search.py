@@ -0,0 +1,174 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core import jobs
+from core.models import Job
+
+from ..models import Group, Post, SearchTerm, User
+from ..search import search, uses_fts
+
+USERNAME = 'Samwell'
+TITLE = 'Цитадель'
+SLUG = 'citadel'
+DESCRIPTION = 'Мейстеры и свитки'
+
+
+class SearchTestsMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(USERNAME)
+        cls.group = Group.objects.create(
+            title=TITLE, slug=SLUG, description=DESCRIPTION
+        )
+        cls.dragons = Post.objects.create(
+            text='Драконы драконы и ещё драконы', author=cls.user
+        )
+        cls.dragon = Post.objects.create(
+            text='Один дракон над стеной', author=cls.user,
+            group=cls.group
+        )
+        cls.wall = Post.objects.create(
+            text='Ночной дозор на стене', author=cls.user
+        )
+
+    def found(self, query):
+        return list(search(query)[:10])
+
+    def test_prefix_and_all_terms(self):
+        """Слова ищутся как префиксы, пост должен содержать все слова."""
+        self.assertEqual(
+            set(self.found('дракон')), {self.dragons, self.dragon}
+        )
+        self.assertEqual(self.found('дракон стен'), [self.dragon])
+        self.assertEqual(self.found('единороги'), [])
+        self.assertEqual(self.found('  '), [])
+
+    def test_ranked(self):
+        """Пост, где слово встречается чаще, выше."""
+        self.assertEqual(self.found('драконы')[0], self.dragons)
+        self.assertEqual(search('дракон').count(), 2)
+
+    def test_yo_folded(self):
+        self.assertEqual(self.found('еще'), [self.dragons])
+
+    def test_group_text(self):
+        self.assertEqual(self.found('свитки'), [self.dragon])
+        self.group.description = 'Книги'
+        self.group.save()
+        self.assertEqual(self.found('свитки'), [self.dragon])
+        jobs.work()
+        self.assertEqual(self.found('свитки'), [])
+        self.assertEqual(self.found('книги'), [self.dragon])
+        self.group.delete()
+        self.assertEqual(self.found('книги'), [])
+
+    def test_group_reindexed_only_on_text_change(self):
+        self.group.slug = 'oldtown'
+        self.group.save()
+        self.assertFalse(Job.objects.filter(name='posts.reindex_group'))
+        self.group.title = 'Старомест'
+        self.group.save()
+        self.assertEqual(
+            Job.objects.filter(name='posts.reindex_group').count(), 1
+        )
+        jobs.work()
+        self.assertEqual(self.found('старомест'), [self.dragon])
+
+    def test_signals_keep_index(self):
+        post = Post.objects.create(text='Белые ходоки', author=self.user)
+        self.assertEqual(self.found('ходоки'), [post])
+        post.text = 'Мертвецы'
+        post.save()
+        self.assertEqual(self.found('ходоки'), [])
+        self.assertEqual(self.found('мертвецы'), [post])
+        post.delete()
+        self.assertEqual(self.found('мертвецы'), [])
+
+    def test_reindex_command(self):
+        Post.objects.filter(pk=self.wall.pk).update(text='Призраки')
+        call_command('reindex_posts', batch_size=2, stdout=StringIO())
+        self.assertEqual(self.found('призраки'), [self.wall])
+        self.assertEqual(self.found('дозор'), [])
+
+    def test_view(self):
+        response = Client().get(reverse('posts:search'), {'q': 'дракон'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        self.assertContains(response, self.dragon.text)
+        self.assertNotContains(response, self.wall.text)
+
+    def test_admin_search(self):
+        admin = User.objects.create_superuser('maester', 'm@example.com', 'x')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'стен'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.dragon, self.wall}
+        )
+
+
+class FTSSearchTests(SearchTestsMixin, TestCase):
+    """Поиск через FTS5 в SQLite."""
+
+    def test_backend(self):
+        self.assertTrue(uses_fts())
+
+
+class InvertedIndexSearchTests(SearchTestsMixin, TestCase):
+    """Запасной обратный индекс для баз без FTS5."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with mock.patch('posts.search.uses_fts', return_value=False):
+            super().setUpTestData()
+
+    def setUp(self):
+        patcher = mock.patch('posts.search.uses_fts', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_terms_stored(self):
+        self.assertEqual(
+            SearchTerm.objects.get(term='драконы', post=self.dragons).weight,
+            6
+        )
+
+
+class SearchMigrationTests(TransactionTestCase):
+    """Посты, опубликованные до поиска, попадают в индекс при миграции."""
+    before = [('posts', '0011_auto_20261017_0710')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_old_posts_indexed(self):
+        apps = self.migrate(self.before)
+        author = apps.get_model('auth', 'User').objects.create(
+            username=USERNAME
+        )
+        group = apps.get_model('posts', 'Group').objects.create(
+            title=TITLE, slug=SLUG, description=DESCRIPTION
+        )
+        post = apps.get_model('posts', 'Post').objects.create(
+            text='Ёлки у Стены', author=author, group=group
+        )
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        self.assertTrue(uses_fts())
+        for query in ('елки', 'стены', 'цитадель'):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    [found.pk for found in search(query)[:10]], [post.pk]
+                )
@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..models import AuthorStats, Comment, Follow, Post, User
+from ..stats import compute, get_stats
+
+AUTHOR = 'Tyrion'
+READER = 'Jaime'
+TEXT = 'Тестовый пост'
+
+
+class AuthorStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(AUTHOR)
+        cls.reader = User.objects.create_user(READER)
+
+    def assertStats(self, user):
+        stats = AuthorStats.objects.get(user=user)
+        for counter, expected in compute(user.pk).items():
+            with self.subTest(counter=counter):
+                self.assertEqual(getattr(stats, counter), expected)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        get_stats(self.author)
+        get_stats(self.reader)
+        post = Post.objects.create(text=TEXT, author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text=TEXT)
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(get_stats(self.author).posts_count, 1)
+        self.assertEqual(get_stats(self.author).followers_count, 1)
+        self.assertEqual(get_stats(self.reader).comments_count, 1)
+        self.assertEqual(get_stats(self.reader).following_count, 1)
+        follow.delete()
+        post.delete()
+        self.assertStats(self.author)
+        self.assertStats(self.reader)
+
+    def test_post_author_change_moves_counter(self):
+        get_stats(self.author)
+        get_stats(self.reader)
+        post = Post.objects.create(text=TEXT, author=self.author)
+        post.author = self.reader
+        post.save()
+        self.assertEqual(get_stats(self.author).posts_count, 0)
+        self.assertEqual(get_stats(self.reader).posts_count, 1)
+
+    def test_new_user_has_row(self):
+        self.assertTrue(AuthorStats.objects.filter(user=self.author).exists())
+
+    def test_missing_row_is_computed(self):
+        """Отсутствующая строка считается при чтении, но не записывается."""
+        Post.objects.create(text=TEXT, author=self.author)
+        AuthorStats.objects.filter(user=self.author).delete()
+        self.assertEqual(get_stats(self.author).posts_count, 1)
+        self.assertFalse(AuthorStats.objects.filter(user=self.author).exists())
+
+    def test_missing_row_is_created_on_write(self):
+        AuthorStats.objects.filter(user=self.author).delete()
+        Post.objects.create(text=TEXT, author=self.author)
+        Post.objects.create(text=TEXT, author=self.author)
+        self.assertStats(self.author)
+
+    def test_deleting_user_with_stats(self):
+        author = User.objects.create_user(f'{AUTHOR}_deleted')
+        get_stats(author)
+        get_stats(self.reader)
+        Follow.objects.create(user=self.reader, author=author)
+        author.delete()
+        self.assertEqual(get_stats(self.reader).following_count, 0)
+
+    def test_rebuild_command(self):
+        """Команда находит и исправляет расхождения."""
+        Post.objects.create(text=TEXT, author=self.author)
+        get_stats(self.author)
+        AuthorStats.objects.filter(user=self.author).update(posts_count=5)
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_author_stats', verify=True, stdout=StringIO()
+            )
+        call_command('rebuild_author_stats', stdout=StringIO())
+        call_command('rebuild_author_stats', verify=True, stdout=StringIO())
+        self.assertStats(self.author)
+        self.assertStats(self.reader)
@@ -0,0 +1,113 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from ..models import ImageBlob, Post, User
+from ..thumbnails import generate_for_post
+
+USERNAME = 'Bran'
+TEXT = 'Пост с картинкой'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+# Та же картинка с другой палитрой.
+OTHER_GIF = SMALL_GIF[:13] + b'\x01' + SMALL_GIF[14:]
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def create_post(user, content, name='small.gif'):
+    post = Post(text=TEXT, author=user)
+    post.image.save(name, ContentFile(content), save=False)
+    post.save()
+    post.refresh_from_db()
+    return post
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_duplicates_share_file(self):
+        """Одинаковые картинки под разными именами - один файл."""
+        first = create_post(self.user, SMALL_GIF, 'first.GIF')
+        second = create_post(self.user, SMALL_GIF, 'second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(ImageBlob.objects.get(name=first.image.name).refs, 2)
+        other = create_post(self.user, OTHER_GIF)
+        self.assertNotEqual(other.image.name, first.image.name)
+
+    def test_duplicates_share_thumbnails(self):
+        first = create_post(self.user, SMALL_GIF)
+        second = create_post(self.user, SMALL_GIF)
+        first.refresh_from_db()
+        self.assertTrue(first.thumbnails)
+        self.assertEqual(first.thumbnails, second.thumbnails)
+
+    def test_missing_row_is_computed(self):
+        """Строка счётчика, которой нет, считается по постам."""
+        first = create_post(self.user, SMALL_GIF)
+        ImageBlob.objects.all().delete()
+        create_post(self.user, SMALL_GIF)
+        self.assertEqual(ImageBlob.objects.get(name=first.image.name).refs, 2)
+
+    def test_image_change_moves_ref(self):
+        post = create_post(self.user, SMALL_GIF)
+        old_name = post.image.name
+        post.image.save('other.gif', ContentFile(OTHER_GIF))
+        self.assertEqual(ImageBlob.objects.get(name=old_name).refs, 0)
+        self.assertEqual(ImageBlob.objects.get(name=post.image.name).refs, 1)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class ImageCollectionTests(TransactionTestCase):
+    """Файлы удаляются после коммита, поэтому нужны настоящие транзакции."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(USERNAME)
+
+    def test_file_removed_with_last_post(self):
+        first = create_post(self.user, SMALL_GIF)
+        second = create_post(self.user, SMALL_GIF)
+        name = first.image.name
+        card = first.thumbnail_urls['card']['url']
+        thumb = card[len(settings.MEDIA_URL):]
+        first.delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(thumb))
+        second.delete()
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(thumb))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_regenerate_forced(self):
+        """С force миниатюры рисуются заново, а не берутся у двойника."""
+        post = create_post(self.user, SMALL_GIF)
+        thumb = post.thumbnail_urls['card']['url'][len(settings.MEDIA_URL):]
+        default_storage.delete(thumb)
+        generate_for_post(post.pk)
+        self.assertFalse(default_storage.exists(thumb))
+        generate_for_post(post.pk, force=True)
+        self.assertTrue(default_storage.exists(thumb))
@@ -0,0 +1,135 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import jobs
+from core.models import Job
+
+from ..models import Post, User
+
+USERNAME = 'Arya'
+TEXT = 'Пост с картинкой'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def create_post(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': TEXT,
+            'image': SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        })
+        return Post.objects.get(text=TEXT)
+
+    def test_upload_prepares_all_thumbnails(self):
+        """После загрузки картинки готовы все миниатюры."""
+        post = self.create_post()
+        self.assertEqual(
+            set(post.thumbnail_urls), set(settings.POST_THUMBNAILS)
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, post.thumbnail_urls['card']['url'])
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, post.thumbnail_urls['detail']['url'])
+
+    def test_variants_in_srcset(self):
+        """Каждая ширина слота есть в srcset запасного формата и WebP."""
+        post = self.create_post()
+        card = post.thumbnail_urls['card']
+        for width in settings.POST_THUMBNAILS['card']['widths']:
+            with self.subTest(width=width):
+                self.assertIn(f'{width}w', card['srcset'])
+        webp = [
+            source for source in card['sources']
+            if source['type'] == 'image/webp'
+        ]
+        self.assertEqual(len(webp), 1)
+        self.assertIn('.webp 650w', webp[0]['srcset'])
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(
+            response, settings.POST_THUMBNAILS['card']['sizes']
+        )
+
+    def test_edit_without_image_keeps_thumbnails(self):
+        post = self.create_post()
+        self.client.post(
+            reverse('posts:post_edit', args=[post.pk]), {'text': TEXT}
+        )
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_urls)
+
+    def test_backfill_command(self):
+        """Команда готовит миниатюры для старых постов."""
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).update(thumbnails='')
+        call_command('pregenerate_thumbnails', workers=0, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(
+            set(post.thumbnail_urls), set(settings.POST_THUMBNAILS)
+        )
+
+    @override_settings(THUMBNAIL_ASYNC=True)
+    def test_original_until_thumbnails_ready(self):
+        """Без миниатюр выводится исходная картинка, файл не открывается."""
+        post = self.create_post()
+        self.assertFalse(post.thumbnail_urls)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:post_detail', args=[post.pk])
+            )
+        self.assertContains(response, f'src="{post.image.url}"')
+        self.assertFalse([
+            query for query in queries if 'kvstore' in query['sql']
+        ])
+        jobs.work()
+        post = Post.objects.get(pk=post.pk)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, post.thumbnail_urls['detail']['url'])
+
+    def test_backfill_command_enqueues(self):
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).update(thumbnails='')
+        call_command('pregenerate_thumbnails', enqueue=True, stdout=StringIO())
+        self.assertEqual(Job.objects.filter(
+            name='posts.generate_thumbnails', status=Job.QUEUED
+        ).count(), 1)
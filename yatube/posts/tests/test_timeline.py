@@ -0,0 +1,185 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import jobs
+from core.models import Job
+
+from ..models import Follow, Post, TimelineEntry, User
+from ..timeline import timeline_page
+from ..utils import CURSOR_PARAM
+
+READER = 'Bilbo'
+SECOND_READER = 'Frodo'
+AUTHOR = 'Gandalf'
+TEXT = 'Тестовый пост'
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(READER)
+        cls.second_reader = User.objects.create_user(SECOND_READER)
+        cls.author = User.objects.create_user(AUTHOR)
+        cls.old_post = Post.objects.create(text=TEXT, author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self, user=None, token=None):
+        return list(timeline_page(user or self.reader, token))
+
+    def follow(self, user=None):
+        return Follow.objects.create(
+            user=user or self.reader, author=self.author
+        )
+
+    def test_follow_backfills_timeline(self):
+        """После подписки старые посты автора попадают в ленту."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        # До задачи посты подписки читаются при запросе ленты.
+        self.assertEqual(self.feed(), [self.old_post])
+        jobs.work()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        self.assertTrue(Follow.objects.get(user=self.reader).timeline_ready)
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_new_post_pushed_to_followers(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        self.follow()
+        jobs.work()
+        post = Post.objects.create(text=TEXT, author=self.author)
+        jobs.work()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+    def test_unfollow_prunes_timeline(self):
+        """После отписки посты автора уходят из ленты."""
+        self.follow()
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_read_on_demand(self):
+        """Посты популярного автора читаются без рассылки."""
+        self.follow()
+        self.follow(self.second_reader)
+        post = Post.objects.create(text=TEXT, author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_no_longer_popular_is_backfilled(self):
+        """Когда автор теряет популярность, его посты дозаписываются."""
+        self.follow()
+        follow = self.follow(self.second_reader)
+        jobs.work()
+        post = Post.objects.create(text=TEXT, author=self.author)
+        jobs.work()
+        follow.delete()
+        self.assertFalse(Follow.objects.get(user=self.reader).timeline_ready)
+        self.assertIn(post, self.feed())
+        jobs.work()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertIn(post, self.feed())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_unfollow_backfills_followers_in_job(self):
+        """Отписка не дозаписывает ленты других подписчиков в запросе."""
+        follow = self.follow()
+        self.follow(self.second_reader)
+        jobs.work()
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertTrue(Job.objects.filter(
+            name='posts.backfill_followers', status=Job.QUEUED
+        ).exists())
+        jobs.work()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.second_reader, post=self.old_post).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_bulk_unfollow_backfills_remaining_followers(self):
+        """Массовая отписка ниже порога не пропускает дозапись лент."""
+        third_reader = User.objects.create_user('Pippin')
+        self.follow()
+        self.follow(self.second_reader)
+        self.follow(third_reader)
+        jobs.work()
+        Follow.objects.filter(
+            author=self.author, user__in=[self.second_reader, third_reader]
+        ).delete()
+        self.assertFalse(Follow.objects.get(user=self.reader).timeline_ready)
+        jobs.work()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+
+    def test_pages_merge_pushed_and_popular_posts(self):
+        """Страницы по курсору сливают рассылку и популярных авторов."""
+        popular = User.objects.create_user('Saruman')
+        Follow.objects.create(user=self.reader, author=popular)
+        Follow.objects.create(user=self.second_reader, author=popular)
+        self.follow()
+        for number in range(8):
+            Post.objects.create(text=TEXT, author=self.author)
+            Post.objects.create(text=TEXT, author=popular)
+        expected = list(Post.objects.filter(
+            author__in=[self.author, popular]
+        ).order_by('-pub_date', '-pk'))
+        with self.settings(TIMELINE_FANOUT_LIMIT=1):
+            first = self.reader_client.get(reverse('posts:follow_index'))
+            page_obj = first.context['page_obj']
+            second = self.reader_client.get(
+                reverse('posts:follow_index'),
+                {CURSOR_PARAM: page_obj.paginator.next_cursor}
+            )
+        self.assertEqual(
+            list(page_obj) + list(second.context['page_obj']), expected
+        )
+        self.assertFalse(second.context['page_obj'].has_next())
+
+
+class TimelineMigrationTests(TransactionTestCase):
+    """Подписки, появившиеся до лент, получают ленту при миграции."""
+    before = [('posts', '0007_auto_20220422_1455')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_old_follows_backfilled(self):
+        apps = self.migrate(self.before)
+        OldUser = apps.get_model('auth', 'User')
+        reader = OldUser.objects.create(username=READER)
+        author = OldUser.objects.create(username=AUTHOR)
+        apps.get_model('posts', 'Follow').objects.create(
+            user=reader, author=author
+        )
+        post = apps.get_model('posts', 'Post').objects.create(
+            text=TEXT, author=author
+        )
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user_id=reader.pk, post_id=post.pk
+        ).exists())
+        page = timeline_page(User.objects.get(pk=reader.pk))
+        self.assertEqual([item.pk for item in page], [post.pk])
@@ -0,0 +1,207 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..cards import card_key
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      TimelineEntry, User)
+from ..search import search
+from ..transfer import Importer
+
+READER = 'Arya'
+AUTHOR = 'Jaqen'
+SLUG = 'braavos'
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(READER)
+        cls.author = User.objects.create_user(AUTHOR)
+        cls.group = Group.objects.create(
+            title='Браавос', slug=SLUG, description='Чёрно-белый дом'
+        )
+        cls.post = Post.objects.create(
+            text='Валар моргулис', author=cls.author, group=cls.group
+        )
+        cls.pub_date = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=cls.post.pk).update(pub_date=cls.pub_date)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Валар дохаэрис'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def export(self, name, *args):
+        path = os.path.join(self.directory, name)
+        call_command(
+            'export_posts', *args, output=path, stderr=StringIO()
+        )
+        return path
+
+    def wipe(self):
+        Group.objects.all().delete()
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+
+    def assert_restored(self):
+        post = Post.objects.get()
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.author, self.author)
+        self.assertEqual(post.group.slug, SLUG)
+        self.assertEqual(post.pub_date, self.pub_date)
+        comment = Comment.objects.get()
+        self.assertEqual(comment.post, post)
+        self.assertEqual(comment.author, self.reader)
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+        # Производные таблицы, которые обычно ведут сигналы.
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post
+        ).exists())
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(
+            list(search('моргулис').filter(Post.objects.all())), [post]
+        )
+
+    def test_jsonl_round_trip(self):
+        """Выгрузка JSONL загружается обратно со ссылками и датами."""
+        path = self.export('all.jsonl')
+        self.wipe()
+        call_command('import_posts', path, batch_size=1, stdout=StringIO())
+        self.assert_restored()
+
+    def test_csv_round_trip(self):
+        """CSV по файлу на модель; модель берётся из имени файла."""
+        paths = [
+            self.export(f'{model}s.csv', '--format', 'csv', '--model', model)
+            for model in ('group', 'post', 'comment', 'follow')
+        ]
+        self.wipe()
+        call_command('import_posts', *paths, stdout=StringIO())
+        self.assert_restored()
+
+    def test_csv_needs_single_model(self):
+        with self.assertRaises(CommandError):
+            self.export('all.csv', '--format', 'csv')
+
+    def test_import_creates_missing_authors(self):
+        """Неизвестный автор создаётся без возможности войти по паролю."""
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w') as file:
+            file.write(
+                '{"model": "post", "id": 1, "author": "Syrio", '
+                '"group": null, "text": "Не сегодня", "pub_date": null}\n'
+            )
+        call_command('import_posts', path, stdout=StringIO())
+        author = User.objects.get(username='Syrio')
+        self.assertFalse(author.has_usable_password())
+        self.assertTrue(Post.objects.filter(
+            author=author, text='Не сегодня'
+        ).exists())
+
+    def test_comment_without_imported_post_is_skipped(self):
+        path = os.path.join(self.directory, 'comments.jsonl')
+        with open(path, 'w') as file:
+            file.write(
+                '{"model": "comment", "post": 404, "author": "Arya", '
+                '"text": "Кто?", "created": null}\n'
+            )
+        output = StringIO()
+        call_command('import_posts', path, stdout=output)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertIn('comment: загружено 0, пропущено 1', output.getvalue())
+
+    def test_comment_without_author_is_reported(self):
+        path = os.path.join(self.directory, 'comments.jsonl')
+        with open(path, 'w') as file:
+            file.write(
+                f'{{"model": "comment", "post": {self.post.pk}, '
+                '"author": "", "text": "Кто?", "created": null}\n'
+            )
+        # Пост должен быть загружен в том же запуске.
+        posts = self.export('posts.jsonl', '--model', 'post')
+        with self.assertRaisesMessage(CommandError, "пустое поле 'author'"):
+            call_command('import_posts', posts, path, stdout=StringIO())
+
+    @override_settings(TIMELINE_BACKFILL_SIZE=1)
+    def test_finish_touches_only_imported_users(self):
+        """Статистика и ленты пересчитываются только у затронутых."""
+        other = User.objects.create_user('Syrio')
+        AuthorStats.objects.filter(user=other).update(posts_count=42)
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w') as file:
+            for day in (1, 2):
+                file.write(
+                    '{"model": "post", "author": "Jaqen", "group": null, '
+                    f'"text": "Пост {day}", '
+                    f'"pub_date": "2020-01-0{day}T00:00:00+00:00"}}\n'
+                )
+        TimelineEntry.objects.all().delete()
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(
+            AuthorStats.objects.get(user=other).posts_count, 42
+        )
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 3
+        )
+        # Старый пост автора новее загруженных: в ленте только он.
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.reader).values_list(
+                'post_id', flat=True
+            )),
+            [self.post.pk]
+        )
+
+    def test_existing_follows_not_counted(self):
+        """Подписка, которая уже есть, учитывается как пропущенная."""
+        path = os.path.join(self.directory, 'follows.jsonl')
+        with open(path, 'w') as file:
+            for user, author in ((READER, AUTHOR), (READER, AUTHOR),
+                                 (AUTHOR, READER)):
+                file.write(
+                    f'{{"model": "follow", "user": "{user}", '
+                    f'"author": "{author}"}}\n'
+                )
+        output = StringIO()
+        call_command('import_posts', path, stdout=output)
+        self.assertIn('follow: загружено 1, пропущено 2', output.getvalue())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).followers_count, 1
+        )
+
+    def test_imported_comments_refresh_cards(self):
+        """Загруженный комментарий меняет версию карточки поста."""
+        importer = Importer()
+        importer.load([('post', {
+            'id': 7, 'author': AUTHOR, 'group': None, 'text': 'Пост',
+            'pub_date': None,
+        })])
+        post = Post.objects.get(text='Пост')
+        key = card_key(post)
+        importer.load([('comment', {
+            'post': 7, 'author': READER, 'text': 'Ответ', 'created': None,
+        })])
+        self.assertNotEqual(card_key(post), key)
+
+    def test_imported_group_page_not_missing(self):
+        """Адрес загруженной группы не отдаёт 404 из кэша."""
+        url = reverse('posts:group_list', kwargs={'slug': 'harrenhal'})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        Importer().load([('group', {
+            'slug': 'harrenhal', 'title': 'Харренхол', 'description': '',
+        })])
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,121 @@
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopFutureHandlers
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post, User
+from ..uploads import RejectedUpload, StreamingImageUploadHandler
+
+USERNAME = 'Sansa'
+TEXT = 'Пост с картинкой'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+SMALL_GIF_HASH = hashlib.sha256(SMALL_GIF).hexdigest()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def open_handler(content, name='upload.bin'):
+    handler = StreamingImageUploadHandler()
+    handler.handle_raw_input(None, {}, len(content), b'boundary')
+    try:
+        handler.new_file('image', name, 'image/gif', None)
+    except StopFutureHandlers:
+        pass
+    return handler
+
+
+def stream(content, chunk_size=8):
+    """Прогоняет содержимое через обработчик загрузки по кускам."""
+    handler = open_handler(content)
+    for start in range(0, len(content), chunk_size):
+        handler.receive_data_chunk(content[start:start + chunk_size], start)
+    return handler.file_complete(len(content))
+
+
+def png(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class StreamingUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def post_image(self, name, content):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': TEXT,
+            'image': SimpleUploadedFile(name, content),
+        })
+
+    def test_valid_image_hashed_while_streaming(self):
+        upload = stream(SMALL_GIF)
+        self.assertEqual(
+            upload.content_hash, hashlib.sha256(SMALL_GIF).hexdigest()
+        )
+        self.assertEqual(upload.image_info, ('GIF', 2, 1))
+        self.assertEqual(upload.read(), SMALL_GIF)
+
+    def test_valid_image_saved(self):
+        """Файл назван по хешу, посчитанному при загрузке."""
+        self.post_image('small.gif', SMALL_GIF)
+        self.assertTrue(Post.objects.filter(
+            image=f'posts/{SMALL_GIF_HASH[:2]}/{SMALL_GIF_HASH}.gif'
+        ).exists())
+
+    def test_not_an_image_rejected(self):
+        """Файл без заголовка картинки отклоняется."""
+        self.assertIsInstance(stream(b'not an image' * 100), RejectedUpload)
+        response = self.post_image('fake.gif', b'not an image' * 100)
+        self.assertFormError(
+            response, 'form', 'image',
+            'Загрузите правильное изображение. Файл, который вы загрузили, '
+            'поврежден или не является изображением.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_SIZE=20)
+    def test_oversized_file_rejected(self):
+        upload = stream(SMALL_GIF)
+        self.assertIsInstance(upload, RejectedUpload)
+        self.assertIn('не больше', upload.reason)
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_large_dimensions_rejected_by_header(self):
+        """Размеры проверяются по заголовку, без чтения всего файла."""
+        content = png(200, 50)
+        handler = open_handler(content, 'big.png')
+        handler.receive_data_chunk(content[:64], 0)
+        self.assertIsNotNone(handler.rejection)
+        response = self.post_image('big.png', content)
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка 200x50 слишком большая, сторона должна быть '
+            'не больше 100 px.'
+        )
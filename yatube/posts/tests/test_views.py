@@ -10,7 +10,7 @@ from django.urls import reverse
 
 from ..forms import PostForm
 
-from ..models import Follow, Group, Post, User
+from ..models import Comment, Follow, Group, Post, User
 
 USERNAME = 'Sheldon li Cooper'
 ANOTHER_USERNAME = 'Leonard Hofsteder'
@@ -258,6 +258,61 @@ class CacheViewsTest(TestCase):
         self.assertEqual(first_object, second_object)
 
 
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_NAME,
+            slug=SLUG,
+            description=DESCRIPTION
+        )
+        cls.post = Post.objects.create(
+            text=TEXT_HEADER,
+            author=cls.user_author,
+            group=cls.group
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def rendered_cards(self, url):
+        response = self.guest_client.get(url)
+        templates = [template.name for template in response.templates]
+        return response, templates.count('includes/post.html')
+
+    def test_cards_reused_between_feeds(self):
+        """Карточка, отрисованная на главной, берётся из кэша в профиле."""
+        _, rendered = self.rendered_cards(reverse('posts:index'))
+        self.assertEqual(rendered, 1)
+        _, rendered = self.rendered_cards(reverse('posts:index'))
+        self.assertEqual(rendered, 0)
+        _, rendered = self.rendered_cards(
+            reverse('posts:profile', kwargs={'username': USERNAME})
+        )
+        self.assertEqual(rendered, 0)
+
+    def test_edit_visible_immediately(self):
+        """Правка поста, автора и группы видна без ожидания кэша."""
+        self.guest_client.get(reverse('posts:index'))
+        edits = (
+            (self.post, 'text', NEW_HEADER),
+            (self.user_author, 'first_name', NEW_GROUP),
+            (self.group, 'title', NEW_DESCRIPTION),
+        )
+        for instance, field, value in edits:
+            with self.subTest(field=field):
+                setattr(instance, field, value)
+                instance.save()
+                response, rendered = self.rendered_cards(
+                    reverse('posts:index')
+                )
+                self.assertEqual(rendered, 1)
+                self.assertContains(response, value)
+
+
 class PaginatorViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -293,6 +348,61 @@ class PaginatorViewsTest(TestCase):
             len(response.context['page_obj']), NUMBER_OF_POSTS_REMAINDER
         )
 
+    def test_cursor_pages(self):
+        """Курсор листает ленту вперёд и назад без пропусков."""
+        response = self.guest_client.get(reverse('posts:index'))
+        first_page = response.context['page_obj']
+        self.assertEqual(len(first_page), NUMBER_OF_POSTS_PAGE)
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(first_page.has_next())
+        response = self.guest_client.get(
+            reverse('posts:index'),
+            {'cursor': first_page.paginator.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), NUMBER_OF_POSTS_REMAINDER)
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        ids = [post.pk for post in first_page] + [
+            post.pk for post in second_page
+        ]
+        self.assertEqual(
+            ids, list(Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True))
+        )
+        response = self.guest_client.get(
+            reverse('posts:index'),
+            {'cursor': second_page.paginator.previous_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [post.pk for post in first_page]
+        )
+
+    def test_cursor_last_page(self):
+        """Ссылка «Последняя» открывает самые старые посты."""
+        response = self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(
+            reverse('posts:index'),
+            {'cursor': response.context['page_obj'].paginator.last_cursor}
+        )
+        page = response.context['page_obj']
+        self.assertEqual(len(page), NUMBER_OF_POSTS_PAGE)
+        self.assertFalse(page.has_next())
+        self.assertEqual(
+            page[len(page) - 1].pk,
+            Post.objects.order_by('pub_date', 'pk').first().pk
+        )
+
+    def test_broken_cursor_opens_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(
+            len(response.context['page_obj']), NUMBER_OF_POSTS_PAGE
+        )
+        self.assertFalse(response.context['page_obj'].has_previous())
+
 
 class FollowViewsTest(TestCase):
     @classmethod
@@ -363,3 +473,70 @@ class FollowViewsTest(TestCase):
         cache.clear()
         count_two = len(Post.objects.filter(author__following__user=user))
         self.assertNotEquals(count_one, count_two)
+
+
+class FeedQueriesTest(TestCase):
+    """Число запросов ленты не зависит от числа постов на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_author = User.objects.create_user(USERNAME)
+        cls.another_user = User.objects.create_user(ANOTHER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_NAME,
+            slug=SLUG,
+            description=DESCRIPTION
+        )
+        Follow.objects.create(user=cls.another_user, author=cls.user_author)
+        for num_page in range(NUMBER_OF_POSTS_ALL):
+            post = Post.objects.create(
+                text=f'Тестовый заголовок{num_page} ',
+                author=cls.user_author,
+                group=cls.group
+            )
+            Comment.objects.create(
+                post=post, author=cls.another_user, text=TEXT_HEADER
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.another_user)
+        cache.clear()
+
+    def test_feed_query_counts(self):
+        # В числе запросов и проверка свежести страницы (posts.freshness):
+        # запрос к ScopeChange и поиск автора по адресу. Группа и id
+        # постов её первой страницы при пустом кэше читаются из базы,
+        # дальше берутся из кэша (posts.group_feed). Лента подписок -
+        # два запроса: разложенные посты и популярные авторы
+        # (posts.timeline).
+        feeds = (
+            (self.guest_client, reverse('posts:index'), 2, 2),
+            (self.guest_client, reverse(
+                'posts:group_list', kwargs={'slug': SLUG}), 4, 2),
+            (self.guest_client, reverse(
+                'posts:profile', kwargs={'username': USERNAME}), 5, 5),
+            (self.authorized_client, reverse('posts:follow_index'), 4, 4),
+        )
+        for client, url, cold, warm in feeds:
+            cache.clear()
+            with self.subTest(url=url, cache='cold'):
+                with self.assertNumQueries(cold):
+                    response = client.get(url)
+                self.assertEqual(
+                    len(response.context['page_obj']), NUMBER_OF_POSTS_PAGE
+                )
+            with self.subTest(url=url, cache='warm'):
+                with self.assertNumQueries(warm):
+                    response = client.get(url)
+                self.assertEqual(
+                    len(response.context['page_obj']), NUMBER_OF_POSTS_PAGE
+                )
+
+    def test_feed_comment_count(self):
+        response = self.guest_client.get(reverse('posts:index'))
+        for post in response.context['page_obj']:
+            with self.subTest(post=post.pk):
+                self.assertEqual(post.comment_count, 1)
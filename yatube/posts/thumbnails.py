@@ -0,0 +1,172 @@
+import json
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+from core import jobs, timing
+
+from . import cards, freshness
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {
+    'AVIF': 'avif',
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+    'PNG': 'png',
+}
+
+
+def available_formats():
+    """Форматы из settings.POST_IMAGE_FORMATS, которые умеет Pillow."""
+    Image.init()
+    return [fmt for fmt in settings.POST_IMAGE_FORMATS if fmt in Image.SAVE]
+
+
+def _variant_name(image_name, slot, width, fmt):
+    directory = _variant_dir(image_name)
+    return f'{directory}/{slot}-{width}.{FORMAT_EXTENSIONS[fmt]}'
+
+
+def _variant_dir(image_name):
+    return 'thumbs/' + posixpath.splitext(image_name)[0]
+
+
+def delete_variants(image_name):
+    """Удаляет все миниатюры картинки."""
+    directory = _variant_dir(image_name)
+    if not default_storage.exists(directory):
+        return
+    for name in default_storage.listdir(directory)[1]:
+        default_storage.delete(posixpath.join(directory, name))
+
+
+def _save_variant(storage, name, picture, fmt):
+    buffer = BytesIO()
+    picture.save(
+        buffer, fmt, quality=settings.POST_IMAGE_QUALITY.get(fmt, 80)
+    )
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.url(storage.save(name, ContentFile(buffer.getvalue())))
+
+
+def render_thumbnails(image):
+    """Готовит все варианты миниатюр из settings.POST_THUMBNAILS.
+
+    Картинка декодируется один раз. Для каждого слота она обрезается
+    по центру под пропорции слота в самой большой ширине, остальные
+    ширины получаются уменьшением этой копии. Каждая ширина
+    кодируется во все доступные форматы; последний формат в списке
+    служит запасным для браузеров без поддержки остальных.
+
+    Миниатюры пишутся в обычное хранилище: хранилище картинок постов
+    переименовывает файлы по содержимому.
+    """
+    formats = available_formats()
+    fallback = formats[-1]
+    storage = default_storage
+    thumbnails = {}
+    image.open('rb')
+    try:
+        with Image.open(image) as source:
+            source = ImageOps.exif_transpose(source).convert('RGB')
+            for slot, spec in settings.POST_THUMBNAILS.items():
+                base_width, base_height = spec['size']
+                widths = sorted(set(spec['widths']) | {base_width})
+                largest = ImageOps.fit(
+                    source,
+                    (widths[-1], round(widths[-1] * base_height / base_width)),
+                    Image.LANCZOS
+                )
+                srcsets = {fmt: [] for fmt in formats}
+                for width in reversed(widths):
+                    height = round(width * base_height / base_width)
+                    picture = largest.resize((width, height), Image.LANCZOS)
+                    for fmt in formats:
+                        url = _save_variant(
+                            storage,
+                            _variant_name(image.name, slot, width, fmt),
+                            picture,
+                            fmt
+                        )
+                        srcsets[fmt].insert(0, f'{url} {width}w')
+                        if fmt == fallback and width == base_width:
+                            fallback_url = url
+                thumbnails[slot] = {
+                    'url': fallback_url,
+                    'width': base_width,
+                    'height': base_height,
+                    'sizes': spec['sizes'],
+                    'srcset': ', '.join(srcsets[fallback]),
+                    'sources': [
+                        {
+                            'type': Image.MIME.get(
+                                fmt, f'image/{FORMAT_EXTENSIONS[fmt]}'
+                            ),
+                            'srcset': ', '.join(srcsets[fmt]),
+                        }
+                        for fmt in formats if fmt != fallback
+                    ],
+                }
+    finally:
+        image.close()
+    return thumbnails
+
+
+def generate_for_post(post_id, force=False):
+    """Готовит миниатюры поста и сохраняет их адреса.
+
+    С force миниатюры рисуются заново, даже если они уже есть.
+    """
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'author', 'group'
+    ).first()
+    if post is None or not post.image:
+        return
+    # Одинаковые картинки хранятся одним файлом, поэтому миниатюры,
+    # готовые у другого поста с той же картинкой, подходят и этому.
+    thumbnails = None
+    if not force:
+        thumbnails = Post.objects.filter(image=post.image.name).exclude(
+            thumbnails=''
+        ).values_list('thumbnails', flat=True).first()
+    if thumbnails is None:
+        try:
+            with timing.timer('thumbnails'):
+                thumbnails = json.dumps(render_thumbnails(post.image))
+        except Exception:
+            logger.exception(
+                'Не удалось подготовить миниатюры поста %s', post_id
+            )
+            return
+    # Если картинку успели заменить, её миниатюры подготовит новая задача.
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnails=thumbnails
+    )
+    if updated:
+        cards.bump_version('post', post_id)
+        freshness.touch(*freshness.post_scopes(post))
+
+
+def run_in_worker(post_id, force=False):
+    """generate_for_post() для фонового потока: закрывает его соединения."""
+    try:
+        generate_for_post(post_id, force)
+    finally:
+        connections.close_all()
+
+
+def schedule(post):
+    """Ставит подготовку миниатюр в очередь фоновых задач (core.jobs)."""
+    if not settings.THUMBNAIL_ASYNC:
+        generate_for_post(post.pk)
+        return
+    jobs.enqueue('posts.generate_thumbnails', post.pk)
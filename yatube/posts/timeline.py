@@ -0,0 +1,232 @@
+import heapq
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from core import jobs
+from yatube.settings import NUMBER_OF_POSTS
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .stats import get_stats
+from .utils import KeysetPaginator, keyset_slice
+
+
+def follower_count(author):
+    """Число подписчиков автора."""
+    return get_stats(author).followers_count
+
+
+def is_popular(author):
+    """Посты популярных авторов читаются при запросе, а не рассылаются."""
+    return follower_count(author) > settings.TIMELINE_FANOUT_LIMIT
+
+
+def pulled_authors(user):
+    """Авторы, чьи посты подмешиваются в ленту пользователя при чтении.
+
+    Это популярные авторы и авторы подписок, которые фоновая задача
+    ещё не разложила по ленте. Строка статистики популярного автора
+    всегда существует: её создаёт регистрация пользователя
+    (posts.stats.seed).
+    """
+    return Follow.objects.filter(user=user).filter(
+        Q(timeline_ready=False)
+        | Q(author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+    ).values('author_id')
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def _run(name, func, *args):
+    """Задача в очередь; без TIMELINE_ASYNC - сразу, в запросе."""
+    if settings.TIMELINE_ASYNC:
+        jobs.enqueue(name, *args)
+    else:
+        func(*args)
+
+
+def push_post(post_id):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'pub_date'
+    ).first()
+    if post is None:
+        return
+    author_id, pub_date = post
+    if is_popular(author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def backfill_author(author_id, user_ids):
+    """Добавляет последние посты автора в ленты подписчиков user_ids.
+
+    Постов берётся не больше TIMELINE_BACKFILL_SIZE. Пока подписка не
+    отмечена timeline_ready, посты автора читаются при запросе ленты.
+    """
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        if not is_popular(author_id):
+            posts = list(Post.objects.filter(author_id=author_id).order_by(
+                '-pub_date'
+            ).values_list(
+                'pk', 'pub_date'
+            )[:settings.TIMELINE_BACKFILL_SIZE])
+            _bulk_insert(
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    pub_date=pub_date
+                )
+                for user_id in user_ids
+                for post_id, pub_date in posts
+            )
+        size = settings.TIMELINE_BATCH_SIZE
+        for start in range(0, len(user_ids), size):
+            Follow.objects.filter(
+                author_id=author_id, user_id__in=user_ids[start:start + size]
+            ).update(timeline_ready=True)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    backfill_author(author_id, [user_id])
+
+
+def backfill_followers(author_id):
+    """Дозаписывает посты автора подписчикам, которым их ещё не разложили."""
+    followers = Follow.objects.filter(
+        author_id=author_id, timeline_ready=False
+    ).values_list('user_id', flat=True)
+    backfill_author(author_id, followers)
+
+
+def prune(user_id, author_id, followers_before):
+    """Убирает посты автора из ленты после отписки.
+
+    followers_before - точное число подписчиков автора до отписки
+    (его запоминает pre_delete). Если автор был популярным, а теперь
+    нет, его посты, которые раньше подмешивались при чтении,
+    дозаписываются в ленты оставшихся подписчиков фоновой задачей, а
+    до тех пор читаются при запросе. Сколько подписчиков осталось,
+    считается по таблице подписок, а не по статистике: порядок
+    сигналов и расхождения счётчиков на решение не влияют.
+    """
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if followers_before <= limit:
+        return
+    if Follow.objects.filter(author_id=author_id).count() <= limit:
+        Follow.objects.filter(author_id=author_id).update(
+            timeline_ready=False
+        )
+        _run('posts.backfill_followers', backfill_followers, author_id)
+
+
+def schedule_push(post):
+    _run('posts.push_post', push_post, post.pk)
+
+
+def schedule_backfill(follow):
+    _run('posts.backfill_timeline', backfill, follow.user_id, follow.author_id)
+
+
+def _pushed(user, key, backwards, limit):
+    """Посты, разложенные в ленту: срез записей по индексу ленты."""
+    entries = keyset_slice(
+        TimelineEntry.objects.filter(user=user),
+        key, backwards, limit, pk_field='post_id'
+    ).values('post_id')
+    return keyset_slice(
+        Post.objects.for_feed().filter(pk__in=entries), None, backwards, limit
+    )
+
+
+def _pulled(user, key, backwards, limit):
+    """Посты авторов, которые не разложены по ленте."""
+    return keyset_slice(
+        Post.objects.for_feed().filter(author__in=pulled_authors(user)),
+        key, backwards, limit
+    )
+
+
+def timeline_page(user, token=None):
+    """Страница ленты подписок по курсору token.
+
+    Оба запроса идут по индексам в порядке страницы и ограничены её
+    размером, поэтому стоимость страницы не зависит от длины ленты.
+    """
+    def load(key, backwards, limit):
+        merged = heapq.merge(
+            _pushed(user, key, backwards, limit),
+            _pulled(user, key, backwards, limit),
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=not backwards
+        )
+        posts, seen = [], set()
+        for post in merged:
+            # Пост, разложенный по ленте, но ещё читаемый при запросе
+            # (автор стал популярным), приходит из обоих запросов.
+            if post.pk not in seen:
+                seen.add(post.pk)
+                posts.append(post)
+                if len(posts) == limit:
+                    break
+        return posts
+
+    paginator = KeysetPaginator(Post.objects.none(), NUMBER_OF_POSTS)
+    return paginator.get_page_from(token, load)
+
+
+def rebuild():
+    """Раскладывает все ленты заново после записи в обход сигналов.
+
+    Подписчикам непопулярных авторов достаются последние
+    TIMELINE_BACKFILL_SIZE постов каждого автора, как при подписке;
+    посты популярных подмешиваются при чтении, как в push_post.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        TimelineEntry.objects.all().delete()
+        cursor.execute(
+            'INSERT INTO {timeline} (user_id, post_id, author_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+            'FROM {follow} follow '
+            'JOIN ('
+            '  SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+            '    PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+            '  ) AS position FROM {post}'
+            ') post ON post.author_id = follow.author_id '
+            'JOIN {stats} stats ON stats.user_id = follow.author_id '
+            'WHERE stats.followers_count <= %s AND post.position <= %s'.format(
+                timeline=TimelineEntry._meta.db_table,
+                follow=Follow._meta.db_table,
+                post=Post._meta.db_table,
+                stats=AuthorStats._meta.db_table,
+            ),
+            [
+                settings.TIMELINE_FANOUT_LIMIT,
+                settings.TIMELINE_BACKFILL_SIZE
+            ]
+        )
+        Follow.objects.update(timeline_ready=True)
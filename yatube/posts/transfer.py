@@ -0,0 +1,396 @@
+"""Перенос групп, постов, комментариев и подписок файлами JSONL и CSV.
+
+Выгрузка идёт по одной модели за раз через values_list().iterator(),
+поэтому память не растёт с числом строк. Авторы и группы пишутся
+по username и slug, посты - со своим id, на который ссылаются
+комментарии.
+
+Загрузка читает записи потоком и пишет их пачками через bulk_create,
+каждую пачку в своей транзакции. Пользователи, группы и посты
+находятся по словарям в памяти, а не запросом на каждую запись;
+недостающие авторы создаются без пароля. Новые посты получают новые
+id, комментарии находят их по id из файла, если пост загружен в том же
+запуске. Картинки не переносятся.
+
+Даты публикации из файла записываются одним UPDATE на пачку после
+bulk_create: auto_now_add подставляет текущее время при вставке.
+
+bulk_create не шлёт сигналы, поэтому поисковый индекс дописывается
+вместе с постами, а в finish() пересчитываются статистика, ленты
+подписок и свежесть страниц только затронутых пользователей и групп.
+"""
+import csv
+import json
+from collections import Counter, defaultdict
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cards, freshness, group_feed, search, stats, timeline
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+# Поля записей по моделям; модели перечислены в порядке зависимостей.
+FIELDS = {
+    'group': ('slug', 'title', 'description'),
+    'post': ('id', 'author', 'group', 'text', 'pub_date'),
+    'comment': ('post', 'author', 'text', 'created'),
+    'follow': ('user', 'author'),
+}
+MODELS = tuple(FIELDS)
+# Сколько id передавать в одном условии IN: SQLite принимает не больше
+# 999 параметров в запросе.
+LOOKUP_SIZE = 500
+# Что выгружать в поля записей, в порядке FIELDS.
+EXPORT_COLUMNS = {
+    'group': (Group, ('slug', 'title', 'description')),
+    'post': (Post, (
+        'pk', 'author__username', 'group__slug', 'text', 'pub_date'
+    )),
+    'comment': (Comment, (
+        'post_id', 'author__username', 'text', 'created'
+    )),
+    'follow': (Follow, ('user__username', 'author__username')),
+}
+
+
+def export_records(model, chunk_size=2000):
+    """Записи модели по возрастанию id, без загрузки всей таблицы."""
+    queryset, columns = EXPORT_COLUMNS[model]
+    rows = queryset.objects.order_by('pk').values_list(*columns)
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(FIELDS[model], row))
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def write_jsonl(file, model, records):
+    count = 0
+    for record in records:
+        line = {'model': model}
+        line.update(
+            (field, value.isoformat() if hasattr(value, 'isoformat')
+             else value)
+            for field, value in record.items()
+        )
+        file.write(json.dumps(line, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def write_csv(file, model, records):
+    writer = csv.DictWriter(file, FIELDS[model])
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow({
+            field: _text(value) for field, value in record.items()
+        })
+        count += 1
+    return count
+
+
+def read_jsonl(file):
+    """(модель, запись) из строк JSON с полем model."""
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        model = record.pop('model', None)
+        if model not in FIELDS:
+            raise ValueError(f'Строка {number}: неизвестная модель {model!r}')
+        yield model, record
+
+
+def read_csv(file, model):
+    for record in csv.DictReader(file):
+        yield model, record
+
+
+def _blank(value):
+    return value in (None, '')
+
+
+def _date(value, now):
+    if _blank(value):
+        return now
+    date = parse_datetime(value) if isinstance(value, str) else value
+    if date is None:
+        raise ValueError(f'Не дата: {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.utc)
+    return date
+
+
+class Importer:
+    """Загрузка записей пачками; после всех файлов вызвать finish()."""
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = {group.slug: group for group in Group.objects.all()}
+        # id поста из файла -> id в базе.
+        self.posts = {}
+        self.created = Counter()
+        self.skipped = Counter()
+        # Что пересчитать в finish().
+        self.touched_users = set()
+        self.touched_groups = set()
+        self.touched_posts = set()
+        self.posting_authors = set()
+        # id автора -> id новых подписчиков.
+        self.new_followers = defaultdict(set)
+
+    def load(self, records):
+        """Пишет поток (модель, запись), по пачке на транзакцию."""
+        model, chunk = None, []
+        for record_model, record in records:
+            if chunk and (record_model != model
+                          or len(chunk) == self.batch_size):
+                self._flush(model, chunk)
+                chunk = []
+            model = record_model
+            chunk.append(record)
+        if chunk:
+            self._flush(model, chunk)
+
+    def _flush(self, model, records):
+        with transaction.atomic():
+            getattr(self, f'load_{model}s')(records)
+
+    def _insert_size(self, model):
+        # Django 2.2 не урезает batch_size до предела бэкенда.
+        return min(self.batch_size, connection.ops.bulk_batch_size(
+            model._meta.concrete_fields, []
+        ))
+
+    def _insert(self, model, objects):
+        """bulk_create, после которого у объектов есть id.
+
+        SQLite не возвращает id из bulk_create. Пачка пишется в своей
+        транзакции, а SQLite держит единственную блокировку записи от
+        первой вставки до коммита, поэтому последние len(objects) id
+        таблицы принадлежат этой пачке и идут в порядке вставки.
+        """
+        model.objects.bulk_create(
+            objects, batch_size=self._insert_size(model)
+        )
+        if objects and objects[0].pk is None:
+            ids = model.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:len(objects)]
+            for item, pk in zip(objects, sorted(ids)):
+                item.pk = pk
+
+    def _set_dates(self, model, field, objects, dates):
+        """Даты из файла вместо подставленных auto_now_add."""
+        if not objects:
+            return
+        size = connection.ops.bulk_batch_size(['pk', field, 'pk'], objects)
+        for start in range(0, len(objects), size):
+            chunk = list(zip(
+                objects[start:start + size], dates[start:start + size]
+            ))
+            model.objects.filter(
+                pk__in=[item.pk for item, _ in chunk]
+            ).update(**{field: Case(
+                *(When(pk=item.pk, then=Value(date)) for item, date in chunk),
+                output_field=DateTimeField()
+            )})
+        for item, date in zip(objects, dates):
+            setattr(item, field, date)
+
+    def _user_ids(self, usernames):
+        """id пользователей по именам; недостающие создаются."""
+        missing = {
+            name for name in usernames
+            if not _blank(name) and name not in self.users
+        }
+        if missing:
+            User.objects.bulk_create(
+                [
+                    User(username=name, password=make_password(None))
+                    for name in sorted(missing)
+                ],
+                batch_size=self._insert_size(User),
+                ignore_conflicts=True
+            )
+            created = dict(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'pk'))
+            self.users.update(created)
+            self.touched_users.update(created.values())
+            self.created['user'] += len(missing)
+        return self.users
+
+    def _user_id(self, record, field):
+        """id пользователя из обязательного поля записи."""
+        name = record[field]
+        if _blank(name):
+            raise ValueError(f'Запись {record}: пустое поле {field!r}')
+        return self.users[name]
+
+    def load_groups(self, records):
+        new = {}
+        for record in records:
+            if record['slug'] in self.groups or record['slug'] in new:
+                self.skipped['group'] += 1
+                continue
+            new[record['slug']] = Group(
+                slug=record['slug'],
+                title=record['title'],
+                description=record.get('description') or ''
+            )
+        Group.objects.bulk_create(
+            new.values(), batch_size=self._insert_size(Group)
+        )
+        created = list(Group.objects.filter(slug__in=new))
+        for group in created:
+            self.groups[group.slug] = group
+        group_feed.refresh_groups(created)
+        self.created['group'] += len(new)
+
+    def load_posts(self, records):
+        now = timezone.now()
+        users = self._user_ids(record['author'] for record in records)
+        sources, posts, dates = [], [], []
+        for record in records:
+            group = None
+            if not _blank(record.get('group')):
+                group = self.groups.get(record['group'])
+                if group is None:
+                    self.skipped['post'] += 1
+                    continue
+            sources.append(record.get('id'))
+            dates.append(_date(record.get('pub_date'), now))
+            posts.append(Post(
+                # Посты удалённых авторов остаются без автора.
+                author_id=users.get(record.get('author')),
+                group=group,
+                text=record['text']
+            ))
+        # По id комментарии находят посты и строится индекс.
+        self._insert(Post, posts)
+        self._set_dates(Post, 'pub_date', posts, dates)
+        for source, post in zip(sources, posts):
+            if not _blank(source):
+                self.posts[str(source)] = post.pk
+            self.touched_posts.add(post.pk)
+            if post.author_id is not None:
+                self.touched_users.add(post.author_id)
+                self.posting_authors.add(post.author_id)
+            if post.group_id is not None:
+                self.touched_groups.add(post.group_id)
+        search.index_posts(posts)
+        self.created['post'] += len(posts)
+
+    def load_comments(self, records):
+        now = timezone.now()
+        self._user_ids(record['author'] for record in records)
+        comments, dates = [], []
+        for record in records:
+            post_id = self.posts.get(str(record['post']))
+            if post_id is None:
+                self.skipped['comment'] += 1
+                continue
+            dates.append(_date(record.get('created'), now))
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=self._user_id(record, 'author'),
+                text=record['text']
+            ))
+        self._insert(Comment, comments)
+        self._set_dates(Comment, 'created', comments, dates)
+        post_ids = {comment.post_id for comment in comments}
+        # В карточке поста выводится число комментариев.
+        cards.bump_versions('post', post_ids)
+        self.touched_posts.update(post_ids)
+        self.touched_users.update(comment.author_id for comment in comments)
+        self.created['comment'] += len(comments)
+
+    def load_follows(self, records):
+        self._user_ids(
+            name for record in records
+            for name in (record['user'], record['author'])
+        )
+        pairs = []
+        for record in records:
+            user_id = self._user_id(record, 'user')
+            author_id = self._user_id(record, 'author')
+            if user_id == author_id:
+                self.skipped['follow'] += 1
+                continue
+            pairs.append((user_id, author_id))
+        # Повторная подписка не ошибка, но и не новая подписка: новыми
+        # считаются пары, которых не было до вставки и которые есть после.
+        new = set(pairs) - self._existing_follows(pairs)
+        Follow.objects.bulk_create(
+            [
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in sorted(new)
+            ],
+            batch_size=self._insert_size(Follow),
+            ignore_conflicts=True
+        )
+        created = self._existing_follows(new)
+        for user_id, author_id in created:
+            self.touched_users.update((user_id, author_id))
+            self.new_followers[author_id].add(user_id)
+        self.created['follow'] += len(created)
+        self.skipped['follow'] += len(pairs) - len(created)
+
+    def _existing_follows(self, pairs):
+        """Какие из пар (подписчик, автор) есть в базе."""
+        pairs = sorted(set(pairs))
+        found = set()
+        for start in range(0, len(pairs), LOOKUP_SIZE):
+            chunk = pairs[start:start + LOOKUP_SIZE]
+            found.update(Follow.objects.filter(
+                user_id__in={user_id for user_id, _ in chunk},
+                author_id__in={author_id for _, author_id in chunk}
+            ).values_list('user_id', 'author_id'))
+        return found & set(pairs)
+
+    def _timeline_followers(self):
+        """id автора -> подписчики, в ленты которых дописать его посты.
+
+        Авторам новых постов - все подписчики, остальным - новые.
+        """
+        followers = defaultdict(set, self.new_followers)
+        authors = sorted(self.posting_authors)
+        for start in range(0, len(authors), LOOKUP_SIZE):
+            pairs = Follow.objects.filter(
+                author_id__in=authors[start:start + LOOKUP_SIZE]
+            ).values_list('author_id', 'user_id')
+            for author_id, user_id in pairs.iterator():
+                followers[author_id].add(user_id)
+        return followers
+
+    def finish(self):
+        """Пересчитывает то, что при обычной записи делают сигналы.
+
+        Статистика пересчитывается только у затронутых пользователей,
+        ленты - только у подписчиков авторов новых постов и у новых
+        подписок, не больше TIMELINE_BACKFILL_SIZE постов на автора.
+        """
+        stats.recompute(self.touched_users, LOOKUP_SIZE)
+        for author_id, user_ids in self._timeline_followers().items():
+            timeline.backfill_author(author_id, user_ids)
+        freshness.touch_now(
+            [freshness.POSTS, freshness.USERS, freshness.GROUPS]
+            + [freshness.author_scope(pk) for pk in self.touched_users]
+            + [freshness.group_scope(pk) for pk in self.touched_groups]
+            + [freshness.post_scope(pk) for pk in self.touched_posts],
+            LOOKUP_SIZE
+        )
+        for group_id in self.touched_groups:
+            group_feed.refresh_first_page(group_id)
@@ -0,0 +1,130 @@
+"""Потоковая загрузка картинок постов.
+
+Обработчик пишет файл кусками во временный файл на диске (откуда
+FileSystemStorage забирает его переименованием), по ходу считает
+SHA-256 и проверяет картинку по заголовку: формат, размер файла и
+размеры в пикселях известны задолго до конца загрузки, а битмап
+целиком не декодируется. Если загрузка не подходит, остаток потока
+пропускается без записи, а форма получает RejectedUpload с причиной.
+
+Других файлов, кроме картинок, сайт не принимает, поэтому обработчик
+подключён для всех загрузок в settings.FILE_UPLOAD_HANDLERS.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import (FileUploadHandler,
+                                             StopFutureHandlers)
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+# Сколько байт начала файла держать для разбора заголовка. У JPEG
+# с большим блоком EXIF размеры записаны далеко от начала.
+HEADER_LIMIT = 256 * 1024
+# Запас на поля формы и границы multipart сверх размера картинки.
+REQUEST_OVERHEAD = 64 * 1024
+
+
+class RejectedUpload:
+    """Загрузка, отклонённая по заголовку или размеру."""
+
+    def __init__(self, name, reason):
+        self.name = name
+        self.reason = reason
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        self.request_too_large = (
+            content_length > settings.POST_IMAGE_MAX_SIZE + REQUEST_OVERHEAD
+        )
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.rejection = None
+        self.image_info = None
+        self.header = b''
+        self.size = 0
+        self.hasher = hashlib.sha256()
+        self.file = None
+        if getattr(self, 'request_too_large', False):
+            self.reject_size()
+        else:
+            self.file = TemporaryUploadedFile(
+                self.file_name, self.content_type, 0, self.charset,
+                self.content_type_extra
+            )
+        raise StopFutureHandlers()
+
+    def reject(self, reason):
+        self.rejection = reason
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def reject_size(self):
+        self.reject(
+            'Картинка должна быть не больше {}.'.format(
+                filesizeformat(settings.POST_IMAGE_MAX_SIZE)
+            )
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.rejection is not None:
+            return None
+        self.size += len(raw_data)
+        if self.size > settings.POST_IMAGE_MAX_SIZE:
+            self.reject_size()
+            return None
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+        if self.image_info is None and len(self.header) < HEADER_LIMIT:
+            self.header += raw_data[:HEADER_LIMIT - len(self.header)]
+            self.inspect_header()
+        return None
+
+    def inspect_header(self, complete=False):
+        """Определяет формат и размеры по началу файла."""
+        try:
+            with Image.open(BytesIO(self.header)) as image:
+                image_format, (width, height) = image.format, image.size
+        except Image.DecompressionBombError:
+            self.reject('Картинка слишком большая.')
+            return
+        except Exception:
+            if complete or len(self.header) >= HEADER_LIMIT:
+                self.reject(
+                    'Загрузите правильное изображение. Файл, который вы '
+                    'загрузили, поврежден или не является изображением.'
+                )
+            return
+        if image_format not in settings.POST_UPLOAD_FORMATS:
+            self.reject('Поддерживаются картинки {}.'.format(
+                ', '.join(settings.POST_UPLOAD_FORMATS)
+            ))
+        elif (max(width, height) > settings.POST_IMAGE_MAX_SIDE
+              or width * height > settings.POST_IMAGE_MAX_PIXELS):
+            self.reject(
+                f'Картинка {width}x{height} слишком большая, сторона '
+                f'должна быть не больше {settings.POST_IMAGE_MAX_SIDE} px.'
+            )
+        else:
+            self.image_info = (image_format, width, height)
+
+    def file_complete(self, file_size):
+        if self.rejection is None and self.image_info is None:
+            self.inspect_header(complete=True)
+        if self.rejection is not None:
+            return RejectedUpload(self.file_name, self.rejection)
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.content_hash = self.hasher.hexdigest()
+        self.file.image_info = self.image_info
+        return self.file
+
+    def upload_interrupted(self):
+        if self.file is not None:
+            self.file.close()
@@ -10,6 +10,11 @@ urlpatterns = [
         views.index,
         name='index'
     ),
+    path(
+        'search/',
+        views.search_posts,
+        name='search'
+    ),
     path(
         'group/<slug:slug>/',
         views.group_posts,
@@ -25,6 +30,11 @@ urlpatterns = [
         views.post_detail,
         name='post_detail'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'create/',
         views.post_create,
@@ -45,6 +55,16 @@ urlpatterns = [
         views.follow_index,
         name='follow_index'
     ),
+    path(
+        'notifications/',
+        views.notifications_index,
+        name='notifications'
+    ),
+    path(
+        'notifications/read/',
+        views.notifications_read,
+        name='notifications_read'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
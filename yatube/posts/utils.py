@@ -1,9 +1,171 @@
-from django.core.paginator import Paginator
-from yatube.settings import NUMBER_OF_POSTS
+import base64
+import binascii
+import json
 
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
-def paginator_of_page(request, posts):
-    """Модуль отвечающий за разбитие текта на страницы."""
-    paginator = Paginator(posts, NUMBER_OF_POSTS)
+from yatube.settings import COMMENTS_PER_PAGE, NUMBER_OF_POSTS
+
+CURSOR_PARAM = 'cursor'
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_cursor(direction, obj=None, key_field='pub_date'):
+    """Упаковывает направление и ключ (дата, id) в непрозрачный токен.
+
+    obj - объект модели или строка values() с полями key_field и pk.
+    """
+    key = None
+    if isinstance(obj, dict):
+        key = [obj[key_field].isoformat(), obj['pk']]
+    elif obj is not None:
+        key = [getattr(obj, key_field).isoformat(), obj.pk]
+    raw = json.dumps([direction, key], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (направление, ключ) или (None, None) для битого токена."""
+    if not token:
+        return None, None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, key = json.loads(raw.decode())
+        if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+            return None, None
+        if key is None:
+            return direction, None
+        date, pk = parse_datetime(key[0]), int(key[1])
+    except (binascii.Error, ValueError, TypeError, IndexError):
+        return None, None
+    if date is None:
+        return None, None
+    return direction, (date, pk)
+
+
+def keyset_slice(queryset, key, backwards, limit, key_field='pub_date',
+                 pk_field='pk'):
+    """Не больше limit записей после ключа (дата, id) в порядке страницы."""
+    if key is not None:
+        date, pk = key
+        lookup = 'gt' if backwards else 'lt'
+        queryset = queryset.filter(
+            Q(**{f'{key_field}__{lookup}': date})
+            | Q(**{key_field: date, f'{pk_field}__{lookup}': pk})
+        )
+    if backwards:
+        queryset = queryset.order_by(key_field, pk_field)
+    else:
+        queryset = queryset.order_by(f'-{key_field}', f'-{pk_field}')
+    return queryset[:limit]
+
+
+class KeysetPaginator(Paginator):
+    """Пагинатор по ключу (дата, id) без COUNT(*) и OFFSET.
+
+    Каждая страница выбирается запросом WHERE по индексу даты
+    (key_field, для постов pub_date) с LIMIT на одну запись больше
+    размера страницы: лишняя запись говорит о том, что есть следующая
+    страница. Номера страниц не известны, поэтому Page получает
+    условный номер 1 или 2, а ссылки строятся по next_cursor
+    и previous_cursor. Записи идут от новых к старым.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, per_page, key_field='pub_date'):
+        super().__init__(object_list, per_page)
+        self.key_field = key_field
+        self.cursor = ''
+        self.next_cursor = None
+        self.previous_cursor = None
+        self.last_cursor = encode_cursor(CURSOR_PREVIOUS)
+        self._number = 1
+        self._has_next = False
+
+    @property
+    def num_pages(self):
+        return self._number + 1 if self._has_next else self._number
+
+    def get_page(self, token=None):
+        def load(key, backwards, limit):
+            return list(keyset_slice(
+                self.object_list, key, backwards, limit, self.key_field
+            ))
+        return self.get_page_from(token, load)
+
+    def get_page_from(self, token, load):
+        """Страница из записей, которые выбирает load(key, backwards, limit).
+
+        load отдаёт не больше limit записей после ключа key: от новых
+        к старым, а при backwards - от старых к новым. Так листаются
+        ленты, собранные из нескольких запросов.
+        """
+        direction, key = decode_cursor(token)
+        return self._make_page(
+            load(key, direction == CURSOR_PREVIOUS, self.per_page + 1),
+            direction, key, token
+        )
+
+    def first_page(self, posts):
+        """Первая страница из готовых записей, например из кэша.
+
+        posts - самые новые записи по убыванию ключа, на одну больше
+        размера страницы, если столько есть.
+        """
+        return self._make_page(list(posts), None, None, None)
+
+    def _make_page(self, posts, direction, key, token):
+        backwards = direction == CURSOR_PREVIOUS
+        field = self.key_field
+        has_more = len(posts) > self.per_page
+        posts = posts[:self.per_page]
+        if backwards:
+            posts.reverse()
+            has_previous, self._has_next = has_more, key is not None
+        else:
+            has_previous, self._has_next = key is not None, has_more
+        self.cursor = token if direction else ''
+        self._number = 2 if has_previous else 1
+        if posts and self._has_next:
+            self.next_cursor = encode_cursor(CURSOR_NEXT, posts[-1], field)
+        if posts and has_previous:
+            self.previous_cursor = encode_cursor(
+                CURSOR_PREVIOUS, posts[0], field
+            )
+        return Page(posts, self._number, self)
+
+
+def paginator_of_page(request, posts, first_page_ids=None):
+    """Модуль отвечающий за разбитие текта на страницы.
+
+    Старые ссылки вида ?page=N обслуживаются обычным Paginator,
+    всё остальное листается курсором через KeysetPaginator.
+    first_page_ids - функция, отдающая id постов первой страницы
+    (например, из кэша): тогда первая страница выбирается по ним.
+    """
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number is not None:
+        paginator = Paginator(posts, NUMBER_OF_POSTS)
+        return paginator.get_page(page_number)
+    paginator = KeysetPaginator(posts, NUMBER_OF_POSTS)
+    token = request.GET.get(CURSOR_PARAM)
+    if first_page_ids is not None and decode_cursor(token)[0] is None:
+        post_ids = first_page_ids()
+        found = posts.in_bulk(post_ids)
+        return paginator.first_page(
+            found[pk] for pk in post_ids if pk in found
+        )
+    return paginator.get_page(token)
+
+
+def comments_of_page(request, post):
+    """Страница комментариев поста, от новых к старым, по курсору."""
+    paginator = KeysetPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_PER_PAGE,
+        key_field='created'
+    )
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
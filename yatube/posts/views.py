@@ -1,19 +1,44 @@
+from functools import partial
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse
+from django.core.paginator import Paginator
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.http import urlencode
 
-from posts.utils import paginator_of_page
+from core.conditional import conditional_page
+from core.parallel import gather
+from core.queries import query_budget
+from core.routers import replica_reads
+from posts import freshness, notifications
+from posts.group_feed import first_page_ids, get_group
+from posts.search import search
+from posts.stats import get_stats
+from posts.timeline import timeline_page
+from posts.utils import CURSOR_PARAM, comments_of_page, paginator_of_page
+from yatube.settings import NUMBER_OF_POSTS
 
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Follow, Post, User
 
 User = get_user_model()
 
+# Бюджеты запросов (core.queries.query_budget) - цели, а не замеры;
+# в каждом два запроса на сессию и пользователя. Лента или страница -
+# не больше 6 запросов, с карточкой автора или группы - 8-10. Запись
+# тратит запросы на сигналы (статистика, задачи, поиск, свежесть):
+# подписка - до 20, пост - до 28, и не зависит от числа подписчиков.
+
 
+@query_budget(6)
+@replica_reads
+@conditional_page(freshness.index_changed)
 def index(request: HttpRequest) -> HttpResponse:
     """Модуль отвечающий за главную страницу."""
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_feed()
     page_obj = paginator_of_page(request, post_list)
     context = {
         'page_obj': page_obj,
@@ -22,30 +47,66 @@ def index(request: HttpRequest) -> HttpResponse:
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(8)
+@replica_reads
+@conditional_page(freshness.group_changed)
 def group_posts(request: HttpRequest, slug) -> HttpResponse:
     """Модуль отвечающий за страницу сообщества."""
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = paginator_of_page(request, post_list)
+    group = get_group(slug)
+    if group is None:
+        raise Http404
+    page_obj = paginator_of_page(
+        request,
+        group.posts.for_feed(),
+        first_page_ids=partial(first_page_ids, group.pk)
+    )
     context = {
         'group': group,
-        'post_list': post_list,
         'page_obj': page_obj,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(8)
+@replica_reads
+def search_posts(request: HttpRequest) -> HttpResponse:
+    """Модуль отвечающий за поиск по постам и группам."""
+    query = request.GET.get('q', '').strip()
+    results = search(query)
+    page_obj = None
+    if results:
+        paginator = Paginator(results, NUMBER_OF_POSTS)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def is_following(reader, author):
+    return reader is not None and Follow.objects.filter(
+        user=reader, author=author
+    ).exists()
+
+
+@query_budget(10)
+@replica_reads
+@conditional_page(freshness.profile_changed)
 def profile(request: HttpRequest, username) -> HttpResponse:
     """Модуль отвечающий за личную страницу."""
     author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    posts_count = posts.count()
-    page_obj = paginator_of_page(request, posts)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author
-    ).exists
+    reader = request.user if request.user.is_authenticated else None
+    # Счётчики, подписка и страница постов не зависят друг от друга.
+    stats, following, page_obj = gather(
+        partial(get_stats, author),
+        partial(is_following, reader, author),
+        partial(paginator_of_page, request, author.posts.for_feed()),
+    )
     context = {
-        'posts_count': posts_count,
+        'posts_count': stats.posts_count,
+        'stats': stats,
         'author': author,
         'page_obj': page_obj,
         'following': following
@@ -53,12 +114,20 @@ def profile(request: HttpRequest, username) -> HttpResponse:
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(10)
+@replica_reads
+@conditional_page(freshness.post_changed)
 def post_detail(request: HttpRequest, post_id) -> HttpResponse:
     """Модуль отвечающий за просмотр отдельного поста."""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id
+    )
     comment_form = CommentForm(request.POST or None)
-    comments = post.comments.all()
-    count_of_posts = post.author.posts.all().count()
+    comments, stats = gather(
+        partial(comments_of_page, request, post),
+        partial(get_stats, post.author_id),
+    )
+    count_of_posts = stats.posts_count
     context = {
         'count_of_posts': count_of_posts,
         'post': post,
@@ -69,6 +138,29 @@ def post_detail(request: HttpRequest, post_id) -> HttpResponse:
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(6)
+@replica_reads
+@conditional_page(freshness.post_changed)
+def post_comments(request: HttpRequest, post_id) -> HttpResponse:
+    """Следующая страница комментариев поста фрагментом HTML в JSON."""
+    post = get_object_or_404(Post.objects.only('pk'), id=post_id)
+    comments = comments_of_page(request, post)
+    next_cursor = comments.paginator.next_cursor
+    next_url = None
+    if comments.has_next():
+        next_url = '{}?cursor={}'.format(
+            reverse('posts:post_comments', args=[post.pk]), next_cursor
+        )
+    return JsonResponse({
+        'html': render_to_string(
+            'includes/comment_list.html', {'comments': comments}, request
+        ),
+        'next_cursor': next_cursor if next_url else None,
+        'next_url': next_url,
+    })
+
+
+@query_budget(28)
 @login_required
 def post_create(request: HttpRequest) -> HttpResponse:
     """Модуль отвечающий за страницу создания текста постов."""
@@ -84,11 +176,12 @@ def post_create(request: HttpRequest) -> HttpResponse:
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(28)
 @login_required
 def post_edit(request: HttpRequest, post_id) -> HttpResponse:
     """Модуль отвечающий за страницу создания текста постов."""
     post = get_object_or_404(Post, pk=post_id)
-    if request.user != post.author:
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
         request.POST or None,
@@ -106,6 +199,7 @@ def post_edit(request: HttpRequest, post_id) -> HttpResponse:
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(12)
 @login_required
 def add_comment(request: HttpRequest, post_id) -> HttpResponse:
     """Модуль отвечающий за комментирование постов."""
@@ -119,17 +213,46 @@ def add_comment(request: HttpRequest, post_id) -> HttpResponse:
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(6)
+@replica_reads
 @login_required
 def follow_index(request: HttpRequest) -> HttpResponse:
     """Модуль отвечающий за подписку."""
-    following = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_of_page(request, following)
+    page_obj = timeline_page(request.user, request.GET.get(CURSOR_PARAM))
     context = {
         'page_obj': page_obj
     }
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(6)
+@replica_reads
+@login_required
+def notifications_index(request: HttpRequest) -> HttpResponse:
+    """Модуль отвечающий за уведомления о новых постах подписок."""
+    posts = Post.objects.filter(
+        notifications__user=request.user, notifications__is_read=False
+    ).for_feed()
+    authors = notifications.unread_by_author(request.user)
+    context = {
+        'page_obj': paginator_of_page(request, posts),
+        'authors': authors,
+        'unread_count': sum(count for _, count in authors),
+        'notifications': True,
+    }
+    return render(request, 'posts/notifications.html', context)
+
+
+@query_budget(4)
+@login_required
+def notifications_read(request: HttpRequest) -> HttpResponse:
+    """Модуль отмечающий уведомления прочитанными."""
+    if request.method == 'POST':
+        notifications.mark_read(request.user)
+    return redirect('posts:notifications')
+
+
+@query_budget(20)
 @login_required
 def profile_follow(request: HttpRequest, username) -> HttpResponse:
     """Модуль отвечающий за подписку на автора."""
@@ -140,6 +263,7 @@ def profile_follow(request: HttpRequest, username) -> HttpResponse:
     return redirect('posts:profile', username=username)
 
 
+@query_budget(20)
 @login_required
 def profile_unfollow(request: HttpRequest, username) -> HttpResponse:
     """Модуль отвечающий за отписку от автора."""
@@ -0,0 +1,32 @@
+"""
+ASGI config for yatube project.
+
+Django 2.2 doesn't support ASGI, so ``application`` routes the live
+feed streams to native ASGI handlers and bridges everything else to the
+WSGI application (see core/asgi.py). A bridged request holds a thread
+only while Django builds the response, not while a slow client uploads
+or downloads it. Run it with any ASGI server, e.g.
+``uvicorn yatube.asgi:application``; ``manage.py benchmark_concurrency``
+compares it with plain WSGI.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+django_application = get_wsgi_application()
+
+from django.urls import reverse  # noqa: E402
+
+from core.asgi import Router, WSGIBridge  # noqa: E402
+from posts import live  # noqa: E402
+
+application = Router(
+    {
+        reverse('live:index'): live.index_stream,
+        reverse('live:follow'): live.follow_stream,
+    },
+    WSGIBridge(django_application)
+)
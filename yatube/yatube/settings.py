@@ -37,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.timing.RequestTimingMiddleware',
+    'core.queries.QueryInspectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,6 +46,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -51,7 +54,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -61,6 +64,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.cache_stats.cache_stats',
             ],
         },
     },
@@ -72,13 +76,44 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Режим базы: tuned - SQLite с WAL, busy timeout и постоянными
+# соединениями (core/sqlite/base.py), stock - стандартный бэкенд.
+DATABASE_MODE = os.getenv('YATUBE_DB_MODE', 'tuned')
+DATABASE_ENGINES = {
+    'tuned': {
+        'ENGINE': 'core.sqlite',
+        'CONN_MAX_AGE': 60,
+    },
+    'stock': {
+        'ENGINE': 'django.db.backends.sqlite3',
+    },
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        **DATABASE_ENGINES[DATABASE_MODE],
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
 
+# Реплики для чтения (core/routers.py). Локально это копии db.sqlite3,
+# которые обновляет команда sync_replicas. В тестах реплики смотрят
+# в основную базу.
+DATABASE_REPLICAS = [
+    f'replica{number}'
+    for number in range(1, int(os.getenv('YATUBE_REPLICAS', '0')) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        **DATABASE_ENGINES[DATABASE_MODE],
+        'NAME': os.path.join(BASE_DIR, f'db.{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Сколько секунд после своей записи пользователь читает с основной базы:
+# с запасом больше отставания реплик.
+REPLICA_STICKY_SECONDS = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -99,11 +134,104 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+# Замер запросов (core/timing.py): заголовок Server-Timing для всех
+# только в режиме отладки, сотрудникам - всегда. Запросы дольше
+# SLOW_REQUEST_MS попадают в лог как WARNING, остальные - как INFO.
+SERVER_TIMING_PUBLIC = DEBUG
+SLOW_REQUEST_MS = 500
+REQUEST_HISTOGRAMS = True
+# Поиск повторов и медленных запросов к базе (core/queries.py).
+# В тестах включён всегда: view сверх бюджета запросов роняет тест
+# (core/testing.py, core/pytest_plugin.py).
+QUERY_INSPECTION = DEBUG
+SLOW_QUERY_MS = 100
+TEST_RUNNER = 'core.testing.QueryBudgetRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        # Детекторы молчат в тестах: бюджеты проверяются падением теста.
+        'unless_silenced': {
+            '()': 'core.log.UnlessSilenced',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+        'detectors': {
+            'class': 'logging.StreamHandler',
+            'filters': ['unless_silenced'],
+        },
+    },
+    'loggers': {
+        'yatube.requests': {
+            'handlers': ['detectors'],
+            'level': os.getenv('YATUBE_REQUEST_LOG', 'WARNING'),
+            'propagate': False,
+        },
+        'yatube.queries': {
+            'handlers': ['detectors'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'yatube.jobs': {
+            'handlers': ['console'],
+            'level': os.getenv('YATUBE_JOB_LOG', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+
+# Режим кэша: local, file, sqlite или tiered (см. core/cache.py).
+# Для нескольких процессов gunicorn нужен общий режим: file, sqlite
+# или tiered.
+CACHE_MODE = os.getenv('YATUBE_CACHE_MODE', 'local')
+CACHE_DIR = os.getenv('YATUBE_CACHE_DIR', os.path.join(BASE_DIR, 'cache'))
+
+CACHE_BACKENDS = {
+    'local': {
+        'default': {
+            'BACKEND': 'core.cache.LocMemCache',
+            'LOCATION': 'yatube',
+        },
+    },
+    'file': {
+        'default': {
+            'BACKEND': 'core.cache.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'files'),
+        },
+    },
+    'sqlite': {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        },
+    },
+    'tiered': {
+        'default': {
+            'BACKEND': 'core.cache.TieredCache',
+            'LOCATION': 'yatube',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 5,
+                # Версии карточек и кэш групп меняются записью, их
+                # локальная копия в процессе устаревала бы.
+                'SHARED_ONLY_KEYS': (':version', 'group_feed:'),
+            },
+        },
+        'shared': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        },
+    },
 }
+CACHES = CACHE_BACKENDS[CACHE_MODE]
 
 
 # Internationalization
@@ -129,8 +257,10 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-#  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма уходят фоновой задачей (core/mail.py), а отправляет их
+# движок filebased.EmailBackend
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -139,4 +269,99 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Картинки загружаются потоком во временный файл и проверяются
+# по заголовку (см. posts/uploads.py).
+FILE_UPLOAD_HANDLERS = ['posts.uploads.StreamingImageUploadHandler']
+POST_UPLOAD_FORMATS = ('GIF', 'JPEG', 'PNG', 'WEBP')
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_SIDE = 8000
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
 NUMBER_OF_POSTS = 10
+# Комментарии под постом подгружаются страницами по столько штук.
+COMMENTS_PER_PAGE = 20
+
+# Лента подписок: посты авторов, у которых подписчиков не больше
+# TIMELINE_FANOUT_LIMIT, раскладываются по лентам при публикации,
+# посты более популярных авторов подмешиваются при чтении.
+# Рассылку и заполнение ленты после подписки выполняют фоновые задачи
+# (core.jobs), до этого посты подписки тоже подмешиваются при чтении.
+# Без TIMELINE_ASYNC они выполняются прямо в запросе.
+TIMELINE_ASYNC = True
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL_SIZE = 1000
+TIMELINE_BATCH_SIZE = 500
+
+# Фоновые задачи в базе (core/jobs.py) выполняет процесс run_jobs --loop
+# в JOBS_WORKERS потоков; его нужно запускать рядом с приложением (см.
+# README), без него *_ASYNC выключают. Задачу, которую обработчик не завершил за
+# JOBS_LEASE секунд, забирает другой; выполненные задачи хранятся
+# JOBS_KEEP_DONE секунд для метрик на странице admin/jobs/.
+JOBS_WORKERS = 2
+JOBS_LEASE = 5 * 60
+JOBS_KEEP_DONE = 60 * 60 * 24
+
+# Уведомления о новых постах: публикация ставит задачу в очередь в базе,
+# фоновая задача пишет уведомления подписчикам пачками по
+# NOTIFICATION_BATCH_SIZE (см. posts/notifications.py), не больше
+# NOTIFICATION_WORKERS рассылок одновременно. Без NOTIFICATION_ASYNC
+# рассылка идёт прямо в запросе.
+NOTIFICATION_ASYNC = True
+NOTIFICATION_WORKERS = 2
+NOTIFICATION_BATCH_SIZE = 1000
+
+# Приложение yatube.asgi выполняет синхронный код Django в ASGI_THREADS
+# потоках, независимые запросы страницы идут одновременно в
+# PARALLEL_THREADS потоках (core/parallel.py). Тело запроса больше
+# ASGI_BODY_MAX_SIZE отклоняется ответом 413; тела поменьше, с
+# картинкой до POST_IMAGE_MAX_SIZE, форма отклоняет сама, с ошибкой.
+ASGI_THREADS = 20
+ASGI_BODY_MAX_SIZE = 2 * POST_IMAGE_MAX_SIZE
+PARALLEL_QUERIES = True
+PARALLEL_THREADS = 8
+
+# Живая лента (posts/live.py): SSE-соединения держит приложение yatube.asgi.
+# Карточки новых постов расходятся по процессам через LIVE_BACKPLANE;
+# каждому соединению копится не больше LIVE_QUEUE_SIZE карточек, при
+# переподключении досылается до LIVE_BACKFILL пропущенных.
+LIVE_BACKPLANE = 'posts.live.LocalBackplane'
+LIVE_QUEUE_SIZE = 50
+LIVE_BACKFILL = 20
+LIVE_HEARTBEAT = 15
+LIVE_RETRY_MS = 3000
+
+# Сколько хранить отрисованную карточку поста. Устаревание карточек
+# решают версии поста, автора и группы, таймаут лишь освобождает память.
+POST_CARD_TIMEOUT = 60 * 60 * 24
+
+# Кэш групп: описание по slug и id постов первой страницы. Обновляется
+# при записи (posts.group_feed), таймаут лишь освобождает память.
+GROUP_FEED_TIMEOUT = 60 * 60 * 24
+# Сколько помнить, что группы с таким slug нет: несуществующих адресов
+# бесконечно много, держать их дольше незачем.
+GROUP_MISSING_TIMEOUT = 60
+# Заполнять кэш после записи фоновой задачей. Локальный кэш у каждого
+# процесса свой, заполнять его из процесса run_jobs бесполезно.
+CACHE_WARMING_JOBS = CACHE_MODE != 'local'
+
+# Миниатюры картинок постов по слотам шаблонов: размер слота в CSS
+# пикселях, ширины для srcset и атрибут sizes. Все варианты готовятся
+# в фоне сразу после загрузки картинки (см. posts/thumbnails.py).
+POST_THUMBNAILS = {
+    'card': {
+        'size': (650, 200),
+        'widths': (325, 650, 1300),
+        'sizes': '(max-width: 700px) 100vw, 650px',
+    },
+    'detail': {
+        'size': (960, 339),
+        'widths': (480, 960, 1920),
+        'sizes': '(max-width: 1000px) 100vw, 960px',
+    },
+}
+# Форматы в порядке предпочтения; последний - запасной для <img>.
+# Форматы, которые не поддерживает установленный Pillow, пропускаются.
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP', 'JPEG')
+POST_IMAGE_QUALITY = {'AVIF': 50, 'WEBP': 75, 'JPEG': 80}
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
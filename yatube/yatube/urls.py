@@ -3,10 +3,16 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import jobs_metrics, timings
+
 urlpatterns = [
+    path('admin/timings/', timings, name='timings'),
+    path('admin/jobs/', jobs_metrics, name='jobs'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
+    path('api/', include('posts.api_urls', namespace='api')),
+    path('live/', include('posts.live_urls', namespace='live')),
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
 ]